@@ -14,7 +14,16 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
-config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
+# Every shard has the full schema: alembic -x shard=NAME upgrade head
+# migrates the SHARD_URLS entry NAME instead of DATABASE_URL
+shard = context.get_x_argument(as_dictionary=True).get("shard")
+if shard and shard != "default":
+    if shard not in settings.SHARD_URLS:
+        raise SystemExit(f"Unknown shard {shard}, expected one of {', '.join(settings.SHARD_URLS) or 'none'}")
+    config.set_main_option("sqlalchemy.url", settings.SHARD_URLS[shard])
+else:
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
@@ -0,0 +1,27 @@
+"""index payments by provider reference
+
+Revision ID: 2c7e9f1a4b63
+Revises: a8d1e5c93f70
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7e9f1a4b63'
+down_revision: Union[str, Sequence[str], None] = 'a8d1e5c93f70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_payments_reference", "payments", ["reference"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_payments_reference", table_name="payments")
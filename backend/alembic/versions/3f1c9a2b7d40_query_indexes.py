@@ -0,0 +1,102 @@
+"""secondary indexes for the CRUD query patterns
+
+Revision ID: 3f1c9a2b7d40
+Revises:
+Create Date: 2026-10-19 13:10:00.000000
+
+Each index backs a filter used in app/crud (or the ORM relationship loads
+behind it). Composite indexes lead with the equality column and end with
+the range/sort column, e.g. orders (company_id, created_at) serves both the
+company listing and the date-bounded sales reports.
+
+Databases created with init_db already have these indexes and are stamped
+at head; this revision upgrades databases created before it.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a2b7d40'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, unique)
+INDEXES = [
+    ("ix_orders_company_id_created_at", "orders", ["company_id", "created_at"], False),
+    ("ix_orders_store_id_created_at", "orders", ["store_id", "created_at"], False),
+    ("ix_orders_user_id", "orders", ["user_id"], False),
+    ("ix_order_items_order_id", "order_items", ["order_id"], False),
+    ("ix_payments_order_id", "payments", ["order_id"], False),
+    ("ix_inventory_store_id_item_id", "inventory", ["store_id", "item_id"], False),
+    ("ix_inventory_movements_inventory_id_created_at", "inventory_movements", ["inventory_id", "created_at"], False),
+    ("ix_items_company_id_name", "items", ["company_id", "name"], False),
+    ("ix_items_category_id", "items", ["category_id"], False),
+    ("ix_categories_company_id_name", "categories", ["company_id", "name"], False),
+    ("ix_categories_parent_id", "categories", ["parent_id"], False),
+    ("ix_stores_company_id", "stores", ["company_id"], False),
+    ("ix_users_company_id", "users", ["company_id"], False),
+    ("ix_users_store_id", "users", ["store_id"], False),
+    ("ix_recipes_company_id", "recipes", ["company_id"], False),
+    ("ix_recipe_ingredients_recipe_id", "recipe_ingredients", ["recipe_id"], False),
+    ("ix_courses_company_id", "courses", ["company_id"], False),
+    ("ix_course_sections_course_id_order", "course_sections", ["course_id", "order"], False),
+    ("ix_lessons_section_id_order", "lessons", ["section_id", "order"], False),
+    ("uq_course_enrollments_user_id_course_id", "course_enrollments", ["user_id", "course_id"], True),
+    ("ix_course_enrollments_course_id", "course_enrollments", ["course_id"], False),
+    ("ix_lesson_progress_enrollment_id_lesson_id", "lesson_progress", ["enrollment_id", "lesson_id"], False),
+]
+
+
+def _existing(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _merge_duplicate_enrollments() -> None:
+    """Keep the oldest enrollment per (user, course) and move progress rows onto it."""
+    op.execute(
+        """
+        UPDATE lesson_progress SET enrollment_id = (
+            SELECT MIN(keep.id) FROM course_enrollments keep
+            JOIN course_enrollments dup
+              ON dup.user_id = keep.user_id AND dup.course_id = keep.course_id
+            WHERE dup.id = lesson_progress.enrollment_id
+        )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM course_enrollments WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT MIN(id) AS id FROM course_enrollments GROUP BY user_id, course_id
+            ) AS keep
+        )
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicate_enrollments()
+    for name, table, columns, unique in INDEXES:
+        if name not in _existing(table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    mysql = op.get_bind().dialect.name == "mysql"
+    for name, table, columns, unique in reversed(INDEXES):
+        if name not in _existing(table):
+            continue
+        if mysql:
+            # InnoDB needs an index on every foreign key column and will have
+            # dropped its implicit one when the composite index took over
+            fallback = f"ix_{table}_{columns[0]}_fk"
+            if fallback not in _existing(table):
+                op.create_index(fallback, table, columns[:1])
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,27 @@
+"""index orders by company and id
+
+Revision ID: 4a9c2e7b1f35
+Revises: b8e3f1a27c5d
+Create Date: 2026-10-23 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a9c2e7b1f35'
+down_revision: Union[str, Sequence[str], None] = 'b8e3f1a27c5d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_orders_company_id_id", "orders", ["company_id", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_orders_company_id_id", table_name="orders")
@@ -0,0 +1,36 @@
+"""company shards
+
+Revision ID: 5d2f8c1e7a94
+Revises: 9e4b7a2c6d18
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8c1e7a94'
+down_revision: Union[str, Sequence[str], None] = '9e4b7a2c6d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only used on the default shard, but every shard shares the schema
+    op.create_table(
+        "company_shards",
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.Enum("ACTIVE", "MOVING", name="shardstatus"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("company_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("company_shards")
@@ -0,0 +1,46 @@
+"""batch stock tracking for FEFO
+
+Revision ID: 5d8f2a61c3e7
+Revises: e91b3c5a7f28
+Create Date: 2026-10-19 17:00:00.000000
+
+Existing batches keep their full quantity as remaining stock but have no
+inventory row, so sales are not allocated to them.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f2a61c3e7'
+down_revision: Union[str, Sequence[str], None] = 'e91b3c5a7f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("batches") as batch_op:
+        batch_op.add_column(sa.Column("inventory_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("remaining_quantity", sa.Float(), nullable=False, server_default="0"))
+        batch_op.create_foreign_key("fk_batches_inventory_id", "inventory", ["inventory_id"], ["id"])
+    op.execute("UPDATE batches SET remaining_quantity = quantity")
+    op.create_index("ix_batches_store_id_expiry_date", "batches", ["store_id", "expiry_date"])
+    op.create_index("ix_batches_inventory_id_expiry_date", "batches", ["inventory_id", "expiry_date"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("batches") as batch_op:
+        batch_op.drop_constraint("fk_batches_inventory_id", type_="foreignkey")
+    if op.get_bind().dialect.name == "mysql":
+        # the stores foreign key needs an index of its own once the composite one goes
+        op.create_index("ix_batches_store_id_fk", "batches", ["store_id"])
+    op.drop_index("ix_batches_inventory_id_expiry_date", table_name="batches")
+    op.drop_index("ix_batches_store_id_expiry_date", table_name="batches")
+    with op.batch_alter_table("batches") as batch_op:
+        batch_op.drop_column("remaining_quantity")
+        batch_op.drop_column("inventory_id")
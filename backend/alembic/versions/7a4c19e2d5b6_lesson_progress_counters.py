@@ -0,0 +1,106 @@
+"""unique lesson progress per enrollment and lesson, progress counters
+
+Revision ID: 7a4c19e2d5b6
+Revises: 5d8f2a61c3e7
+Create Date: 2026-10-19 18:00:00.000000
+
+Duplicate lesson_progress rows are merged into the oldest one first. The
+new lesson_count and completed_lessons counters are backfilled and every
+enrollment's progress is recomputed from them.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4c19e2d5b6'
+down_revision: Union[str, Sequence[str], None] = '5d8f2a61c3e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicates() -> None:
+    bind = op.get_bind()
+    groups = bind.execute(sa.text(
+        "SELECT enrollment_id, lesson_id FROM lesson_progress "
+        "GROUP BY enrollment_id, lesson_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    for enrollment_id, lesson_id in groups:
+        rows = bind.execute(sa.text(
+            "SELECT id, is_completed, progress, last_position, completed_at FROM lesson_progress "
+            "WHERE enrollment_id = :enrollment_id AND lesson_id = :lesson_id ORDER BY id"
+        ), {"enrollment_id": enrollment_id, "lesson_id": lesson_id}).fetchall()
+        completed_at = [row.completed_at for row in rows if row.completed_at is not None]
+        bind.execute(
+            sa.text(
+                "UPDATE lesson_progress SET is_completed = :is_completed, progress = :progress, "
+                "last_position = :last_position, completed_at = :completed_at WHERE id = :id"
+            ),
+            {
+                "is_completed": any(row.is_completed for row in rows),
+                "progress": max(row.progress or 0 for row in rows),
+                "last_position": rows[-1].last_position,
+                "completed_at": min(completed_at) if completed_at else None,
+                "id": rows[0].id,
+            }
+        )
+        bind.execute(
+            sa.text("DELETE FROM lesson_progress WHERE id IN :ids").bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": [row.id for row in rows[1:]]}
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicates()
+    # Unique index first: on MySQL the enrollment_id foreign key always
+    # needs an index that starts with it
+    op.create_index(
+        "uq_lesson_progress_enrollment_id_lesson_id", "lesson_progress", ["enrollment_id", "lesson_id"], unique=True
+    )
+    op.drop_index("ix_lesson_progress_enrollment_id_lesson_id", table_name="lesson_progress")
+
+    op.add_column("courses", sa.Column("lesson_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column(
+        "course_enrollments", sa.Column("completed_lessons", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.execute(
+        """
+        UPDATE courses SET lesson_count = (
+            SELECT COUNT(*) FROM lessons l JOIN course_sections s ON s.id = l.section_id
+            WHERE s.course_id = courses.id
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE course_enrollments SET completed_lessons = (
+            SELECT COUNT(*) FROM lesson_progress p
+            WHERE p.enrollment_id = course_enrollments.id AND p.is_completed = 1
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE course_enrollments SET progress = COALESCE((
+            SELECT CASE WHEN c.lesson_count > 0
+                        THEN 100.0 * course_enrollments.completed_lessons / c.lesson_count ELSE 0 END
+            FROM courses c WHERE c.id = course_enrollments.course_id
+        ), 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("course_enrollments") as batch_op:
+        batch_op.drop_column("completed_lessons")
+    with op.batch_alter_table("courses") as batch_op:
+        batch_op.drop_column("lesson_count")
+    op.create_index(
+        "ix_lesson_progress_enrollment_id_lesson_id", "lesson_progress", ["enrollment_id", "lesson_id"]
+    )
+    op.drop_index("uq_lesson_progress_enrollment_id_lesson_id", table_name="lesson_progress")
@@ -0,0 +1,31 @@
+"""index batches by store, expiry and remaining quantity
+
+Revision ID: 7e1d4b9c2a58
+Revises: 4a9c2e7b1f35
+Create Date: 2026-10-23 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e1d4b9c2a58'
+down_revision: Union[str, Sequence[str], None] = '4a9c2e7b1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_batches_store_id_expiry_date_remaining", "batches", ["store_id", "expiry_date", "remaining_quantity"]
+    )
+    op.drop_index("ix_batches_store_id_expiry_date", table_name="batches")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_batches_store_id_expiry_date", "batches", ["store_id", "expiry_date"])
+    op.drop_index("ix_batches_store_id_expiry_date_remaining", table_name="batches")
@@ -0,0 +1,62 @@
+"""unique inventory row per (store_id, item_id)
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1c9a2b7d40
+Create Date: 2026-10-19 14:05:00.000000
+
+Duplicate rows are merged first: the oldest row keeps the summed quantity
+and the movements of the others, which are then deleted.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a2b7d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicates() -> None:
+    bind = op.get_bind()
+    groups = bind.execute(sa.text(
+        "SELECT store_id, item_id FROM inventory GROUP BY store_id, item_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    for store_id, item_id in groups:
+        rows = bind.execute(sa.text(
+            "SELECT id, quantity FROM inventory WHERE store_id = :store_id AND item_id = :item_id ORDER BY id"
+        ), {"store_id": store_id, "item_id": item_id}).fetchall()
+        keep = rows[0].id
+        duplicates = [row.id for row in rows[1:]]
+        bind.execute(
+            sa.text("UPDATE inventory SET quantity = :quantity WHERE id = :id"),
+            {"quantity": sum(row.quantity or 0 for row in rows), "id": keep}
+        )
+        bind.execute(
+            sa.text("UPDATE inventory_movements SET inventory_id = :keep WHERE inventory_id IN :ids")
+            .bindparams(sa.bindparam("ids", expanding=True)),
+            {"keep": keep, "ids": duplicates}
+        )
+        bind.execute(
+            sa.text("DELETE FROM inventory WHERE id IN :ids").bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": duplicates}
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicates()
+    # Create the unique index before dropping the old one: on MySQL the
+    # store_id foreign key always needs an index that starts with it
+    op.create_index("uq_inventory_store_id_item_id", "inventory", ["store_id", "item_id"], unique=True)
+    op.drop_index("ix_inventory_store_id_item_id", table_name="inventory")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_inventory_store_id_item_id", "inventory", ["store_id", "item_id"])
+    op.drop_index("uq_inventory_store_id_item_id", table_name="inventory")
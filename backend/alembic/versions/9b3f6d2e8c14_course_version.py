@@ -0,0 +1,28 @@
+"""course version for tree caching
+
+Revision ID: 9b3f6d2e8c14
+Revises: 7e1d4b9c2a58
+Create Date: 2026-10-23 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3f6d2e8c14'
+down_revision: Union[str, Sequence[str], None] = '7e1d4b9c2a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("courses", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("courses", "version")
@@ -0,0 +1,87 @@
+"""price lists and promotions
+
+Revision ID: 9e4b7a2c6d18
+Revises: 2c7e9f1a4b63
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7a2c6d18'
+down_revision: Union[str, Sequence[str], None] = '2c7e9f1a4b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "price_lists",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("store_id", sa.Integer(), sa.ForeignKey("stores.id"), nullable=True),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_price_lists_id", "price_lists", ["id"])
+    op.create_index("ix_price_lists_company_id", "price_lists", ["company_id"])
+
+    op.create_table(
+        "price_list_items",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("price_list_id", sa.Integer(), sa.ForeignKey("price_lists.id"), nullable=False),
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_price_list_items_id", "price_list_items", ["id"])
+    op.create_index(
+        "uq_price_list_items_price_list_id_item_id", "price_list_items", ["price_list_id", "item_id"], unique=True
+    )
+
+    op.create_table(
+        "promotions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("store_id", sa.Integer(), sa.ForeignKey("stores.id"), nullable=True),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("item_id", sa.Integer(), sa.ForeignKey("items.id"), nullable=True),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=True),
+        sa.Column(
+            "discount_type", sa.Enum("PERCENT", "AMOUNT", "FIXED_PRICE", name="discounttype"), nullable=False
+        ),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("starts_at", sa.DateTime(), nullable=False),
+        sa.Column("ends_at", sa.DateTime(), nullable=True),
+        sa.Column("daily_start", sa.Time(), nullable=True),
+        sa.Column("daily_end", sa.Time(), nullable=True),
+        sa.Column("weekdays", sa.Integer(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_promotions_id", "promotions", ["id"])
+    op.create_index("ix_promotions_company_id_ends_at", "promotions", ["company_id", "ends_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_promotions_company_id_ends_at", table_name="promotions")
+    op.drop_index("ix_promotions_id", table_name="promotions")
+    op.drop_table("promotions")
+    op.drop_index("uq_price_list_items_price_list_id_item_id", table_name="price_list_items")
+    op.drop_index("ix_price_list_items_id", table_name="price_list_items")
+    op.drop_table("price_list_items")
+    op.drop_index("ix_price_lists_company_id", table_name="price_lists")
+    op.drop_index("ix_price_lists_id", table_name="price_lists")
+    op.drop_table("price_lists")
@@ -0,0 +1,41 @@
+"""reserved stock per inventory row
+
+Revision ID: a8d1e5c93f70
+Revises: f6a3b9d24c81
+Create Date: 2026-10-19 22:00:00.000000
+
+The reservations of orders already confirmed, processing or ready are
+backfilled from their line items.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d1e5c93f70'
+down_revision: Union[str, Sequence[str], None] = 'f6a3b9d24c81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "inventory",
+        sa.Column("reserved_quantity", sa.Float(), nullable=False, server_default="0")
+    )
+    op.execute(
+        "UPDATE inventory SET reserved_quantity = ("
+        "SELECT COALESCE(SUM(order_items.quantity), 0) FROM order_items "
+        "JOIN orders ON orders.id = order_items.order_id "
+        "WHERE orders.store_id = inventory.store_id AND order_items.item_id = inventory.item_id "
+        "AND orders.status IN ('CONFIRMED', 'PROCESSING', 'READY'))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("inventory", "reserved_quantity")
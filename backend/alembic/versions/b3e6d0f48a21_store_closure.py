@@ -0,0 +1,56 @@
+"""store hierarchy closure table
+
+Revision ID: b3e6d0f48a21
+Revises: 7a4c19e2d5b6
+Create Date: 2026-10-19 19:00:00.000000
+
+Backfilled from stores.parent_store_id one tree level at a time.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e6d0f48a21'
+down_revision: Union[str, Sequence[str], None] = '7a4c19e2d5b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "store_closure",
+        sa.Column("ancestor_id", sa.Integer(), nullable=False),
+        sa.Column("descendant_id", sa.Integer(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["stores.id"]),
+        sa.ForeignKeyConstraint(["descendant_id"], ["stores.id"]),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index("ix_store_closure_descendant_id_depth", "store_closure", ["descendant_id", "depth"])
+
+    op.execute("INSERT INTO store_closure (ancestor_id, descendant_id, depth) SELECT id, id, 0 FROM stores")
+    # Each pass extends the paths of the previous depth by one parent link
+    bind = op.get_bind()
+    depth = 0
+    while True:
+        inserted = bind.execute(sa.text(
+            """
+            INSERT INTO store_closure (ancestor_id, descendant_id, depth)
+            SELECT s.parent_store_id, c.descendant_id, c.depth + 1
+            FROM store_closure c JOIN stores s ON s.id = c.ancestor_id
+            WHERE c.depth = :depth AND s.parent_store_id IS NOT NULL
+            """
+        ), {"depth": depth}).rowcount
+        if not inserted:
+            break
+        depth += 1
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("store_closure")
@@ -0,0 +1,33 @@
+"""replication heartbeats
+
+Revision ID: b8e3f1a27c5d
+Revises: 5d2f8c1e7a94
+Create Date: 2026-10-22 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e3f1a27c5d'
+down_revision: Union[str, Sequence[str], None] = '5d2f8c1e7a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "replication_heartbeats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("beat_at", sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("replication_heartbeats")
@@ -0,0 +1,64 @@
+"""inventory ledger snapshots
+
+Revision ID: c47a0e9d2b15
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-19 15:00:00.000000
+
+Also backfills an "Opening balance" ADJUSTMENT movement for every
+inventory row whose quantity isn't explained by its movements, so the
+ledger reconciles from the start.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a0e9d2b15'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SIGNED_QUANTITY = "CASE WHEN m.movement_type = 'SALE' THEN -m.quantity ELSE m.quantity END"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "inventory_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("inventory_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("last_movement_id", sa.Integer(), nullable=False),
+        sa.Column("taken_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["inventory_id"], ["inventory.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_inventory_snapshots_id", "inventory_snapshots", ["id"])
+    op.create_index(
+        "uq_inventory_snapshots_inventory_id_last_movement_id", "inventory_snapshots",
+        ["inventory_id", "last_movement_id"], unique=True
+    )
+    op.create_index(
+        "ix_inventory_snapshots_inventory_id_taken_at", "inventory_snapshots", ["inventory_id", "taken_at"]
+    )
+
+    op.execute(
+        f"""
+        INSERT INTO inventory_movements (inventory_id, movement_type, quantity, unit, notes, created_at)
+        SELECT i.id, 'ADJUSTMENT', i.quantity - COALESCE(SUM({SIGNED_QUANTITY}), 0), i.unit,
+               'Opening balance', COALESCE(i.created_at, CURRENT_TIMESTAMP)
+        FROM inventory i
+        LEFT JOIN inventory_movements m ON m.inventory_id = i.id
+        GROUP BY i.id, i.quantity, i.unit, i.created_at
+        HAVING i.quantity - COALESCE(SUM({SIGNED_QUANTITY}), 0) <> 0
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("inventory_snapshots")
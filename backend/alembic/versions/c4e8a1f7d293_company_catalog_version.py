@@ -0,0 +1,28 @@
+"""company catalog version shared by all workers
+
+Revision ID: c4e8a1f7d293
+Revises: 9b3f6d2e8c14
+Create Date: 2026-10-23 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f7d293'
+down_revision: Union[str, Sequence[str], None] = '9b3f6d2e8c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("companies", sa.Column("catalog_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("companies", "catalog_version")
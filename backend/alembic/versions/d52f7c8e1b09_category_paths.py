@@ -0,0 +1,53 @@
+"""materialized category paths
+
+Revision ID: d52f7c8e1b09
+Revises: b3e6d0f48a21
+Create Date: 2026-10-19 20:00:00.000000
+
+Paths are computed from categories.parent_id in Python and written back
+in one batch; category tables are small enough to read whole.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd52f7c8e1b09'
+down_revision: Union[str, Sequence[str], None] = 'b3e6d0f48a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("categories", sa.Column("path", sa.String(length=255), nullable=False, server_default=""))
+    op.create_index("ix_categories_company_id_path", "categories", ["company_id", "path"])
+
+    bind = op.get_bind()
+    parents = dict(bind.execute(sa.text("SELECT id, parent_id FROM categories")).tuples().all())
+    paths = {}
+
+    def path(category_id: int) -> str:
+        if category_id not in paths:
+            # A dangling or cyclic parent link makes the category a root
+            paths[category_id] = f"{category_id}/"
+            parent_id = parents.get(category_id)
+            if parent_id in parents:
+                paths[category_id] = path(parent_id) + f"{category_id}/"
+        return paths[category_id]
+
+    if parents:
+        bind.execute(
+            sa.text("UPDATE categories SET path = :path WHERE id = :id"),
+            [{"id": category_id, "path": path(category_id)} for category_id in parents]
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_categories_company_id_path", table_name="categories")
+    with op.batch_alter_table("categories") as batch_op:
+        batch_op.drop_column("path")
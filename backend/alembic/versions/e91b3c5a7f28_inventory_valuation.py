@@ -0,0 +1,45 @@
+"""inventory valuation state and movement unit cost
+
+Revision ID: e91b3c5a7f28
+Revises: c47a0e9d2b15
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b3c5a7f28'
+down_revision: Union[str, Sequence[str], None] = 'c47a0e9d2b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("inventory_movements", sa.Column("unit_cost", sa.Float(), nullable=True))
+    op.create_table(
+        "inventory_valuations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("inventory_id", sa.Integer(), nullable=False),
+        sa.Column("last_movement_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("average_cost", sa.Float(), nullable=False),
+        sa.Column("fifo_value", sa.Float(), nullable=False),
+        sa.Column("layers", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["inventory_id"], ["inventory.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("inventory_id"),
+    )
+    op.create_index("ix_inventory_valuations_id", "inventory_valuations", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("inventory_valuations")
+    with op.batch_alter_table("inventory_movements") as batch_op:
+        batch_op.drop_column("unit_cost")
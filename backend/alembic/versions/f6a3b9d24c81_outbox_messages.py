@@ -0,0 +1,43 @@
+"""transactional outbox
+
+Revision ID: f6a3b9d24c81
+Revises: d52f7c8e1b09
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a3b9d24c81'
+down_revision: Union[str, Sequence[str], None] = 'd52f7c8e1b09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "outbox_messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("topic", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.Enum("PENDING", "DEAD", name="outboxstatus"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_outbox_messages_id", "outbox_messages", ["id"])
+    op.create_index("ix_outbox_messages_status_available_at", "outbox_messages", ["status", "available_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_outbox_messages_status_available_at", table_name="outbox_messages")
+    op.drop_index("ix_outbox_messages_id", table_name="outbox_messages")
+    op.drop_table("outbox_messages")
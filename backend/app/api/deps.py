@@ -6,7 +6,9 @@ from jose import JWTError
 
 from app.core.security import decode_token
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.tenancy import TenantContext, tenant_cache
+from app.db import replicas
+from app.db.shards import DEFAULT_SHARD, CompanyMovingError, shard_router
 from app.models.user import User, UserRole
 from app.crud.crud_user import crud_user
 
@@ -16,9 +18,62 @@ SESSION_TOKEN_NAME = "session_token"
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Set to DEBUG level
 
-def get_db() -> Generator:
+def _token_company_id(request: Request) -> Optional[int]:
+    """The company_id claim of the request's session token, if it has a valid one"""
+    token = request.cookies.get(SESSION_TOKEN_NAME)
+    auth_header = request.headers.get("Authorization")
+    if not token and auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.split(" ")[1]
+    if not token:
+        return None
+    try:
+        company_id = decode_token(token).get("company_id")
+    except Exception:
+        return None
+    return int(company_id) if company_id is not None else None
+
+def _request_shard(request: Request) -> str:
+    """
+    Shard of the requesting user's company, or the default shard for
+    anonymous requests and when there is only one.
+    """
+    if not shard_router.sharded:
+        return DEFAULT_SHARD
+    company_id = _token_company_id(request)
+    try:
+        return shard_router.shard_for(company_id) if company_id is not None else DEFAULT_SHARD
+    except CompanyMovingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "30"}
+        )
+
+def get_db(request: Request) -> Generator:
+    """Session on the primary of the requesting user's shard"""
+    db = shard_router.session(_request_shard(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request) -> Generator:
+    """
+    Read-only session for GET endpoints: on a replica of the requesting
+    user's shard, or on its primary when the client wrote in the last
+    READ_YOUR_WRITES_SECONDS or every replica lags. Writing through it
+    raises ReadOnlySessionError.
+    """
+    db = replicas.read_session(_request_shard(request), primary=replicas.wrote_recently(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_default_db() -> Generator:
+    """Session on the default shard, where companies are created"""
+    db = shard_router.session(DEFAULT_SHARD)
     try:
-        db = SessionLocal()
         yield db
     finally:
         db.close()
@@ -86,6 +141,12 @@ def get_current_user(
             )
             
         # Only verify essential token data
+        if payload.get("company_id") is not None and payload.get("company_id") != user.company_id:
+            logger.error(f"Token company mismatch: {payload.get('company_id')} != {user.company_id}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token data mismatch"
+            )
         if payload.get("email") and payload.get("email") != user.email:
             logger.error(f"Token email mismatch: {payload.get('email')} != {user.email}")
             raise HTTPException(
@@ -143,3 +204,69 @@ def get_current_store_manager(
             detail="The user doesn't have enough privileges"
         )
     return current_user
+
+def get_tenant(
+    db: Session = Depends(get_db),
+    session_token: str = Depends(get_session_token)
+) -> TenantContext:
+    """
+    Tenant context of the active user, from the tenant cache: no query
+    unless it has expired. Use with get_for_tenant to read the user's rows.
+    """
+    try:
+        payload = decode_token(session_token)
+        user_id = int(payload.get("sub") or payload.get("user_id") or 0)
+    except (JWTError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token format"
+        )
+    tenant = tenant_cache.get(db, user_id=user_id)
+    if tenant is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    if payload.get("company_id") is not None and payload.get("company_id") != tenant.company_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token data mismatch"
+        )
+    if payload.get("email") and payload.get("email") != tenant.email:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token data mismatch"
+        )
+    if not tenant.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return tenant
+
+def get_admin_tenant(
+    tenant: TenantContext = Depends(get_tenant),
+) -> TenantContext:
+    """Tenant context of an admin"""
+    if not tenant.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return tenant
+
+def get_manager_tenant(
+    tenant: TenantContext = Depends(get_tenant),
+) -> TenantContext:
+    """Tenant context of an admin or manager"""
+    if tenant.role not in [UserRole.ADMIN, UserRole.MANAGER]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return tenant
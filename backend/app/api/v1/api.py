@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, companies, stores, items, recipes, inventory, orders, courses
+from app.api.v1.endpoints import auth, users, companies, stores, items, recipes, inventory, orders, pricing, courses, reports, realtime
 
 api_router = APIRouter()
 
@@ -12,4 +12,7 @@ api_router.include_router(items.router, prefix="/items", tags=["Items"])
 api_router.include_router(recipes.router, prefix="/recipes", tags=["Recipes"])
 api_router.include_router(inventory.router, prefix="/inventory", tags=["Inventory"])
 api_router.include_router(orders.router, prefix="/orders", tags=["Orders"])
+api_router.include_router(pricing.router, prefix="/pricing", tags=["Pricing"])
 api_router.include_router(courses.router, prefix="/courses", tags=["Academy"])
+api_router.include_router(reports.router, prefix="/reports", tags=["Reports"])
+api_router.include_router(realtime.router, prefix="/realtime", tags=["Realtime"])
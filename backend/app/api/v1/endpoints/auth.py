@@ -5,10 +5,12 @@ from typing import Any, List, Optional
 from datetime import datetime, timedelta
 import logging
 
+from app.core import metrics
 from app.core.config import settings
-from app.core.security import create_access_token
+from app.core.security import create_access_token, verify_password
 from app.api import deps
 from app.crud import crud_user, crud_company
+from app.db.shards import shard_router
 from app.schemas import user as user_schemas
 from app.schemas.register import CompanyRegistration
 from app.models.user import UserRole, User
@@ -21,6 +23,18 @@ logger = logging.getLogger(__name__)
 SESSION_TOKEN_NAME = "session_token"
 SESSION_EXPIRY_DAYS = 30
 
+def _authenticate(db: Session, *, email: str, password: str) -> Optional[User]:
+    """The user with these credentials, looked up on every shard when there are several"""
+    if not shard_router.sharded:
+        return crud_user.authenticate(db, email=email, password=password)
+    for user in shard_router.fan_out(lambda shard_db: crud_user.get_by_email(shard_db, email=email)).values():
+        if user is not None and verify_password(password, user.password_hash):
+            return user
+    return None
+
+def _email_taken(email: str) -> bool:
+    return any(shard_router.fan_out(lambda db: crud_user.get_by_email(db, email=email) is not None).values())
+
 @router.post("/login", response_model=LoginResponse)
 async def login(
     response: Response,
@@ -35,18 +49,20 @@ async def login(
         logger.debug(f"Login attempt for user: {form_data.username}")
         logger.debug(f"Request headers: {request.headers}")
         
-        user = crud_user.authenticate(
+        user = _authenticate(
             db, email=form_data.username, password=form_data.password
         )
         
         if not user:
             logger.debug(f"Authentication failed for user: {form_data.username}")
+            metrics.failed_logins_total.inc("invalid_credentials")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
             )
         elif not user.is_active:
             logger.debug(f"Inactive user attempt to login: {form_data.username}")
+            metrics.failed_logins_total.inc("inactive_user")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Inactive user"
@@ -54,9 +70,10 @@ async def login(
         
         logger.debug(f"User authenticated successfully: {user.email}")
         
-        # Create token data - keep it minimal
+        # Create token data - keep it minimal. company_id picks the shard.
         token_data = {
-            "email": user.email
+            "email": user.email,
+            "company_id": user.company_id
         }
         
         # Create user data for response
@@ -132,15 +149,14 @@ def logout(
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 def register(
     *,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_default_db),
     registration: CompanyRegistration,
 ) -> Any:
     """
     Register a new company with the initial admin user.
     """
-    # Check if user with email already exists
-    user = crud_user.get_by_email(db, email=registration.email)
-    if user:
+    # Check if user with email already exists, on any shard
+    if _email_taken(registration.email):
         raise HTTPException(
             status_code=400,
             detail="A user with this email already exists."
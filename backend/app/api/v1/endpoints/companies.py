@@ -1,9 +1,11 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app import crud, schemas
 from app.api import deps
+from app.db.shards import merge_pages, shard_router
+from app.models.company import Company
 from app.models.user import UserRole
 
 router = APIRouter()
@@ -11,7 +13,7 @@ router = APIRouter()
 @router.post("/", response_model=schemas.company.Company)
 def create_company(
     *,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_default_db),
     company_in: schemas.company.CompanyCreate,
     current_user: schemas.user.User = Depends(deps.get_current_admin_user),
 ) -> Any:
@@ -37,7 +39,13 @@ def read_companies(
     Retrieve companies.
     """
     if current_user.role == UserRole.ADMIN:
-        companies = crud.crud_company.get_multi(db, skip=skip, limit=limit)
+        # Every shard's first skip + limit companies, merged in id order. Stores
+        # are loaded up front: the shard sessions are closed by serialization.
+        pages = shard_router.fan_out(lambda shard_db: (
+            shard_db.query(Company).options(selectinload(Company.stores))
+            .order_by(Company.id).limit(skip + limit).all()
+        ))
+        companies = merge_pages(pages.values(), key=lambda company: company.id, skip=skip, limit=limit)
     else:
         companies = [crud.crud_company.get(db, id=current_user.company_id)]
     return companies
@@ -1,40 +1,77 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.core.cache import catalog_response, etag_response
+from app.core.tenancy import TenantContext
+from app.db.shards import session_shard
 from app.crud.crud_course import crud_course
-from app.schemas.academy import Course, CourseCreate, CourseUpdate, CourseSection, CourseSectionCreate
+from app.crud.crud_enrollment import crud_enrollment
+from app.schemas.academy import (
+    Course,
+    CourseCreate,
+    CourseUpdate,
+    CourseSection,
+    CourseSectionCreate,
+    LessonHeartbeatBatch
+)
+from app.services.lesson_progress import progress_buffer
+from app.services.course_tree import company_course_trees, course_tree
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Course])
 def read_courses(
+    request: Request,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: Any = Depends(deps.get_current_active_user)
+    tenant: TenantContext = Depends(deps.get_tenant)
 ) -> Any:
     """
     Retrieve courses for the current user's company.
     """
-    courses = crud_course.get_multi_by_company(
-        db=db, company_id=current_user.company_id, skip=skip, limit=limit
+    return catalog_response(
+        request,
+        db,
+        company_id=tenant.company_id,
+        response_model=List[Course],
+        dump=lambda: company_course_trees(
+            db, company_id=tenant.company_id, skip=skip, limit=limit
+        )
     )
-    return courses
+
+@router.post("/progress/heartbeats", status_code=202)
+def record_heartbeats(
+    *,
+    db: Session = Depends(deps.get_db),
+    batch_in: LessonHeartbeatBatch,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Report lesson playback progress for the current user's enrollments.
+    Heartbeats are buffered and written in the background.
+    """
+    heartbeats = [heartbeat.dict() for heartbeat in batch_in.heartbeats]
+    pairs = {(heartbeat["enrollment_id"], heartbeat["lesson_id"]) for heartbeat in heartbeats}
+    if crud_enrollment.get_user_lessons(db, user_id=tenant.user_id, pairs=pairs) != pairs:
+        raise HTTPException(status_code=403, detail="Not enrolled in one of the reported lessons")
+    progress_buffer(session_shard(db)).add(heartbeats)
+    return {"accepted": len(heartbeats)}
 
 @router.post("/", response_model=Course)
 def create_course(
     *,
     db: Session = Depends(deps.get_db),
     course_in: CourseCreate,
-    current_user: Any = Depends(deps.get_current_admin_user)
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
 ) -> Any:
     """
     Create new course.
     """
-    course_in.company_id = current_user.company_id
+    course_in.company_id = tenant.company_id
     course = crud_course.create(db=db, obj_in=course_in)
-    return course
+    return Response(content=course_tree(db, course)[1], media_type="application/json")
 
 @router.put("/{course_id}", response_model=Course)
 def update_course(
@@ -42,50 +79,48 @@ def update_course(
     db: Session = Depends(deps.get_db),
     course_id: int,
     course_in: CourseUpdate,
-    current_user: Any = Depends(deps.get_current_admin_user)
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
 ) -> Any:
     """
     Update a course.
     """
-    course = crud_course.get(db=db, id=course_id)
+    course = crud_course.get_for_tenant(db=db, id=course_id, tenant=tenant)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    if course.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    course = crud_course.update(db=db, db_obj=course, obj_in=course_in)
-    return course
+    try:
+        course = crud_course.update(db=db, db_obj=course, obj_in=course_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=course_tree(db, course)[1], media_type="application/json")
 
 @router.get("/{course_id}", response_model=Course)
 def read_course(
     *,
+    request: Request,
     db: Session = Depends(deps.get_db),
     course_id: int,
-    current_user: Any = Depends(deps.get_current_active_user)
+    tenant: TenantContext = Depends(deps.get_tenant)
 ) -> Any:
     """
     Get course by ID.
     """
-    course = crud_course.get(db=db, id=course_id)
+    course = crud_course.get_for_tenant(db=db, id=course_id, tenant=tenant)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    if course.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    return course
+    return etag_response(request, *course_tree(db, course))
 
 @router.delete("/{course_id}")
 def delete_course(
     *,
     db: Session = Depends(deps.get_db),
     course_id: int,
-    current_user: Any = Depends(deps.get_current_admin_user)
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
 ) -> Any:
     """
     Delete a course.
     """
-    course = crud_course.get(db=db, id=course_id)
+    course = crud_course.get_for_tenant(db=db, id=course_id, tenant=tenant)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
-    if course.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
     crud_course.remove(db=db, id=course_id)
     return {"message": "Course deleted successfully"} 
\ No newline at end of file
@@ -1,80 +1,136 @@
-from typing import Any, List
+from datetime import datetime
+from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
 from app.api import deps
+from app.core.responses import ORJSONResponse
+from app.core.tenancy import TenantContext
+from app.models.inventory import MovementType
 from app.models.user import UserRole
+from app.services import valuation
 
 router = APIRouter()
 
 @router.get("/store/{store_id}", response_model=List[schemas.inventory.Inventory])
 def read_store_inventory(
     store_id: int,
+    db: Session = Depends(deps.get_read_db),
+    skip: int = 0,
+    limit: int = 100,
+    as_of: Optional[datetime] = None,
+    include_sub_stores: bool = False,
+    tenant: TenantContext = Depends(deps.get_tenant),
+) -> Any:
+    """
+    Retrieve store inventory, or the stock levels at a past time with `as_of`.
+    With `include_sub_stores`, the inventory of every store below it as well.
+    """
+    if not tenant.owns_store(store_id):
+        raise HTTPException(status_code=404, detail="Store not found")
+    
+    if as_of is not None:
+        return ORJSONResponse(crud.crud_inventory.get_store_inventory_as_of(
+            db=db, store_id=store_id, as_of=as_of, include_sub_stores=include_sub_stores, skip=skip, limit=limit
+        ))
+    # Hot read path: rows are serialized directly, skipping response_model validation
+    return ORJSONResponse(crud.crud_inventory.get_store_inventory_rows(
+        db=db, store_id=store_id, include_sub_stores=include_sub_stores, skip=skip, limit=limit
+    ))
+
+@router.get("/valuation", response_model=schemas.inventory.StoreValuation)
+def read_store_valuation(
+    store_id: int,
+    db: Session = Depends(deps.get_db),
+    tenant: TenantContext = Depends(deps.get_manager_tenant),
+) -> Any:
+    """
+    Stock value of a store, per item and in total, at FIFO and weighted average cost.
+    Movements from the last LEDGER_SETTLE_SECONDS are not valued yet.
+    """
+    if not tenant.owns_store(store_id):
+        raise HTTPException(status_code=404, detail="Store not found")
+    
+    # Catch up on the movements settled since the last run, usually only a few
+    valuation.refresh_valuations(db, store_id=store_id)
+    return ORJSONResponse(valuation.store_valuation_rows(db, store_id=store_id))
+
+@router.post("/batches/", response_model=schemas.recipe.Batch)
+def create_batch(
+    *,
     db: Session = Depends(deps.get_db),
+    batch_in: schemas.recipe.BatchCreate,
+    tenant: TenantContext = Depends(deps.get_manager_tenant),
+) -> Any:
+    """
+    Record a production batch. Its quantity is added to the store's stock
+    and sold first-expired-first-out.
+    """
+    if not tenant.owns_store(batch_in.store_id):
+        raise HTTPException(status_code=404, detail="Store not found")
+    if not crud.crud_recipe.get_for_tenant(db=db, id=batch_in.recipe_id, tenant=tenant):
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    if not crud.crud_item.get_for_tenant(db=db, id=batch_in.item_id, tenant=tenant):
+        raise HTTPException(status_code=404, detail="Item not found")
+    
+    return crud.crud_batch.create(db=db, obj_in=batch_in)
+
+@router.get("/batches/expiring", response_model=List[schemas.recipe.Batch])
+def read_expiring_batches(
+    store_id: int,
+    hours: float = 24,
+    db: Session = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """
-    Retrieve store inventory.
+    Batches with stock left that expire within `hours`, or already have, soonest first.
     """
-    store = crud.crud_store.get(db=db, id=store_id)
-    if not store:
+    if not tenant.owns_store(store_id):
         raise HTTPException(status_code=404, detail="Store not found")
-    if store.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not allowed to access this store's inventory")
     
-    return crud.crud_inventory.get_store_inventory(
-        db=db, store_id=store_id, skip=skip, limit=limit
-    )
+    return crud.crud_batch.get_expiring(db=db, store_id=store_id, hours=hours, skip=skip, limit=limit)
 
 @router.post("/movement/", response_model=schemas.inventory.InventoryMovement)
 def create_inventory_movement(
     *,
     db: Session = Depends(deps.get_db),
     movement_in: schemas.inventory.InventoryMovementCreate,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """
     Create new inventory movement.
     """
-    inventory = crud.crud_inventory.get(db=db, id=movement_in.inventory_id)
-    if not inventory:
+    if not crud.crud_inventory.get_for_tenant(db=db, id=movement_in.inventory_id, tenant=tenant):
         raise HTTPException(status_code=404, detail="Inventory not found")
     
-    store = crud.crud_store.get(db=db, id=inventory.store_id)
-    if store.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not allowed to modify this inventory")
-    
-    if current_user.role == UserRole.SALESPERSON and movement_in.movement_type not in ["sale"]:
-        raise HTTPException(status_code=403, detail="Salesperson can only create sale movements")
+    if tenant.role == UserRole.STAFF and movement_in.movement_type != MovementType.SALE:
+        raise HTTPException(status_code=403, detail="Staff can only create sale movements")
     
-    return crud.crud_inventory.create_movement(db=db, obj_in=movement_in)
+    try:
+        return crud.crud_inventory.create_movement(db=db, obj_in=movement_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/transfer/", response_model=List[schemas.inventory.InventoryMovement])
 def transfer_stock(
     *,
     db: Session = Depends(deps.get_db),
     transfer_in: schemas.inventory.StockTransferCreate,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """
     Transfer stock between stores.
     """
-    if current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
+    if tenant.role not in [UserRole.ADMIN, UserRole.MANAGER]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    # Verify stores belong to user's company
-    from_store = crud.crud_store.get(db=db, id=transfer_in.from_store_id)
-    to_store = crud.crud_store.get(db=db, id=transfer_in.to_store_id)
-    
-    if not from_store or not to_store:
+    # Both stores must belong to the user's company
+    if not tenant.owns_store(transfer_in.from_store_id) or not tenant.owns_store(transfer_in.to_store_id):
         raise HTTPException(status_code=404, detail="Store not found")
     
-    if from_store.company_id != current_user.company_id or to_store.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not allowed to transfer between these stores")
-    
     try:
         return crud.crud_inventory.transfer_stock(
             db=db,
@@ -1,9 +1,11 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
 from app.api import deps
+from app.core.cache import catalog_response
+from app.core.tenancy import TenantContext
 from app.models.user import UserRole
 
 router = APIRouter()
@@ -13,13 +15,13 @@ def create_category(
     *,
     db: Session = Depends(deps.get_db),
     category_in: schemas.item.CategoryCreate,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """Create new category."""
-    if current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
+    if tenant.role not in [UserRole.ADMIN, UserRole.MANAGER]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    if current_user.company_id != category_in.company_id:
+    if tenant.company_id != category_in.company_id:
         raise HTTPException(status_code=403, detail="Not allowed to create category for other companies")
     
     category = crud.crud_category.get_by_name(
@@ -30,21 +32,75 @@ def create_category(
             status_code=400,
             detail="Category with this name already exists"
         )
-    return crud.crud_category.create(db=db, obj_in=category_in)
+    try:
+        return crud.crud_category.create(db=db, obj_in=category_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/categories/", response_model=List[schemas.item.Category])
 def read_categories(
+    request: Request,
     company_id: int,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """Retrieve categories."""
-    if current_user.company_id != company_id:
+    if tenant.company_id != company_id:
         raise HTTPException(status_code=403, detail="Not allowed to access other companies' categories")
-    return crud.crud_category.get_company_categories(
-        db=db, company_id=company_id, skip=skip, limit=limit
+    return catalog_response(
+        request,
+        db,
+        company_id=company_id,
+        response_model=List[schemas.item.Category],
+        load=lambda: crud.crud_category.get_company_categories(
+            db=db, company_id=company_id, skip=skip, limit=limit
+        )
+    )
+
+@router.get("/categories/tree", response_model=List[schemas.item.Category])
+def read_category_tree(
+    request: Request,
+    company_id: int,
+    db: Session = Depends(deps.get_db),
+    tenant: TenantContext = Depends(deps.get_tenant),
+) -> Any:
+    """The company's whole category tree, roots first, children nested."""
+    if tenant.company_id != company_id:
+        raise HTTPException(status_code=403, detail="Not allowed to access other companies' categories")
+    return catalog_response(
+        request,
+        db,
+        company_id=company_id,
+        response_model=List[schemas.item.Category],
+        load=lambda: crud.crud_category.get_tree(db=db, company_id=company_id)
+    )
+
+@router.get("/categories/{category_id}/items", response_model=List[schemas.item.ItemWithInventory])
+def read_category_items(
+    request: Request,
+    category_id: int,
+    db: Session = Depends(deps.get_db),
+    include_subcategories: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    tenant: TenantContext = Depends(deps.get_tenant),
+) -> Any:
+    """Items of a category, or with `include_subcategories` of its whole subtree."""
+    category = crud.crud_category.get_for_tenant(db=db, id=category_id, tenant=tenant)
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    if include_subcategories:
+        load = lambda: crud.crud_item.get_subtree_items(db=db, category=category, skip=skip, limit=limit)
+    else:
+        load = lambda: crud.crud_item.get_category_items(db=db, category_id=category_id, skip=skip, limit=limit)
+    return catalog_response(
+        request,
+        db,
+        company_id=category.company_id,
+        response_model=List[schemas.item.ItemWithInventory],
+        load=load
     )
 
 @router.post("/", response_model=schemas.item.Item)
@@ -52,13 +108,13 @@ def create_item(
     *,
     db: Session = Depends(deps.get_db),
     item_in: schemas.item.ItemCreate,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """Create new item."""
-    if current_user.role not in [UserRole.ADMIN, UserRole.MANAGER]:
+    if tenant.role not in [UserRole.ADMIN, UserRole.MANAGER]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    if current_user.company_id != item_in.company_id:
+    if tenant.company_id != item_in.company_id:
         raise HTTPException(status_code=403, detail="Not allowed to create items for other companies")
     
     if item_in.barcode:
@@ -81,29 +137,46 @@ def create_item(
 
 @router.get("/", response_model=List[schemas.item.ItemWithInventory])
 def read_items(
+    request: Request,
     company_id: int,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """Retrieve items."""
-    if current_user.company_id != company_id:
+    if tenant.company_id != company_id:
         raise HTTPException(status_code=403, detail="Not allowed to access other companies' items")
-    return crud.crud_item.get_company_items(
-        db=db, company_id=company_id, skip=skip, limit=limit
+    return catalog_response(
+        request,
+        db,
+        company_id=company_id,
+        response_model=List[schemas.item.ItemWithInventory],
+        load=lambda: crud.crud_item.get_company_items(
+            db=db, company_id=company_id, skip=skip, limit=limit
+        )
     )
 
+@router.get("/barcode/{barcode}", response_model=schemas.item.ItemWithInventory)
+def read_item_by_barcode(
+    barcode: str,
+    db: Session = Depends(deps.get_db),
+    tenant: TenantContext = Depends(deps.get_tenant),
+) -> Any:
+    """Look up an item by its barcode (till scanner)."""
+    item = crud.crud_item.get_by_barcode(db, barcode=barcode)
+    if not item or item.company_id != tenant.company_id:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item
+
 @router.get("/{item_id}", response_model=schemas.item.ItemWithInventory)
 def read_item(
     item_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: schemas.user.User = Depends(deps.get_current_user),
+    tenant: TenantContext = Depends(deps.get_tenant),
 ) -> Any:
     """Get item by ID."""
-    item = crud.crud_item.get(db=db, id=item_id)
+    item = crud.crud_item.get_for_tenant(db=db, id=item_id, tenant=tenant)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    if item.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not allowed to access this item")
     return item
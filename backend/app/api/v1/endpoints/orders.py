@@ -1,102 +1,266 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Any, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.core.responses import ORJSONResponse
+from app.core.tenancy import TenantContext
+from app.core.config import settings
 from app.crud.crud_order import crud_order
-from app.schemas.order import Order, OrderCreate, OrderUpdate, OrderItem, OrderItemCreate
+from app.crud.crud_payment import crud_payment
+from app.models.order import PaymentMethod, PaymentStatus
+from app.models.user import UserRole
+from app.services import pricing
+from app.services.order_stream import order_stream_hub
+from app.schemas.order import (
+    Order,
+    OrderCreate,
+    OrderUpdate,
+    OrderItem,
+    OrderItemCreate,
+    OrderQuote,
+    OrderQuoteRequest,
+    OrderTransitionRequest,
+    OrderTransitionResult,
+    Payment,
+    PaymentCreate,
+    PaymentUpdate
+)
 
 router = APIRouter()
 
+def _get_visible_order(db: Session, order_id: int, tenant: TenantContext):
+    order = crud_order.get_for_tenant(db=db, id=order_id, tenant=tenant)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if not tenant.can_see_store(order.store_id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return order
+
+def _manual_discount_limit(tenant: TenantContext) -> float:
+    """Share of a line a user may take off by hand"""
+    if tenant.role in [UserRole.ADMIN, UserRole.MANAGER]:
+        return settings.MAX_MANUAL_DISCOUNT_PERCENT / 100
+    return 0.0
+
 @router.get("/", response_model=List[Order])
 def read_orders(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: Any = Depends(deps.get_current_active_user)
+    include_sub_stores: bool = False,
+    tenant: TenantContext = Depends(deps.get_tenant)
 ) -> Any:
     """
-    Retrieve orders for the current user's company.
+    Retrieve orders for the current user's company, or for non-admins their
+    store's orders (and with `include_sub_stores` those of the stores below it).
     """
-    if current_user.role == "admin":
-        orders = crud_order.get_multi_by_company(
-            db=db, company_id=current_user.company_id, skip=skip, limit=limit
+    # Hot read path: rows are serialized directly, skipping response_model validation
+    if tenant.is_admin:
+        orders = crud_order.get_multi_rows(
+            db=db, company_id=tenant.company_id, skip=skip, limit=limit
         )
+    elif tenant.store_id is None:
+        # Without a store there is nothing to scope the orders to
+        orders = []
     else:
-        orders = crud_order.get_multi_by_store(
-            db=db, store_id=current_user.store_id, skip=skip, limit=limit
+        orders = crud_order.get_multi_rows(
+            db=db,
+            company_id=tenant.company_id,
+            store_id=tenant.store_id,
+            include_sub_stores=include_sub_stores,
+            skip=skip,
+            limit=limit
         )
-    return orders
+    return ORJSONResponse(orders)
+
+@router.get("/stream/{store_id}")
+def stream_orders(
+    store_id: int,
+    db: Session = Depends(deps.get_db),
+    last_event_id: Optional[str] = Header(None),
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Server-Sent Events stream of a store's order status changes (and stock
+    updates). Reconnect with Last-Event-ID to replay what was missed; a
+    `reset` event means re-read /orders/ instead.
+    """
+    if not tenant.owns_store(store_id):
+        raise HTTPException(status_code=404, detail="Store not found")
+    if not tenant.can_see_store(store_id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    # Give the connection back to the pool now rather than when the stream ends
+    db.close()
+    return StreamingResponse(
+        order_stream_hub.frames(store_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/", response_model=Order)
 def create_order(
     *,
     db: Session = Depends(deps.get_db),
     order_in: OrderCreate,
-    current_user: Any = Depends(deps.get_current_active_user)
+    tenant: TenantContext = Depends(deps.get_tenant)
 ) -> Any:
     """
     Create new order.
     """
-    order_in.company_id = current_user.company_id
-    order_in.store_id = current_user.store_id
-    order_in.user_id = current_user.id
-    order = crud_order.create(db=db, obj_in=order_in)
+    order_in.company_id = tenant.company_id
+    order_in.store_id = tenant.store_id
+    order_in.user_id = tenant.user_id
+    try:
+        order = crud_order.create(db=db, obj_in=order_in, manual_discount_limit=_manual_discount_limit(tenant))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return order
 
+@router.post("/quote", response_model=OrderQuote)
+def quote_order(
+    *,
+    db: Session = Depends(deps.get_db),
+    quote_in: OrderQuoteRequest,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Price a basket without creating an order: the same prices, taxes and
+    totals that creating it would record.
+    """
+    try:
+        return pricing.price_order(
+            db, company_id=tenant.company_id, store_id=tenant.store_id,
+            lines=[item.dict() for item in quote_in.items], manual_discount_limit=_manual_discount_limit(tenant)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/transitions", response_model=OrderTransitionResult)
+def transition_orders(
+    *,
+    db: Session = Depends(deps.get_db),
+    transition_in: OrderTransitionRequest,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Move many orders to a new status at once. Orders that can't make the
+    move, or that the user can't see, are listed as rejected; the others
+    are moved. Stock is reserved, released or sold as the status requires.
+    """
+    if not tenant.is_admin and tenant.store_id is None:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    try:
+        return crud_order.transition(
+            db=db,
+            order_ids=transition_in.order_ids,
+            to_status=transition_in.to_status,
+            company_id=tenant.company_id,
+            store_ids=[store_id for store_id in tenant.store_ids if tenant.can_see_store(store_id)]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/{order_id}", response_model=Order)
 def update_order(
     *,
     db: Session = Depends(deps.get_db),
     order_id: int,
     order_in: OrderUpdate,
-    current_user: Any = Depends(deps.get_current_active_user)
+    tenant: TenantContext = Depends(deps.get_tenant)
 ) -> Any:
     """
     Update an order.
     """
-    order = crud_order.get(db=db, id=order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if order.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    if order.store_id != current_user.store_id and current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    order = crud_order.update(db=db, db_obj=order, obj_in=order_in)
+    order = _get_visible_order(db, order_id, tenant)
+    try:
+        order = crud_order.update(
+            db=db, db_obj=order, obj_in=order_in, manual_discount_limit=_manual_discount_limit(tenant)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return order
 
 @router.get("/{order_id}", response_model=Order)
 def read_order(
     *,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     order_id: int,
-    current_user: Any = Depends(deps.get_current_active_user)
+    tenant: TenantContext = Depends(deps.get_tenant)
 ) -> Any:
     """
     Get order by ID.
     """
-    order = crud_order.get(db=db, id=order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if order.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    if order.store_id != current_user.store_id and current_user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    return order
+    return _get_visible_order(db, order_id, tenant)
 
 @router.delete("/{order_id}")
 def delete_order(
     *,
     db: Session = Depends(deps.get_db),
     order_id: int,
-    current_user: Any = Depends(deps.get_current_admin_user)
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
 ) -> Any:
     """
     Delete an order.
     """
-    order = crud_order.get(db=db, id=order_id)
-    if not order:
+    if not crud_order.get_for_tenant(db=db, id=order_id, tenant=tenant):
         raise HTTPException(status_code=404, detail="Order not found")
-    if order.company_id != current_user.company_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
     crud_order.remove(db=db, id=order_id)
-    return {"message": "Order deleted successfully"} 
\ No newline at end of file
+    return {"message": "Order deleted successfully"} 
+
+@router.get("/{order_id}/payments", response_model=List[Payment])
+def read_order_payments(
+    *,
+    db: Session = Depends(deps.get_read_db),
+    order_id: int,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Get an order's payments.
+    """
+    _get_visible_order(db, order_id, tenant)
+    return crud_payment.get_by_order(db=db, order_id=order_id)
+
+def _check_payment_status(payment_method: PaymentMethod, payment_status: PaymentStatus, tenant: TenantContext) -> None:
+    """Staff settle cash at the counter; anything else is settled by a manager or the provider's statement"""
+    if tenant.role in [UserRole.ADMIN, UserRole.MANAGER]:
+        return
+    if payment_status in [PaymentStatus.PENDING, PaymentStatus.FAILED]:
+        return
+    if payment_status == PaymentStatus.PAID and payment_method == PaymentMethod.CASH:
+        return
+    raise HTTPException(status_code=403, detail="Only managers can settle or refund this payment")
+
+@router.post("/{order_id}/payments", response_model=Payment)
+def create_order_payment(
+    *,
+    db: Session = Depends(deps.get_db),
+    order_id: int,
+    payment_in: PaymentCreate,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Record a payment. The order's payment status follows from its payments.
+    """
+    _get_visible_order(db, order_id, tenant)
+    _check_payment_status(payment_in.payment_method, payment_in.status, tenant)
+    return crud_payment.create(db=db, obj_in=payment_in, order_id=order_id)
+
+@router.put("/{order_id}/payments/{payment_id}", response_model=Payment)
+def update_order_payment(
+    *,
+    db: Session = Depends(deps.get_db),
+    order_id: int,
+    payment_id: int,
+    payment_in: PaymentUpdate,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Update a payment, e.g. to mark it refunded or failed.
+    """
+    _get_visible_order(db, order_id, tenant)
+    payment = crud_payment.get(db=db, id=payment_id)
+    if not payment or payment.order_id != order_id:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    _check_payment_status(payment_in.payment_method, payment_in.status, tenant)
+    return crud_payment.update(db=db, db_obj=payment, obj_in=payment_in)
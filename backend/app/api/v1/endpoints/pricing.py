@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import List, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.core.tenancy import TenantContext
+from app.crud.crud_pricing import crud_price_list, crud_promotion
+from app.schemas.pricing import (
+    PriceList,
+    PriceListCreate,
+    PriceListItem,
+    PriceListItemCreate,
+    PriceListUpdate,
+    Promotion,
+    PromotionCreate,
+    PromotionUpdate
+)
+
+router = APIRouter()
+
+def _get_price_list(db: Session, price_list_id: int, tenant: TenantContext):
+    price_list = crud_price_list.get_for_tenant(db=db, id=price_list_id, tenant=tenant)
+    if not price_list:
+        raise HTTPException(status_code=404, detail="Price list not found")
+    return price_list
+
+def _get_promotion(db: Session, promotion_id: int, tenant: TenantContext):
+    promotion = crud_promotion.get_for_tenant(db=db, id=promotion_id, tenant=tenant)
+    if not promotion:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    return promotion
+
+@router.get("/price-lists/", response_model=List[PriceList])
+def read_price_lists(
+    db: Session = Depends(deps.get_read_db),
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Retrieve the company's price lists.
+    """
+    return crud_price_list.get_multi_by_company(db=db, company_id=tenant.company_id)
+
+@router.post("/price-lists/", response_model=PriceList)
+def create_price_list(
+    *,
+    db: Session = Depends(deps.get_db),
+    price_list_in: PriceListCreate,
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Create a price list, optionally with its prices.
+    """
+    price_list_in.company_id = tenant.company_id
+    try:
+        return crud_price_list.create(db=db, obj_in=price_list_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/price-lists/{price_list_id}", response_model=PriceList)
+def update_price_list(
+    *,
+    db: Session = Depends(deps.get_db),
+    price_list_id: int,
+    price_list_in: PriceListUpdate,
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Update a price list.
+    """
+    price_list = _get_price_list(db, price_list_id, tenant)
+    try:
+        return crud_price_list.update(db=db, db_obj=price_list, obj_in=price_list_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/price-lists/{price_list_id}")
+def delete_price_list(
+    *,
+    db: Session = Depends(deps.get_db),
+    price_list_id: int,
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Delete a price list and its prices.
+    """
+    _get_price_list(db, price_list_id, tenant)
+    crud_price_list.remove(db=db, id=price_list_id)
+    return {"message": "Price list deleted successfully"}
+
+@router.get("/price-lists/{price_list_id}/items", response_model=List[PriceListItem])
+def read_price_list_items(
+    *,
+    db: Session = Depends(deps.get_read_db),
+    price_list_id: int,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Get a price list's prices.
+    """
+    _get_price_list(db, price_list_id, tenant)
+    return crud_price_list.get_items(db=db, price_list_id=price_list_id)
+
+@router.put("/price-lists/{price_list_id}/items", response_model=List[PriceListItem])
+def set_price_list_items(
+    *,
+    db: Session = Depends(deps.get_db),
+    price_list_id: int,
+    items_in: List[PriceListItemCreate],
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Replace a price list's prices.
+    """
+    price_list = _get_price_list(db, price_list_id, tenant)
+    try:
+        return crud_price_list.set_items(db=db, db_obj=price_list, items=items_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/promotions/", response_model=List[Promotion])
+def read_promotions(
+    db: Session = Depends(deps.get_read_db),
+    active_at: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+    tenant: TenantContext = Depends(deps.get_tenant)
+) -> Any:
+    """
+    Retrieve the company's promotions, or with `active_at` those whose date
+    range covers that time (happy-hour windows aside).
+    """
+    return crud_promotion.get_multi_by_company(
+        db=db, company_id=tenant.company_id, active_at=active_at, skip=skip, limit=limit
+    )
+
+@router.post("/promotions/", response_model=Promotion)
+def create_promotion(
+    *,
+    db: Session = Depends(deps.get_db),
+    promotion_in: PromotionCreate,
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Create a promotion.
+    """
+    promotion_in.company_id = tenant.company_id
+    try:
+        return crud_promotion.create(db=db, obj_in=promotion_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/promotions/{promotion_id}", response_model=Promotion)
+def update_promotion(
+    *,
+    db: Session = Depends(deps.get_db),
+    promotion_id: int,
+    promotion_in: PromotionUpdate,
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Update a promotion.
+    """
+    promotion = _get_promotion(db, promotion_id, tenant)
+    try:
+        return crud_promotion.update(db=db, db_obj=promotion, obj_in=promotion_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/promotions/{promotion_id}")
+def delete_promotion(
+    *,
+    db: Session = Depends(deps.get_db),
+    promotion_id: int,
+    tenant: TenantContext = Depends(deps.get_admin_tenant)
+) -> Any:
+    """
+    Delete a promotion.
+    """
+    _get_promotion(db, promotion_id, tenant)
+    crud_promotion.remove(db=db, id=promotion_id)
+    return {"message": "Promotion deleted successfully"}
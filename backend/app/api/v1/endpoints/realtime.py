@@ -0,0 +1,25 @@
+from typing import Any
+from fastapi import APIRouter, Depends, Form, HTTPException
+
+from app.api import deps
+from app.core.tenancy import TenantContext
+from app.services import realtime
+
+router = APIRouter()
+
+@router.post("/auth")
+def authenticate_channel(
+    socket_id: str = Form(...),
+    channel_name: str = Form(...),
+    tenant: TenantContext = Depends(deps.get_tenant),
+) -> Any:
+    """Sign a Pusher subscription to a store channel of the user's company."""
+    client = realtime.pusher_client()
+    if client is None:
+        raise HTTPException(status_code=503, detail="Realtime events are not configured")
+    store_id = realtime.channel_store_id(channel_name)
+    if store_id is None:
+        raise HTTPException(status_code=403, detail="Unknown channel")
+    if not tenant.can_see_store(store_id):
+        raise HTTPException(status_code=403, detail="Not allowed to access this store")
+    return client.authenticate(channel=channel_name, socket_id=socket_id)
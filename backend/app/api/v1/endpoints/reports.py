@@ -0,0 +1,61 @@
+from typing import List, Any, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.api import deps
+from app.core.tenancy import TenantContext
+from app.crud.crud_order import crud_order
+from app.schemas.report import SalesSummary, TopItem
+
+router = APIRouter()
+
+def _check_store(store_id: Optional[int], tenant: TenantContext) -> None:
+    if store_id is not None and not tenant.owns_store(store_id):
+        raise HTTPException(status_code=404, detail="Store not found")
+
+@router.get("/sales", response_model=List[SalesSummary])
+def read_sales_summary(
+    db: Session = Depends(deps.get_read_db),
+    store_id: Optional[int] = None,
+    include_sub_stores: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    tenant: TenantContext = Depends(deps.get_manager_tenant)
+) -> Any:
+    """
+    Daily sales totals for the current user's company, optionally for one
+    store or, with `include_sub_stores`, a store and every store below it.
+    """
+    _check_store(store_id, tenant)
+    return crud_order.get_sales_summary(
+        db=db,
+        company_id=tenant.company_id,
+        store_id=store_id,
+        include_sub_stores=include_sub_stores,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+@router.get("/top-items", response_model=List[TopItem])
+def read_top_items(
+    db: Session = Depends(deps.get_read_db),
+    store_id: Optional[int] = None,
+    include_sub_stores: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 10,
+    tenant: TenantContext = Depends(deps.get_manager_tenant)
+) -> Any:
+    """
+    Best selling items by revenue.
+    """
+    _check_store(store_id, tenant)
+    return crud_order.get_top_items(
+        db=db,
+        company_id=tenant.company_id,
+        store_id=store_id,
+        include_sub_stores=include_sub_stores,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit
+    )
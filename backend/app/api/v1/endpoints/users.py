@@ -4,13 +4,14 @@ from sqlalchemy.orm import Session
 
 from app import crud, schemas
 from app.api import deps
+from app.db.shards import merge_pages, shard_router
 from app.models.user import UserRole
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.user.User])
 def read_users(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 100,
     current_user: schemas.user.User = Depends(deps.get_current_user),
@@ -19,7 +20,10 @@ def read_users(
     Retrieve users.
     """
     if current_user.role == UserRole.ADMIN:
-        users = crud.crud_user.get_multi(db, skip=skip, limit=limit)
+        # Every shard's first skip + limit users, merged in id order (ids
+        # repeat across shards, the company breaks the tie)
+        pages = shard_router.fan_out(lambda shard_db: crud.crud_user.get_multi(shard_db, limit=skip + limit))
+        users = merge_pages(pages.values(), key=lambda user: (user.id, user.company_id), skip=skip, limit=limit)
     elif current_user.role == UserRole.MANAGER:
         # Managers can only see users in their store
         users = crud.crud_user.get_store_users(
@@ -89,7 +93,7 @@ def read_user_me(
 def read_user_by_id(
     user_id: int,
     current_user: schemas.user.User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
 ) -> Any:
     """
     Get a specific user by id.
@@ -0,0 +1,156 @@
+"""
+Response cache for catalog endpoints (items, categories, recipes, courses).
+
+Each company has a catalog version, companies.catalog_version, that the
+CRUD layer bumps after every committed catalog write. Cache keys include
+the version, so a write makes every older entry unreachable and they age
+out of the LRU. Entries hold the serialized JSON body and its strong ETag,
+so a matching If-None-Match is answered with 304 without running the query.
+
+Every process keeps the versions it read for CATALOG_VERSION_TTL_SECONDS.
+The process that wrote sees its write at once, the other workers within
+that time.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.company import Company
+
+class CatalogVersions:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # company id -> (expires at, version)
+        self._versions: Dict[int, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, db: Session, company_id: int) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._versions.get(company_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        version = db.scalar(select(Company.catalog_version).where(Company.id == company_id)) or 0
+        with self._lock:
+            self._versions[company_id] = (now + self.ttl, version)
+        return version
+
+    def bump(self, db: Session, company_id: int) -> None:
+        """Call after the write has committed, so no worker caches it under the new version unseen"""
+        db.execute(
+            update(Company)
+            .where(Company.id == company_id)
+            .values(catalog_version=Company.catalog_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        with self._lock:
+            self._versions.pop(company_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+
+catalog_versions = CatalogVersions(settings.CATALOG_VERSION_TTL_SECONDS)
+
+class CatalogCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (etag, body)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_MAX_BYTES)
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+def _adapter(response_model: Any) -> TypeAdapter:
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def etag_response(request: Request, etag: str, body: bytes) -> Response:
+    """JSON response with its ETag, or 304 when If-None-Match already has it"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def catalog_response(
+    request: Request,
+    db: Session,
+    *,
+    company_id: int,
+    response_model: Any,
+    load: Optional[Callable[[], Any]] = None,
+    dump: Optional[Callable[[], bytes]] = None
+) -> Response:
+    """
+    Serve a catalog listing from the cache, loading and serializing it with
+    `response_model` on a miss. `load` is only called on a miss; pass `dump`
+    instead when the caller produces the serialized body itself.
+    """
+    key = (
+        company_id,
+        catalog_versions.version(db, company_id),
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+    )
+    entry = catalog_cache.get(key)
+    metrics.record_cache("catalog", entry is not None)
+    if entry is None:
+        if dump is not None:
+            body = dump()
+        else:
+            adapter = _adapter(response_model)
+            body = adapter.dump_json(adapter.validate_python(load(), from_attributes=True), by_alias=True)
+        entry = (make_etag(body), body)
+        catalog_cache.put(key, *entry)
+
+    return etag_response(request, *entry)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import validator, EmailStr, AnyHttpUrl
 from pydantic_settings import BaseSettings
 
@@ -20,16 +20,75 @@ class Settings(BaseSettings):
     
     # Database Settings - XAMPP MySQL default configuration
     DATABASE_URL: str = "mysql+pymysql://root:@localhost:3306/leymax_webpos"
+    SQL_ECHO: bool = True  # Log every statement; disable for benchmarks
+    
+    # Extra databases as {"name": "url"} (JSON in the environment). DATABASE_URL
+    # is the "default" shard and holds the company_shards directory; companies
+    # it doesn't list live there. Move companies with app.jobs.move_company.
+    SHARD_URLS: Dict[str, str] = {}
+    SHARD_DIRECTORY_TTL_SECONDS: float = 30.0
+    
+    # Read replicas of each shard as {"shard": ["url", ...]} (JSON in the
+    # environment), used by GET endpoints through deps.get_read_db. A client
+    # reads the primary for READ_YOUR_WRITES_SECONDS after it writes, which
+    # must exceed REPLICA_MAX_LAG_SECONDS for it to see its own writes.
+    REPLICA_URLS: Dict[str, List[str]] = {}
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEARTBEAT_SECONDS: float = 1.0
+    READ_YOUR_WRITES_SECONDS: float = 10.0
     
     # Security Settings
     SECRET_KEY: str = "your-secret-key-here"  # Change in production
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
     
+    # Catalog response cache (items, categories, recipes, courses)
+    CATALOG_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    COURSE_TREE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # How long a worker trusts the catalog versions it read, i.e. how stale
+    # another worker's catalog write can look
+    CATALOG_VERSION_TTL_SECONDS: float = 2.0
+    
+    # Lesson progress heartbeats are buffered and written this often
+    LESSON_PROGRESS_FLUSH_SECONDS: float = 5.0
+    
+    # Local time of the stores, for the happy-hour windows of promotions
+    STORE_TIMEZONE: str = "UTC"
+    # Largest discount a manager or admin may give by hand, as a percentage
+    # of the line; staff can't give any
+    MAX_MANUAL_DISCOUNT_PERCENT: float = 20.0
+    
+    # Snapshots and valuations only fold in movements at least this old. Ids
+    # are handed out at insert but rows appear at commit, so a newer movement
+    # may still have an earlier id in flight; longer than any transaction.
+    LEDGER_SETTLE_SECONDS: float = 60.0
+    
+    # Per-user tenant context (company, store, role, store ids) is cached this long
+    TENANT_CACHE_TTL_SECONDS: float = 60.0
+    
     # Pusher Settings
     PUSHER_APP_ID: str = ""
     PUSHER_KEY: str = ""
     PUSHER_SECRET: str = ""
     PUSHER_CLUSTER: str = "ap2"
+    # Realtime events are coalesced and published this often
+    REALTIME_FLUSH_SECONDS: float = 0.25
+    # SSE order stream: events kept per store for Last-Event-ID replay, and
+    # how often an idle connection gets a keepalive comment
+    ORDER_STREAM_BUFFER_SIZE: int = 500
+    ORDER_STREAM_KEEPALIVE_SECONDS: float = 15.0
+    
+    # Transactional outbox: claim batches of this size, retry with
+    # exponential backoff up to OUTBOX_MAX_ATTEMPTS. A claimed message is
+    # hidden from other workers for OUTBOX_LEASE_SECONDS.
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_BACKOFF_SECONDS: float = 5.0
+    OUTBOX_MAX_BACKOFF_SECONDS: float = 3600.0
+    OUTBOX_LEASE_SECONDS: float = 300.0
+    OUTBOX_POLL_SECONDS: float = 1.0
+    # Drain the outbox from a thread of the API process instead of running
+    # app.jobs.outbox_worker (local development and tests)
+    OUTBOX_IN_PROCESS: bool = False
     
     # Email Settings
     SMTP_TLS: bool = True
@@ -0,0 +1,46 @@
+"""
+Plain-text email over the SMTP_* settings.
+
+Only the outbox worker sends mail, so a slow or unreachable SMTP server
+delays a retry, never a request.
+"""
+import logging
+import smtplib
+from email.message import EmailMessage
+from typing import Iterable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def email_configured() -> bool:
+    return bool(settings.SMTP_HOST and settings.EMAILS_FROM_EMAIL)
+
+def send_email(to: Iterable[str], subject: str, body: str) -> bool:
+    """
+    Send one message to every address in `to`. Returns False without sending
+    when SMTP isn't configured; SMTP errors are raised so the caller can retry.
+    """
+    recipients = list(to)
+    if not recipients:
+        return False
+    if not email_configured():
+        logger.info(f"SMTP is not configured, not sending \"{subject}\" to {len(recipients)} recipient(s)")
+        return False
+
+    message = EmailMessage()
+    message["From"] = (
+        f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
+        if settings.EMAILS_FROM_NAME else settings.EMAILS_FROM_EMAIL
+    )
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body)
+
+    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT or 587, timeout=30) as smtp:
+        if settings.SMTP_TLS:
+            smtp.starttls()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        smtp.send_message(message)
+    return True
@@ -0,0 +1,107 @@
+"""
+Tenant context of authenticated requests.
+
+A TenantContext holds what authorization needs about the principal: the
+user's company, store and role, and the ids of the company's stores. It
+is cached per user, so a request authorizes without loading the user, and
+store ownership is a set lookup instead of a query. Rows are then read
+with CRUDBase.get_for_tenant, which puts the tenant into the WHERE clause:
+a row of another company is simply not found.
+
+Entries expire after TENANT_CACHE_TTL_SECONDS. User writes through
+crud_user drop the user's entry and store writes through crud_store
+(create, update, move, remove) drop the company's entries at once.
+Entries live in process memory: with several workers, another worker's
+write is only picked up when the TTL runs out.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.shards import session_shard
+from app.models.company import Store
+from app.models.user import User, UserRole
+
+@dataclass(frozen=True)
+class TenantContext:
+    user_id: int
+    email: str
+    company_id: int
+    store_id: Optional[int]
+    role: UserRole
+    is_active: bool
+    # Every store of the company
+    store_ids: FrozenSet[int]
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    def owns_store(self, store_id: int) -> bool:
+        return store_id in self.store_ids
+
+    def can_see_store(self, store_id: int) -> bool:
+        """Admins see every store of the company, other roles only their own"""
+        return self.owns_store(store_id) and (self.is_admin or store_id == self.store_id)
+
+class TenantCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # Keyed by (shard, user id): ids are only unique within a shard
+        self._entries: Dict[Tuple[str, int], Tuple[float, int, TenantContext]] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, *, user_id: int) -> Optional[TenantContext]:
+        """The user's context, or None for an unknown user"""
+        now = time.monotonic()
+        key = (session_shard(db), user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, version, context = entry
+                if expires_at > now and version == self._versions.get(context.company_id, 0):
+                    return context
+        user = db.execute(
+            select(User.id, User.email, User.company_id, User.store_id, User.role, User.is_active)
+            .where(User.id == user_id)
+        ).first()
+        if user is None:
+            return None
+        with self._lock:
+            version = self._versions.get(user.company_id, 0)
+        store_ids = frozenset(db.scalars(select(Store.id).where(Store.company_id == user.company_id)))
+        context = TenantContext(
+            user_id=user.id,
+            email=user.email,
+            company_id=user.company_id,
+            store_id=user.store_id,
+            role=UserRole(user.role),
+            is_active=bool(user.is_active),
+            store_ids=store_ids
+        )
+        with self._lock:
+            # A store write committed while loading leaves the entry stale already
+            if version == self._versions.get(user.company_id, 0):
+                self._entries[key] = (now + self.ttl, version, context)
+        return context
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == user_id]:
+                del self._entries[key]
+
+    def invalidate_company(self, company_id: int) -> None:
+        with self._lock:
+            self._versions[company_id] = self._versions.get(company_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+tenant_cache = TenantCache(settings.TENANT_CACHE_TTL_SECONDS)
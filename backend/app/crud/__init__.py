@@ -1,7 +1,29 @@
 from .crud_user import crud_user
 from .crud_company import crud_company
+from .crud_store import crud_store
+from .crud_item import crud_item, crud_category
+from .crud_recipe import crud_recipe
+from .crud_inventory import crud_inventory
+from .crud_batch import crud_batch
+from .crud_order import crud_order
+from .crud_payment import crud_payment
+from .crud_pricing import crud_price_list, crud_promotion
+from .crud_course import crud_course
+from .crud_enrollment import crud_enrollment
 
 __all__ = [
     "crud_user",
     "crud_company",
-] 
\ No newline at end of file
+    "crud_store",
+    "crud_item",
+    "crud_category",
+    "crud_recipe",
+    "crud_inventory",
+    "crud_batch",
+    "crud_order",
+    "crud_payment",
+    "crud_price_list",
+    "crud_promotion",
+    "crud_course",
+    "crud_enrollment",
+]
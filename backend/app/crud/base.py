@@ -3,13 +3,22 @@ from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from app.core.cache import catalog_versions
+from app.core.tenancy import TenantContext
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+def schema_columns(model: Type[Base], schema: Type[BaseModel]) -> list:
+    """Table columns that the response schema exposes"""
+    return [column for column in model.__table__.c if column.name in schema.model_fields]
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Set on CRUD objects whose rows are served by the catalog cache
+    catalog = False
+    
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -20,13 +29,32 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         self.model = model
     
+    def _touch_catalog(self, db: Session, db_obj: ModelType) -> None:
+        """Invalidate cached catalog responses of the object's company"""
+        if self.catalog:
+            catalog_versions.bump(db, db_obj.company_id)
+    
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
     
+    def get_for_tenant(self, db: Session, *, id: Any, tenant: TenantContext) -> Optional[ModelType]:
+        """
+        Get a row of the tenant, in one query: the company (or for rows
+        without one, the company's stores) is part of the WHERE clause, so
+        another company's row is not found rather than loaded and rejected.
+        """
+        if hasattr(self.model, "company_id"):
+            scope = self.model.company_id == tenant.company_id
+        elif hasattr(self.model, "store_id"):
+            scope = self.model.store_id.in_(tenant.store_ids)
+        else:
+            raise TypeError(f"{self.model.__name__} rows have no company or store")
+        return db.query(self.model).filter(self.model.id == id, scope).first()
+    
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return db.query(self.model).order_by(self.model.id).offset(skip).limit(limit).all()
     
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
@@ -34,6 +62,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        self._touch_catalog(db, db_obj)
         return db_obj
     
     def update(
@@ -54,10 +83,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        self._touch_catalog(db, db_obj)
         return db_obj
     
     def remove(self, db: Session, *, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
+        self._touch_catalog(db, obj)
         return obj
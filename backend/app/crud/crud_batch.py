@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.crud.crud_inventory import crud_inventory
+from app.models.inventory import MovementType
+from app.models.recipe import Batch
+from app.schemas.recipe import BatchCreate, BatchUpdate
+
+class CRUDBatch(CRUDBase[Batch, BatchCreate, BatchUpdate]):
+    def create(self, db: Session, *, obj_in: BatchCreate) -> Batch:
+        """Record a production batch and add its quantity to the store's stock"""
+        movement, = crud_inventory.adjust_many(
+            db,
+            adjustments=[{
+                "store_id": obj_in.store_id,
+                "item_id": obj_in.item_id,
+                "quantity": obj_in.quantity,
+                "unit": obj_in.unit,
+            }],
+            movement_type=MovementType.PRODUCTION,
+            reference_type="batch",
+            notes=f"Batch {obj_in.batch_number}" if obj_in.batch_number else None,
+            commit=False
+        )
+        db_obj = Batch(
+            **obj_in.dict(exclude={"item_id"}),
+            inventory_id=movement.inventory_id,
+            remaining_quantity=obj_in.quantity
+        )
+        db.add(db_obj)
+        db.flush()
+        movement.batch_id = db_obj.id
+        movement.reference_id = db_obj.id
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def get_expiring(
+        self, db: Session, *, store_id: int, hours: float = 24, skip: int = 0, limit: int = 100
+    ) -> List[Batch]:
+        """Batches with stock left that expire within `hours`, or already have, soonest first"""
+        return (
+            db.query(Batch)
+            .filter(
+                Batch.store_id == store_id,
+                Batch.expiry_date <= datetime.utcnow() + timedelta(hours=hours),
+                Batch.remaining_quantity > 0
+            )
+            .order_by(Batch.expiry_date)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+crud_batch = CRUDBatch(Batch)
@@ -1,12 +1,77 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, schema_columns
+from app.crud.crud_enrollment import crud_enrollment
 from app.models.academy import Course, CourseSection, Lesson
+from app.schemas import academy as academy_schemas
 from app.schemas.academy import CourseCreate, CourseUpdate
 
+# Tree read path: plain rows shaped like schemas.academy.Course
+_COURSE_COLUMNS = schema_columns(Course, academy_schemas.Course)
+_SECTION_COLUMNS = schema_columns(CourseSection, academy_schemas.CourseSection)
+_LESSON_COLUMNS = schema_columns(Lesson, academy_schemas.Lesson)
+
 class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
+    catalog = True
+
+    def get_multi_trees(
+        self, db: Session, *, company_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        A page of the company's courses with their sections and lessons, as
+        dicts shaped like schemas.academy.Course. Three queries in total.
+        """
+        rows = db.execute(
+            select(*_COURSE_COLUMNS)
+            .where(Course.company_id == company_id)
+            .order_by(Course.id)
+            .offset(skip)
+            .limit(limit)
+        ).mappings()
+        return self._attach_sections(db, [dict(row) for row in rows])
+
+    def get_trees(self, db: Session, *, course_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Course trees by id, in id order"""
+        if not course_ids:
+            return []
+        rows = db.execute(
+            select(*_COURSE_COLUMNS).where(Course.id.in_(list(course_ids))).order_by(Course.id)
+        ).mappings()
+        return self._attach_sections(db, [dict(row) for row in rows])
+
+    def _attach_sections(self, db: Session, courses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not courses:
+            return courses
+        course_ids = [course["id"] for course in courses]
+        by_course: Dict[int, List[Dict[str, Any]]] = {course_id: [] for course_id in course_ids}
+        by_section: Dict[int, List[Dict[str, Any]]] = {}
+        for row in db.execute(
+            select(*_SECTION_COLUMNS)
+            .where(CourseSection.course_id.in_(course_ids))
+            .order_by(CourseSection.course_id, CourseSection.order, CourseSection.id)
+        ).mappings():
+            section = dict(row)
+            section["lessons"] = by_section[section["id"]] = []
+            by_course[section["course_id"]].append(section)
+
+        if by_section:
+            # Joined on the section's course rather than an IN list of section ids
+            for row in db.execute(
+                select(*_LESSON_COLUMNS)
+                .join(CourseSection, CourseSection.id == Lesson.section_id)
+                .where(CourseSection.course_id.in_(course_ids))
+                .order_by(Lesson.section_id, Lesson.order, Lesson.id)
+            ).mappings():
+                by_section[row["section_id"]].append(dict(row))
+
+        for course in courses:
+            course["sections"] = by_course[course["id"]]
+        return courses
+
     def get_multi_by_company(
         self, db: Session, *, company_id: int, skip: int = 0, limit: int = 100
     ) -> List[Course]:
@@ -20,28 +85,19 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
 
     def create(self, db: Session, *, obj_in: CourseCreate) -> Course:
         obj_in_data = jsonable_encoder(obj_in, exclude={"sections"})
-        db_obj = Course(**obj_in_data)
+        db_obj = Course(
+            **obj_in_data, lesson_count=sum(len(section.lessons or []) for section in obj_in.sections or [])
+        )
+        # The whole tree goes in with one flush at commit
+        for section in obj_in.sections or []:
+            db_obj.sections.append(CourseSection(
+                **jsonable_encoder(section, exclude={"lessons"}),
+                lessons=[Lesson(**jsonable_encoder(lesson)) for lesson in section.lessons or []]
+            ))
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
-
-        # Create course sections if provided
-        if obj_in.sections:
-            for section in obj_in.sections:
-                section_data = jsonable_encoder(section, exclude={"lessons"})
-                db_section = CourseSection(**section_data, course_id=db_obj.id)
-                db.add(db_section)
-                db.commit()
-                db.refresh(db_section)
-
-                # Create lessons for each section if provided
-                if section.lessons:
-                    for lesson in section.lessons:
-                        lesson_data = jsonable_encoder(lesson)
-                        db_lesson = Lesson(**lesson_data, section_id=db_section.id)
-                        db.add(db_lesson)
-                    db.commit()
-
+        self._touch_catalog(db, db_obj)
         return db_obj
 
     def update(
@@ -49,39 +105,138 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
     ) -> Course:
         obj_data = jsonable_encoder(db_obj)
         update_data = obj_in.dict(exclude_unset=True)
+        update_data.pop("company_id", None)
 
-        # Update sections if provided
-        if "sections" in update_data:
-            # Remove existing sections and their lessons
-            for section in db_obj.sections:
-                db.query(Lesson).filter(Lesson.section_id == section.id).delete()
-            db.query(CourseSection).filter(CourseSection.course_id == db_obj.id).delete()
-            
-            # Add new sections and lessons
-            for section in update_data["sections"]:
-                section_data = jsonable_encoder(section, exclude={"lessons"})
-                db_section = CourseSection(**section_data, course_id=db_obj.id)
-                db.add(db_section)
-                db.commit()
-                db.refresh(db_section)
-
-                if section.lessons:
-                    for lesson in section.lessons:
-                        lesson_data = jsonable_encoder(lesson)
-                        db_lesson = Lesson(**lesson_data, section_id=db_section.id)
-                        db.add(db_lesson)
-                    db.commit()
-            
-            del update_data["sections"]
-
-        # Update course fields
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        try:
+            sections = update_data.pop("sections", None)
+            if sections is not None:
+                self._sync_sections(db, course_id=db_obj.id, sections=sections)
 
-        db.add(db_obj)
-        db.commit()
+            # Update course fields
+            for field in obj_data:
+                if field in update_data:
+                    setattr(db_obj, field, update_data[field])
+            # Cached course trees are keyed by version, so bump it even when
+            # only the sections changed. In SQL, so concurrent updates both count.
+            db_obj.version = Course.version + 1
+            db_obj.updated_at = datetime.utcnow()
+
+            db.add(db_obj)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
         db.refresh(db_obj)
+        self._touch_catalog(db, db_obj)
         return db_obj
 
+    def _sync_sections(self, db: Session, *, course_id: int, sections: List[Dict[str, Any]]) -> None:
+        """
+        Make the course's sections and lessons match `sections` with the
+        fewest statements. Sections and lessons that carry an id are matched
+        to the stored rows and only their changed fields are written; those
+        without one are inserted; stored ones left out are deleted, along
+        with the progress recorded on deleted lessons. A section submitted
+        without `lessons` keeps its lessons. Nothing is committed.
+        """
+        stored_sections = {
+            row["id"]: row for row in db.execute(
+                select(*_SECTION_COLUMNS).where(CourseSection.course_id == course_id)
+            ).mappings()
+        }
+        stored_lessons = {
+            row["id"]: row for row in db.execute(
+                select(*_LESSON_COLUMNS)
+                .join(CourseSection, CourseSection.id == Lesson.section_id)
+                .where(CourseSection.course_id == course_id)
+            ).mappings()
+        }
+
+        # Check every id before writing anything
+        seen_sections, seen_lessons = set(), set()
+        for section in sections:
+            section_id = section.get("id")
+            if section_id is not None:
+                if section_id not in stored_sections:
+                    raise ValueError(f"Section {section_id} does not belong to course {course_id}")
+                if section_id in seen_sections:
+                    raise ValueError(f"Section {section_id} is listed more than once")
+                seen_sections.add(section_id)
+            for lesson in section.get("lessons") or []:
+                lesson_id = lesson.get("id")
+                if lesson_id is None:
+                    continue
+                if lesson_id not in stored_lessons:
+                    raise ValueError(f"Lesson {lesson_id} does not belong to course {course_id}")
+                if lesson_id in seen_lessons:
+                    raise ValueError(f"Lesson {lesson_id} is listed more than once")
+                seen_lessons.add(lesson_id)
+
+        # New sections need their ids before lessons can point at them
+        created = []
+        for section in sections:
+            if section.get("id") is None:
+                fields = {key: value for key, value in section.items() if key not in ("id", "lessons")}
+                created.append(CourseSection(**fields, course_id=course_id))
+        if created:
+            db.add_all(created)
+            db.flush()
+        new_ids = iter(db_section.id for db_section in created)
+
+        section_updates: List[Dict[str, Any]] = []
+        lesson_inserts: List[Dict[str, Any]] = []
+        lesson_updates: List[Dict[str, Any]] = []
+        replaced_lessons = set()  # sections whose lesson list was submitted
+        for section in sections:
+            section_id = section.get("id")
+            if section_id is None:
+                section_id = next(new_ids)
+            else:
+                stored = stored_sections[section_id]
+                changes = {
+                    key: value for key, value in section.items()
+                    if key not in ("id", "lessons") and stored[key] != value
+                }
+                if changes:
+                    section_updates.append({"id": section_id, **changes})
+
+            if section.get("lessons") is None:
+                continue
+            replaced_lessons.add(section_id)
+            for lesson in section["lessons"]:
+                fields = {key: value for key, value in lesson.items() if key != "id"}
+                lesson_id = lesson.get("id")
+                if lesson_id is None:
+                    lesson_inserts.append({**fields, "section_id": section_id})
+                    continue
+                stored = stored_lessons[lesson_id]
+                changes = {key: value for key, value in fields.items() if stored[key] != value}
+                if stored["section_id"] != section_id:
+                    changes["section_id"] = section_id
+                if changes:
+                    lesson_updates.append({"id": lesson_id, **changes})
+
+        removed_sections = stored_sections.keys() - seen_sections
+        removed_lessons = [
+            lesson_id for lesson_id, stored in stored_lessons.items()
+            if lesson_id not in seen_lessons
+            and (stored["section_id"] in replaced_lessons or stored["section_id"] in removed_sections)
+        ]
+
+        if section_updates:
+            db.execute(update(CourseSection), section_updates)
+        if lesson_inserts:
+            db.execute(insert(Lesson), lesson_inserts)
+        if lesson_updates:
+            db.execute(update(Lesson), lesson_updates)
+        if removed_lessons:
+            crud_enrollment.remove_lessons(db, lesson_ids=removed_lessons)
+            db.execute(delete(Lesson).where(Lesson.id.in_(removed_lessons)))
+        if removed_sections:
+            db.execute(delete(CourseSection).where(CourseSection.id.in_(list(removed_sections))))
+        if lesson_inserts or removed_lessons:
+            crud_enrollment.refresh_course(db, course_id=course_id)
+        # The bulk statements bypass the identity map
+        db.expire_all()
+
 crud_course = CRUDCourse(Course) 
\ No newline at end of file
@@ -0,0 +1,195 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from sqlalchemy import and_, bindparam, case, delete, func, literal, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.academy import (
+    Course,
+    CourseEnrollment,
+    CourseSection,
+    EnrollmentStatus,
+    Lesson,
+    LessonProgress
+)
+from app.schemas.academy import CourseEnrollmentCreate, CourseEnrollmentUpdate
+
+def _progress_values(completed) -> Dict[str, Any]:
+    """
+    SET values that derive an enrollment's progress, status and completion
+    time from `completed` lessons and the course's lesson_count
+    """
+    lesson_count = (
+        select(Course.lesson_count).where(Course.id == CourseEnrollment.course_id).scalar_subquery()
+    )
+    finished = and_(lesson_count > 0, completed >= lesson_count)
+    return {
+        "progress": case(
+            (finished, 100.0),
+            (lesson_count > 0, completed * 100.0 / lesson_count),
+            else_=0.0
+        ),
+        "status": case(
+            (and_(finished, CourseEnrollment.status == EnrollmentStatus.ACTIVE),
+             literal(EnrollmentStatus.COMPLETED, CourseEnrollment.status.type)),
+            else_=CourseEnrollment.status
+        ),
+        "completed_at": case(
+            (and_(finished, CourseEnrollment.completed_at.is_(None)), func.now()),
+            else_=CourseEnrollment.completed_at
+        ),
+    }
+
+def _upsert_statement(dialect: str):
+    table = LessonProgress.__table__
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(
+            last_position=stmt.inserted.last_position,
+            progress=func.greatest(table.c.progress, stmt.inserted.progress),
+            updated_at=func.now()
+        )
+    stmt = sqlite.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.enrollment_id, table.c.lesson_id],
+        set_={
+            "last_position": stmt.excluded.last_position,
+            # Two-argument max() is SQLite's scalar maximum
+            "progress": func.max(table.c.progress, stmt.excluded.progress),
+            "updated_at": func.now(),
+        }
+    )
+
+class CRUDEnrollment(CRUDBase[CourseEnrollment, CourseEnrollmentCreate, CourseEnrollmentUpdate]):
+    def get_user_lessons(
+        self, db: Session, *, user_id: int, pairs: Iterable[Tuple[int, int]]
+    ) -> Set[Tuple[int, int]]:
+        """
+        The (enrollment_id, lesson_id) pairs of `pairs` where the enrollment
+        belongs to the user and the lesson to the enrolled course
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return set()
+        rows = db.execute(
+            select(CourseEnrollment.id, Lesson.id)
+            .join(CourseSection, CourseSection.course_id == CourseEnrollment.course_id)
+            .join(Lesson, Lesson.section_id == CourseSection.id)
+            .where(
+                CourseEnrollment.id.in_({enrollment_id for enrollment_id, _ in pairs}),
+                CourseEnrollment.user_id == user_id,
+                Lesson.id.in_({lesson_id for _, lesson_id in pairs})
+            )
+        ).tuples()
+        return {tuple(row) for row in rows} & set(pairs)
+
+    def record_progress(
+        self, db: Session, *, heartbeats: List[Dict[str, Any]], commit: bool = True
+    ) -> int:
+        """
+        Write coalesced heartbeats, one per (enrollment_id, lesson_id), with a
+        bulk upsert: last_position is replaced and progress only grows.
+        Lessons reported completed for the first time are marked with a
+        guarded UPDATE whose row count feeds the enrollment's
+        completed_lessons counter, so progress never re-scans the course.
+        Returns the number of newly completed lessons.
+        """
+        if not heartbeats:
+            return 0
+        now = datetime.utcnow()
+        db.execute(_upsert_statement(db.get_bind().dialect.name), [
+            {
+                "enrollment_id": heartbeat["enrollment_id"],
+                "lesson_id": heartbeat["lesson_id"],
+                "last_position": heartbeat["last_position"],
+                "progress": heartbeat["progress"],
+                "is_completed": False,
+                "created_at": now,
+            }
+            for heartbeat in heartbeats
+        ])
+
+        completed_lessons: Dict[int, List[int]] = {}
+        for heartbeat in heartbeats:
+            if heartbeat["is_completed"]:
+                completed_lessons.setdefault(heartbeat["enrollment_id"], []).append(heartbeat["lesson_id"])
+        newly_completed: Dict[int, int] = {}
+        for enrollment_id, lesson_ids in completed_lessons.items():
+            # Only rows that weren't completed yet count, so a repeated or
+            # concurrent report can't count a lesson twice
+            result = db.execute(
+                update(LessonProgress)
+                .where(
+                    LessonProgress.enrollment_id == enrollment_id,
+                    LessonProgress.lesson_id.in_(lesson_ids),
+                    LessonProgress.is_completed.isnot(True)
+                )
+                .values(is_completed=True, progress=100.0, completed_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                newly_completed[enrollment_id] = result.rowcount
+        self.add_completed(db, completed=newly_completed)
+
+        if commit:
+            db.commit()
+        return sum(newly_completed.values())
+
+    def add_completed(self, db: Session, *, completed: Dict[int, int]) -> None:
+        """Add to the completed_lessons counter of each enrollment id, and refresh its progress"""
+        if not completed:
+            return
+        table = CourseEnrollment.__table__
+        new_count = table.c.completed_lessons + bindparam("b_completed")
+        # MySQL evaluates SET assignments left to right against the updated
+        # row, so the counter goes last and the others use the old value
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .ordered_values(
+                *_progress_values(new_count).items(),
+                ("updated_at", func.now()),
+                ("completed_lessons", new_count)
+            ),
+            [{"b_id": enrollment_id, "b_completed": count} for enrollment_id, count in completed.items()]
+        )
+
+    def remove_lessons(self, db: Session, *, lesson_ids: List[int]) -> None:
+        """
+        Delete the progress recorded on lessons that are about to be deleted,
+        taking their completions off the enrollment counters
+        """
+        counts = dict(db.execute(
+            select(LessonProgress.enrollment_id, func.count())
+            .where(LessonProgress.lesson_id.in_(lesson_ids), LessonProgress.is_completed.is_(True))
+            .group_by(LessonProgress.enrollment_id)
+        ).tuples().all())
+        self.add_completed(db, completed={enrollment_id: -count for enrollment_id, count in counts.items()})
+        db.execute(
+            delete(LessonProgress)
+            .where(LessonProgress.lesson_id.in_(lesson_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    def refresh_course(self, db: Session, *, course_id: int) -> None:
+        """Recount a course's lessons after its tree changed and rescale its enrollments' progress"""
+        db.execute(
+            update(Course)
+            .where(Course.id == course_id)
+            .values(lesson_count=(
+                select(func.count(Lesson.id))
+                .join(CourseSection, CourseSection.id == Lesson.section_id)
+                .where(CourseSection.course_id == course_id)
+                .scalar_subquery()
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(CourseEnrollment)
+            .where(CourseEnrollment.course_id == course_id)
+            .values(**_progress_values(CourseEnrollment.completed_lessons))
+            .execution_options(synchronize_session=False)
+        )
+
+crud_enrollment = CRUDEnrollment(CourseEnrollment)
@@ -1,14 +1,102 @@
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Iterable, Tuple, Union
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, case, func, insert, select, tuple_, update
+from sqlalchemy.dialects import mysql, sqlite
 
-from app.crud.base import CRUDBase
-from app.models.inventory import Inventory, InventoryMovement
+from app.core import metrics
+from app.core.config import settings
+from app.crud.base import CRUDBase, schema_columns
+from app.crud.crud_store import scope_to_store
+from app.models.inventory import Inventory, InventoryMovement, InventorySnapshot, MovementType
+from app.models.recipe import Batch
+from app.schemas import inventory as inventory_schemas
 from app.schemas.inventory import (
     InventoryCreate,
     InventoryUpdate,
     InventoryMovementCreate
 )
+from app.models.item import Item
+from app.services import realtime, stock_alerts
+
+# Fast read path: plain rows shaped like schemas.inventory.Inventory
+_INVENTORY_COLUMNS = schema_columns(Inventory, inventory_schemas.Inventory)
+
+def signed_quantity(movement_type: MovementType, quantity: float) -> float:
+    """
+    Change in stock for a movement. Sales are recorded as positive quantities
+    and subtract; every other type adds, so transfers and adjustments carry
+    their own sign.
+    """
+    return -quantity if movement_type == MovementType.SALE else quantity
+
+# signed_quantity as a SQL expression, for summing the ledger in the database
+_SIGNED_QUANTITY = case(
+    (InventoryMovement.movement_type == MovementType.SALE, -InventoryMovement.quantity),
+    else_=InventoryMovement.quantity
+)
+
+def _utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def settled_movement_id(db: Session, *, settle_seconds: Optional[float] = None) -> Optional[int]:
+    """
+    Newest movement recorded at least `settle_seconds` ago (default
+    LEDGER_SETTLE_SECONDS), or None. Every movement with a lower id has
+    committed by then, so cursors over the ledger can safely stop here;
+    one that stops at max(id) could skip a lower id that commits later.
+    """
+    if settle_seconds is None:
+        settle_seconds = settings.LEDGER_SETTLE_SECONDS
+    newest = db.scalar(select(func.max(InventoryMovement.id)))
+    if newest is None:
+        return None
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    # Walks the primary key down from the newest id, so it only reads the unsettled tail
+    return db.scalar(
+        select(InventoryMovement.id)
+        .where(InventoryMovement.id <= newest, InventoryMovement.created_at <= cutoff)
+        .order_by(InventoryMovement.id.desc())
+        .limit(1)
+    )
+
+def _upsert_statement(dialect: str, rows: List[Dict[str, Any]], column: str = "quantity"):
+    """
+    INSERT that adds `column` (quantity or reserved_quantity) to an existing
+    (store_id, item_id) row instead of failing on the unique index.
+    """
+    current = getattr(Inventory, column)
+    if dialect == "mysql":
+        stmt = mysql.insert(Inventory).values(rows)
+        return stmt.on_duplicate_key_update(
+            {column: current + stmt.inserted[column], "updated_at": func.now()}
+        )
+    stmt = sqlite.insert(Inventory).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[Inventory.store_id, Inventory.item_id],
+        set_={column: current + stmt.excluded[column], "updated_at": func.now()}
+    )
+
+def _stock_changed(
+    db: Session,
+    *,
+    inventory_id: int,
+    store_id: int,
+    item_id: int,
+    quantity: float,
+    change: float,
+    reorder_point: Optional[float]
+) -> None:
+    """Post-commit side effects of a stock change: the realtime event and a low-stock alert"""
+    realtime.emit_stock(db, inventory_id=inventory_id, store_id=store_id, item_id=item_id, quantity=quantity)
+    stock_alerts.check_low_stock(
+        db, inventory_id=inventory_id, store_id=store_id, item_id=item_id,
+        quantity=quantity, change=change, reorder_point=reorder_point
+    )
 
 class CRUDInventory(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
     def get_store_inventory(
@@ -22,6 +110,23 @@ class CRUDInventory(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
             .all()
         )
 
+    def get_store_inventory_rows(
+        self,
+        db: Session,
+        *,
+        store_id: int,
+        include_sub_stores: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Same rows as get_store_inventory as plain dicts, for ORJSONResponse.
+        With `include_sub_stores`, the rows of every store below it too.
+        """
+        query = scope_to_store(select(*_INVENTORY_COLUMNS), Inventory.store_id, store_id, include_sub_stores)
+        query = query.offset(skip).limit(limit)
+        return [dict(row) for row in db.execute(query).mappings()]
+
     def get_item_inventory(
         self, db: Session, *, item_id: int, store_id: int
     ) -> Optional[Inventory]:
@@ -30,82 +135,407 @@ class CRUDInventory(CRUDBase[Inventory, InventoryCreate, InventoryUpdate]):
                 Inventory.item_id == item_id,
                 Inventory.store_id == store_id
             )
-        ).first()
+        ).one_or_none()
+
+    def get_store_inventory_as_of(
+        self,
+        db: Session,
+        *,
+        store_id: int,
+        as_of: datetime,
+        include_sub_stores: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """get_store_inventory_rows with each quantity as it stood at `as_of`"""
+        as_of = _utc(as_of)
+        query = (
+            scope_to_store(select(*_INVENTORY_COLUMNS), Inventory.store_id, store_id, include_sub_stores)
+            .where(Inventory.created_at <= as_of)
+            .offset(skip)
+            .limit(limit)
+        )
+        rows = [dict(row) for row in db.execute(query).mappings()]
+        balances = self.ledger_balances(db, inventory_ids=[row["id"] for row in rows], as_of=as_of)
+        for row in rows:
+            row["quantity"] = balances.get(row["id"], 0.0)
+        return rows
+
+    def ledger_balances(
+        self, db: Session, *, inventory_ids: List[int], as_of: Optional[datetime] = None
+    ) -> Dict[int, float]:
+        """
+        Stock per inventory row according to the movement ledger, optionally
+        at a past time: the newest usable snapshot plus the movements after it,
+        so the cost doesn't grow with the length of the ledger.
+        """
+        if not inventory_ids:
+            return {}
+        latest = select(
+            InventorySnapshot.inventory_id,
+            func.max(InventorySnapshot.last_movement_id).label("last_movement_id")
+        ).where(InventorySnapshot.inventory_id.in_(inventory_ids))
+        if as_of is not None:
+            latest = latest.where(InventorySnapshot.taken_at <= _utc(as_of))
+        latest = latest.group_by(InventorySnapshot.inventory_id).subquery()
+
+        balances = dict(db.execute(
+            select(InventorySnapshot.inventory_id, InventorySnapshot.quantity).join(
+                latest,
+                and_(
+                    InventorySnapshot.inventory_id == latest.c.inventory_id,
+                    InventorySnapshot.last_movement_id == latest.c.last_movement_id
+                )
+            )
+        ).all())
+
+        delta = (
+            select(InventoryMovement.inventory_id, func.sum(_SIGNED_QUANTITY))
+            .outerjoin(latest, latest.c.inventory_id == InventoryMovement.inventory_id)
+            .where(
+                InventoryMovement.inventory_id.in_(inventory_ids),
+                InventoryMovement.id > func.coalesce(latest.c.last_movement_id, 0)
+            )
+        )
+        if as_of is not None:
+            delta = delta.where(InventoryMovement.created_at <= _utc(as_of))
+        for inventory_id, quantity in db.execute(delta.group_by(InventoryMovement.inventory_id)):
+            balances[inventory_id] = balances.get(inventory_id, 0.0) + quantity
+        return balances
+
+    def take_snapshots(
+        self,
+        db: Session,
+        *,
+        min_movements: int = 1,
+        chunk_size: int = 1000,
+        settle_seconds: Optional[float] = None
+    ) -> int:
+        """
+        Snapshot every inventory row with at least `min_movements` movements
+        since its last snapshot. Each new balance is the previous snapshot
+        plus those movements, so a run only reads the new part of the ledger.
+        Movements newer than `settle_seconds` wait for the next run (see
+        settled_movement_id). Commits once per chunk and returns the number
+        of snapshots taken.
+        """
+        upto = settled_movement_id(db, settle_seconds=settle_seconds)
+        if upto is None:
+            return 0
+        latest = (
+            select(
+                InventorySnapshot.inventory_id,
+                func.max(InventorySnapshot.last_movement_id).label("last_movement_id")
+            )
+            .group_by(InventorySnapshot.inventory_id)
+            .subquery()
+        )
+        pending = db.execute(
+            select(
+                InventoryMovement.inventory_id,
+                latest.c.last_movement_id.label("previous_movement_id"),
+                func.sum(_SIGNED_QUANTITY).label("delta"),
+                func.max(InventoryMovement.id).label("last_movement_id"),
+                func.max(InventoryMovement.created_at).label("taken_at")
+            )
+            .outerjoin(latest, latest.c.inventory_id == InventoryMovement.inventory_id)
+            .where(
+                InventoryMovement.id > func.coalesce(latest.c.last_movement_id, 0),
+                InventoryMovement.id <= upto
+            )
+            .group_by(InventoryMovement.inventory_id, latest.c.last_movement_id)
+            .having(func.count() >= min_movements)
+        ).all()
+
+        taken = 0
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            keys = [(row.inventory_id, row.previous_movement_id) for row in chunk if row.previous_movement_id]
+            previous = dict(db.execute(
+                select(InventorySnapshot.inventory_id, InventorySnapshot.quantity).where(
+                    tuple_(InventorySnapshot.inventory_id, InventorySnapshot.last_movement_id).in_(keys)
+                )
+            ).all()) if keys else {}
+            db.execute(insert(InventorySnapshot), [
+                {
+                    "inventory_id": row.inventory_id,
+                    "quantity": previous.get(row.inventory_id, 0.0) + row.delta,
+                    "last_movement_id": row.last_movement_id,
+                    "taken_at": row.taken_at,
+                }
+                for row in chunk
+            ])
+            db.commit()
+            taken += len(chunk)
+        return taken
+
+    def create(self, db: Session, *, obj_in: InventoryCreate) -> Inventory:
+        db_obj = Inventory(**jsonable_encoder(obj_in))
+        db.add(db_obj)
+        db.flush()
+        # The ledger explains every unit of stock, starting with the opening balance
+        if db_obj.quantity:
+            db.add(InventoryMovement(
+                inventory_id=db_obj.id,
+                movement_type=MovementType.ADJUSTMENT,
+                quantity=db_obj.quantity,
+                unit=db_obj.unit,
+                notes="Opening balance"
+            ))
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Inventory,
+        obj_in: Union[InventoryUpdate, Dict[str, Any]]
+    ) -> Inventory:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        if update_data.get("quantity") is not None and update_data["quantity"] != db_obj.quantity:
+            # Setting the quantity directly is a stock count correction
+            db.add(InventoryMovement(
+                inventory_id=db_obj.id,
+                movement_type=MovementType.ADJUSTMENT,
+                quantity=update_data["quantity"] - (db_obj.quantity or 0),
+                unit=update_data.get("unit") or db_obj.unit,
+                notes="Stock count"
+            ))
+            _stock_changed(
+                db, inventory_id=db_obj.id, store_id=db_obj.store_id, item_id=db_obj.item_id,
+                quantity=update_data["quantity"], change=update_data["quantity"] - (db_obj.quantity or 0),
+                reorder_point=db_obj.item.reorder_point
+            )
+        return super().update(db, db_obj=db_obj, obj_in=obj_in)
 
     def create_movement(
         self, db: Session, *, obj_in: InventoryMovementCreate
     ) -> InventoryMovement:
+        if obj_in.batch_id is not None:
+            # The batch must hold stock of this very row, i.e. the same company, store and item
+            batch_inventory_id = db.scalar(select(Batch.inventory_id).where(Batch.id == obj_in.batch_id))
+            if batch_inventory_id is None or batch_inventory_id != obj_in.inventory_id:
+                raise ValueError(f"Batch {obj_in.batch_id} does not belong to inventory {obj_in.inventory_id}")
         db_obj = InventoryMovement(**obj_in.dict())
         db.add(db_obj)
         
-        # Update inventory quantity
-        inventory = db.query(Inventory).get(obj_in.inventory_id)
-        if obj_in.movement_type in ["sale", "transfer_out", "adjustment_out"]:
-            inventory.quantity -= obj_in.quantity
-        else:
-            inventory.quantity += obj_in.quantity
+        # Update inventory quantity in place, without reading it first
+        change = signed_quantity(obj_in.movement_type, obj_in.quantity)
+        db.execute(
+            update(Inventory)
+            .where(Inventory.id == obj_in.inventory_id)
+            .values(quantity=Inventory.quantity + change)
+        )
+        if obj_in.batch_id is not None:
+            db.execute(
+                update(Batch)
+                .where(Batch.id == obj_in.batch_id)
+                .values(remaining_quantity=Batch.remaining_quantity + change)
+            )
+        elif obj_in.movement_type == MovementType.SALE:
+            self.allocate_fefo(db, quantities={obj_in.inventory_id: obj_in.quantity})
+        stock = db.execute(
+            select(Inventory.store_id, Inventory.item_id, Inventory.quantity, Item.reorder_point)
+            .join(Item, Item.id == Inventory.item_id)
+            .where(Inventory.id == obj_in.inventory_id)
+        ).one()
+        _stock_changed(db, inventory_id=obj_in.inventory_id, change=change, **stock._asdict())
         
         db.commit()
         db.refresh(db_obj)
+        metrics.inventory_movements_total.inc(MovementType(obj_in.movement_type).value)
         return db_obj
 
-    def transfer_stock(
+    def adjust_many(
         self,
         db: Session,
         *,
-        from_store_id: int,
-        to_store_id: int,
-        items: List[Dict[str, Any]]
+        adjustments: Iterable[Dict[str, Any]],
+        movement_type: MovementType,
+        notes: Optional[str] = None,
+        reference_id: Optional[int] = None,
+        reference_type: Optional[str] = None,
+        allow_negative: bool = True,
+        commit: bool = True
     ) -> List[InventoryMovement]:
-        movements = []
-        for item in items:
-            # Remove from source store
-            from_inventory = self.get_item_inventory(
-                db, item_id=item["item_id"], store_id=from_store_id
-            )
-            if not from_inventory or from_inventory.quantity < item["quantity"]:
-                db.rollback()
-                raise ValueError(f"Insufficient stock for item {item['item_id']}")
-            
-            out_movement = self.create_movement(
-                db,
-                obj_in=InventoryMovementCreate(
-                    inventory_id=from_inventory.id,
-                    movement_type="transfer_out",
-                    quantity=item["quantity"],
-                    unit=item["unit"],
-                    notes=f"Transfer to store {to_store_id}"
+        """
+        Apply stock changes to many (store, item) rows with a single upsert and
+        record one movement per row. Each adjustment is
+        {store_id, item_id, quantity, unit}, where quantity is the signed
+        change in stock; rows that don't exist yet are created. An
+        adjustment may carry its own reference_id, which then gets a
+        movement of its own.
+
+        With allow_negative=False, a change that leaves a row below zero
+        rolls everything back and raises ValueError.
+        """
+        deltas: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        lines: Dict[Tuple[int, int, Optional[int]], Dict[str, Any]] = {}
+        for adjustment in adjustments:
+            key = (adjustment["store_id"], adjustment["item_id"])
+            if key in deltas:
+                deltas[key]["quantity"] += adjustment["quantity"]
+            else:
+                deltas[key] = {
+                    "store_id": key[0],
+                    "item_id": key[1],
+                    "quantity": adjustment["quantity"],
+                    "unit": adjustment["unit"],
+                }
+            line_key = key + (adjustment.get("reference_id", reference_id),)
+            if line_key in lines:
+                lines[line_key]["quantity"] += adjustment["quantity"]
+            else:
+                lines[line_key] = {"quantity": adjustment["quantity"], "unit": adjustment["unit"]}
+        if not deltas:
+            return []
+
+        db.execute(_upsert_statement(db.get_bind().dialect.name, list(deltas.values())))
+        rows = {
+            (row.store_id, row.item_id): row
+            for row in db.execute(
+                select(Inventory.id, Inventory.store_id, Inventory.item_id, Inventory.quantity, Item.reorder_point)
+                .join(Item, Item.id == Inventory.item_id)
+                .where(
+                    # SQLite can't use the index for a row-value IN alone
+                    Inventory.store_id.in_({store_id for store_id, _ in deltas}),
+                    tuple_(Inventory.store_id, Inventory.item_id).in_(list(deltas))
                 )
             )
-            movements.append(out_movement)
-            
-            # Add to destination store
-            to_inventory = self.get_item_inventory(
-                db, item_id=item["item_id"], store_id=to_store_id
+        }
+        if not allow_negative:
+            for key, delta in deltas.items():
+                if delta["quantity"] < 0 and rows[key].quantity < 0:
+                    db.rollback()
+                    raise ValueError(f"Insufficient stock for item {key[1]}")
+
+        if movement_type == MovementType.SALE:
+            self.allocate_fefo(db, quantities={
+                rows[key].id: -delta["quantity"] for key, delta in deltas.items() if delta["quantity"] < 0
+            })
+
+        movements = [
+            InventoryMovement(
+                inventory_id=rows[(store_id, item_id)].id,
+                movement_type=movement_type,
+                quantity=signed_quantity(movement_type, line["quantity"]),
+                unit=line["unit"],
+                reference_id=line_reference_id,
+                reference_type=reference_type,
+                notes=notes
             )
-            if not to_inventory:
-                to_inventory = self.create(
-                    db,
-                    obj_in=InventoryCreate(
-                        store_id=to_store_id,
-                        item_id=item["item_id"],
-                        quantity=0,
-                        unit=item["unit"]
-                    )
-                )
-            
-            in_movement = self.create_movement(
-                db,
-                obj_in=InventoryMovementCreate(
-                    inventory_id=to_inventory.id,
-                    movement_type="transfer_in",
-                    quantity=item["quantity"],
-                    unit=item["unit"],
-                    notes=f"Transfer from store {from_store_id}"
-                )
+            for (store_id, item_id, line_reference_id), line in lines.items()
+        ]
+        db.add_all(movements)
+        for key, row in rows.items():
+            _stock_changed(
+                db, inventory_id=row.id, store_id=row.store_id, item_id=row.item_id,
+                quantity=row.quantity, change=deltas[key]["quantity"], reorder_point=row.reorder_point
             )
-            movements.append(in_movement)
-        
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        metrics.inventory_movements_total.inc(MovementType(movement_type).value, amount=len(movements))
+        return movements
+
+    def reserve_many(self, db: Session, *, reservations: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add to the reserved quantity of many (store, item) rows with a single
+        upsert. Each reservation is {store_id, item_id, quantity, unit}; a
+        negative quantity releases stock. Stock itself doesn't move and no
+        movement is recorded. Doesn't commit. Returns the number of rows.
+        """
+        totals: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for reservation in reservations:
+            key = (reservation["store_id"], reservation["item_id"])
+            if key in totals:
+                totals[key]["reserved_quantity"] += reservation["quantity"]
+            else:
+                totals[key] = {
+                    "store_id": key[0],
+                    "item_id": key[1],
+                    "reserved_quantity": reservation["quantity"],
+                    "unit": reservation["unit"],
+                }
+        rows = [row for row in totals.values() if row["reserved_quantity"]]
+        if rows:
+            db.execute(_upsert_statement(db.get_bind().dialect.name, rows, column="reserved_quantity"))
+        return len(rows)
+
+    def allocate_fefo(self, db: Session, *, quantities: Dict[int, float]) -> None:
+        """
+        Take sold quantities ({inventory_id: quantity}) out of the inventory
+        rows' batches, first expired first out, in a single UPDATE. A running
+        total over the batches in expiry order tells how much every earlier
+        batch already covers; each batch gives what is left of the request,
+        up to its remaining quantity. Stock beyond the batches' remaining
+        quantities is unbatched and left alone. Doesn't commit.
+        """
+        quantities = {inventory_id: quantity for inventory_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return
+        wanted = case(quantities, value=Batch.inventory_id)
+        covered_before = func.sum(Batch.remaining_quantity).over(
+            partition_by=Batch.inventory_id,
+            # no NULLS LAST on MySQL: batches without an expiry date go last
+            order_by=(Batch.expiry_date.is_(None), Batch.expiry_date, Batch.id)
+        ) - Batch.remaining_quantity
+        ranked = (
+            select(
+                Batch.id,
+                Batch.remaining_quantity.label("remaining"),
+                wanted.label("wanted"),
+                covered_before.label("covered_before")
+            )
+            .where(Batch.inventory_id.in_(list(quantities)), Batch.remaining_quantity > 0)
+            .subquery()
+        )
+        taken = case(
+            (ranked.c.covered_before + ranked.c.remaining <= ranked.c.wanted, ranked.c.remaining),
+            else_=ranked.c.wanted - ranked.c.covered_before
+        )
+        db.execute(
+            update(Batch)
+            .where(Batch.id == ranked.c.id, ranked.c.covered_before < ranked.c.wanted)
+            .values(remaining_quantity=Batch.remaining_quantity - taken)
+            .execution_options(synchronize_session=False)
+        )
+
+    def transfer_stock(
+        self,
+        db: Session,
+        *,
+        from_store_id: int,
+        to_store_id: int,
+        items: List[Dict[str, Any]]
+    ) -> List[InventoryMovement]:
+        movements = self.adjust_many(
+            db,
+            adjustments=[
+                {"store_id": from_store_id, "item_id": item["item_id"],
+                 "quantity": -item["quantity"], "unit": item["unit"]}
+                for item in items
+            ],
+            movement_type=MovementType.TRANSFER,
+            notes=f"Transfer to store {to_store_id}",
+            allow_negative=False,
+            commit=False
+        )
+        movements += self.adjust_many(
+            db,
+            adjustments=[
+                {"store_id": to_store_id, "item_id": item["item_id"],
+                 "quantity": item["quantity"], "unit": item["unit"]}
+                for item in items
+            ],
+            movement_type=MovementType.TRANSFER,
+            notes=f"Transfer from store {from_store_id}",
+            commit=False
+        )
+        db.commit()
         return movements
 
 crud_inventory = CRUDInventory(Inventory)
@@ -1,12 +1,15 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, literal, select, update
 
 from app.crud.base import CRUDBase
 from app.models.item import Item, Category
+from app.models.recipe import Recipe
 from app.schemas.item import ItemCreate, ItemUpdate, CategoryCreate, CategoryUpdate
 
 class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
+    catalog = True
+
     def get_by_barcode(self, db: Session, *, barcode: str) -> Optional[Item]:
         return db.query(Item).filter(Item.barcode == barcode).first()
 
@@ -16,6 +19,7 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         return (
             db.query(Item)
             .filter(Item.company_id == company_id)
+            .order_by(Item.name, Item.id)
             .offset(skip)
             .limit(limit)
             .all()
@@ -27,6 +31,24 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         return (
             db.query(Item)
             .filter(Item.category_id == category_id)
+            .order_by(Item.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_subtree_items(
+        self, db: Session, *, category: Category, skip: int = 0, limit: int = 100
+    ) -> List[Item]:
+        """Items of the category and of every category below it, in one query"""
+        return (
+            db.query(Item)
+            .join(Category, Category.id == Item.category_id)
+            .filter(
+                Category.company_id == category.company_id,
+                Category.path.startswith(category.path, autoescape=True)
+            )
+            .order_by(Item.id)
             .offset(skip)
             .limit(limit)
             .all()
@@ -40,6 +62,8 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         ).first()
 
 class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
+    catalog = True
+
     def get_by_name(
         self, db: Session, *, name: str, company_id: int
     ) -> Optional[Category]:
@@ -58,6 +82,93 @@ class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
             .all()
         )
 
+    def get_tree(self, db: Session, *, company_id: int) -> List[Dict[str, Any]]:
+        """
+        The company's categories as nested dicts, roots first, each with its
+        `children`. One query: ordering by path puts every parent before its
+        children.
+        """
+        columns = [column for column in Category.__table__.c if column.name != "path"]
+        nodes: Dict[int, Dict[str, Any]] = {}
+        roots = []
+        for row in db.execute(
+            select(*columns).where(Category.company_id == company_id).order_by(Category.path)
+        ).mappings():
+            node = nodes[row["id"]] = {**row, "children": []}
+            parent = nodes.get(row["parent_id"])
+            (parent["children"] if parent is not None else roots).append(node)
+        return roots
+
+    def _parent_path(self, db: Session, *, company_id: int, parent_id: Optional[int]) -> str:
+        if parent_id is None:
+            return ""
+        parent = self.get(db, id=parent_id)
+        if parent is None or parent.company_id != company_id:
+            raise ValueError(f"Parent category {parent_id} not found in this company")
+        return parent.path
+
+    def _rewrite_paths(self, db: Session, *, company_id: int, old_path: str, new_path: str) -> None:
+        """Replace the `old_path` prefix of a subtree's paths. Nothing is committed."""
+        db.execute(
+            update(Category)
+            .where(Category.company_id == company_id, Category.path.startswith(old_path, autoescape=True))
+            .values(path=literal(new_path) + func.substr(Category.path, len(old_path) + 1))
+            .execution_options(synchronize_session=False)
+        )
+
+    def create(self, db: Session, *, obj_in: CategoryCreate) -> Category:
+        parent_path = self._parent_path(db, company_id=obj_in.company_id, parent_id=obj_in.parent_id)
+        db_obj = Category(**obj_in.dict(include={"company_id", "name", "description", "parent_id"}))
+        db.add(db_obj)
+        db.flush()
+        db_obj.path = f"{parent_path}{db_obj.id}/"
+        db.commit()
+        db.refresh(db_obj)
+        self._touch_catalog(db, db_obj)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Category,
+        obj_in: Union[CategoryUpdate, Dict[str, Any]]
+    ) -> Category:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        update_data.pop("path", None)
+        if "parent_id" in update_data and update_data["parent_id"] != db_obj.parent_id:
+            parent_path = self._parent_path(db, company_id=db_obj.company_id, parent_id=update_data["parent_id"])
+            if parent_path.startswith(db_obj.path):
+                raise ValueError("A category cannot be moved below itself")
+            self._rewrite_paths(
+                db, company_id=db_obj.company_id, old_path=db_obj.path, new_path=f"{parent_path}{db_obj.id}/"
+            )
+        return super().update(db, db_obj=db_obj, obj_in=update_data)
+
+    def remove(self, db: Session, *, id: int) -> Category:
+        """Delete a category. Its subcategories move up to its parent and its items and recipes lose their category."""
+        category = self.get(db, id=id)
+        parent_path = category.path[:-len(f"{id}/")]
+        db.execute(
+            update(Category)
+            .where(Category.parent_id == id)
+            .values(parent_id=category.parent_id)
+            .execution_options(synchronize_session=False)
+        )
+        for model in (Item, Recipe):
+            db.execute(
+                update(model)
+                .where(model.category_id == id)
+                .values(category_id=None)
+                .execution_options(synchronize_session=False)
+            )
+        db.delete(category)
+        db.flush()
+        self._rewrite_paths(db, company_id=category.company_id, old_path=category.path, new_path=parent_path)
+        db.commit()
+        self._touch_catalog(db, category)
+        return category
+
     def get_subcategories(
         self, db: Session, *, parent_id: int, skip: int = 0, limit: int = 100
     ) -> List[Category]:
@@ -1,10 +1,38 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Collection, Dict, Iterable, List, Optional, Set
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
-from app.models.order import Order, OrderItem
-from app.schemas.order import OrderCreate, OrderUpdate, OrderItemCreate
+from app.core import metrics
+from app.crud.base import CRUDBase, schema_columns
+from app.crud.crud_inventory import crud_inventory
+from app.crud.crud_payment import crud_payment
+from app.crud.crud_store import scope_to_store
+from app.models.inventory import MovementType
+from app.models.order import Order, OrderItem, OrderStatus, Payment, PaymentStatus
+from app.schemas import order as order_schemas
+from app.schemas.order import OrderCreate, OrderUpdate
+from app.services import pricing, realtime
+
+# Fast read path: plain rows shaped like schemas.order.Order
+_ORDER_COLUMNS = schema_columns(Order, order_schemas.Order)
+_ORDER_ITEM_COLUMNS = schema_columns(OrderItem, order_schemas.OrderItem)
+_PAYMENT_COLUMNS = schema_columns(Payment, order_schemas.Payment)
+
+# Where an order may go from each status; COMPLETED and CANCELLED are final.
+# PENDING -> COMPLETED is a counter sale, handed over as soon as it's paid.
+ORDER_TRANSITIONS: Dict[OrderStatus, Set[OrderStatus]] = {
+    OrderStatus.PENDING: {OrderStatus.CONFIRMED, OrderStatus.PROCESSING, OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.PROCESSING, OrderStatus.READY, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.READY, OrderStatus.CANCELLED},
+    OrderStatus.READY: {OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    OrderStatus.COMPLETED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+# Orders in these statuses hold their items' stock as reserved
+_RESERVING = {OrderStatus.CONFIRMED, OrderStatus.PROCESSING, OrderStatus.READY}
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
     def get_multi_by_company(
@@ -29,41 +57,314 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
             .all()
         )
 
-    def create(self, db: Session, *, obj_in: OrderCreate) -> Order:
-        obj_in_data = jsonable_encoder(obj_in, exclude={"items"})
-        db_obj = Order(**obj_in_data)
+    def get_multi_rows(
+        self,
+        db: Session,
+        *,
+        company_id: Optional[int] = None,
+        store_id: Optional[int] = None,
+        include_sub_stores: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Orders with their items and payments as plain dicts, in three queries
+        and without ORM identity-map or pydantic validation overhead. Meant to
+        be serialized directly with ORJSONResponse.
+        """
+        query = select(*_ORDER_COLUMNS)
+        if company_id is not None:
+            query = query.where(Order.company_id == company_id)
+        if store_id is not None:
+            query = scope_to_store(query, Order.store_id, store_id, include_sub_stores)
+        orders = [dict(row) for row in db.execute(query.order_by(Order.id).offset(skip).limit(limit)).mappings()]
+        if not orders:
+            return orders
+
+        by_id = {}
+        for order in orders:
+            order["items"] = []
+            order["payments"] = []
+            by_id[order["id"]] = order
+        ids = list(by_id)
+        for row in db.execute(
+            select(*_ORDER_ITEM_COLUMNS).where(OrderItem.order_id.in_(ids)).order_by(OrderItem.id)
+        ).mappings():
+            by_id[row["order_id"]]["items"].append(dict(row))
+        for row in db.execute(
+            select(*_PAYMENT_COLUMNS).where(Payment.order_id.in_(ids)).order_by(Payment.id)
+        ).mappings():
+            by_id[row["order_id"]]["payments"].append(dict(row))
+        return orders
+
+    def get_sales_summary(
+        self,
+        db: Session,
+        *,
+        company_id: int,
+        store_id: Optional[int] = None,
+        include_sub_stores: bool = False,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[dict]:
+        day = func.date(Order.created_at)
+        query = (
+            db.query(
+                day.label("date"),
+                func.count(Order.id).label("orders"),
+                func.sum(Order.subtotal).label("subtotal"),
+                func.sum(Order.tax).label("tax"),
+                func.sum(Order.total).label("total"),
+            )
+            .filter(Order.company_id == company_id)
+        )
+        if store_id is not None:
+            query = scope_to_store(query, Order.store_id, store_id, include_sub_stores)
+        if date_from is not None:
+            query = query.filter(Order.created_at >= date_from)
+        if date_to is not None:
+            query = query.filter(Order.created_at < date_to)
+        return [row._asdict() for row in query.group_by(day).order_by(day).all()]
+
+    def get_top_items(
+        self,
+        db: Session,
+        *,
+        company_id: int,
+        store_id: Optional[int] = None,
+        include_sub_stores: bool = False,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        limit: int = 10
+    ) -> List[dict]:
+        query = (
+            db.query(
+                OrderItem.item_id,
+                func.sum(OrderItem.quantity).label("quantity"),
+                func.sum(OrderItem.total).label("total"),
+            )
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(Order.company_id == company_id)
+        )
+        if store_id is not None:
+            query = scope_to_store(query, Order.store_id, store_id, include_sub_stores)
+        if date_from is not None:
+            query = query.filter(Order.created_at >= date_from)
+        if date_to is not None:
+            query = query.filter(Order.created_at < date_to)
+        rows = (
+            query.group_by(OrderItem.item_id)
+            .order_by(func.sum(OrderItem.total).desc())
+            .limit(limit)
+            .all()
+        )
+        return [row._asdict() for row in rows]
+
+    def transition(
+        self,
+        db: Session,
+        *,
+        order_ids: Iterable[int],
+        to_status: OrderStatus,
+        company_id: int,
+        store_ids: Optional[Collection[int]] = None,
+        commit: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Move many orders to `to_status` at once. Orders are locked and read
+        with one SELECT, then updated with one
+        UPDATE ... WHERE id IN (...) AND status = :from per current status,
+        so an order that moved in the meantime is never overwritten. Line
+        items are only read, never rewritten.
+
+        Entering a confirmed/processing/ready status reserves the orders'
+        stock, cancelling releases it, and completing releases it and records
+        the sale, each with one aggregate read of the line items and one
+        upsert for all orders.
+
+        Orders that are missing (or outside the company, or with
+        `store_ids` outside those stores) or can't make the move are
+        rejected; the rest go ahead. Returns
+        {"transitioned": [ids], "rejected": [{order_id, status, reason}]}.
+        """
+        to_status = OrderStatus(to_status)
+        order_ids = list(dict.fromkeys(order_ids))
+        query = select(Order.id, Order.status).where(Order.id.in_(order_ids), Order.company_id == company_id)
+        if store_ids is not None:
+            query = query.where(Order.store_id.in_(list(store_ids)))
+        current = dict(db.execute(query.with_for_update()).all())
+
+        rejected = []
+        by_status: Dict[OrderStatus, List[int]] = {}
+        for order_id in order_ids:
+            status = current.get(order_id)
+            if status is None:
+                rejected.append({"order_id": order_id, "status": None, "reason": "Order not found"})
+            elif to_status not in ORDER_TRANSITIONS[status]:
+                rejected.append({
+                    "order_id": order_id,
+                    "status": status,
+                    "reason": f"Cannot go from {status.value} to {to_status.value}"
+                })
+            else:
+                by_status.setdefault(status, []).append(order_id)
+
+        transitioned: List[int] = []
+        reserve: List[int] = []
+        release: List[int] = []
+        for from_status, ids in by_status.items():
+            result = db.execute(
+                update(Order)
+                .where(Order.id.in_(ids), Order.status == from_status)
+                .values(status=to_status, updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(ids):
+                db.rollback()
+                raise ValueError("Orders changed status while being updated, try again")
+            transitioned += ids
+            if to_status in _RESERVING and from_status not in _RESERVING:
+                reserve += ids
+            elif from_status in _RESERVING and to_status not in _RESERVING:
+                release += ids
+
+        self._reserve_stock(db, order_ids=reserve, sign=1)
+        self._reserve_stock(db, order_ids=release, sign=-1)
+        if to_status == OrderStatus.COMPLETED:
+            self._record_sales(db, order_ids=transitioned)
+
+        if transitioned:
+            for order_id, order_store_id in db.execute(
+                select(Order.id, Order.store_id).where(Order.id.in_(transitioned))
+            ):
+                realtime.emit_order_status(db, order_id=order_id, store_id=order_store_id, status=to_status)
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        return {"transitioned": transitioned, "rejected": rejected}
+
+    def _line_totals(self, db: Session, *, order_ids: List[int], by_order: bool = False) -> list:
+        """Ordered quantity per (store, item), or per (order, store, item) with `by_order`"""
+        keys = [Order.store_id, OrderItem.item_id]
+        if by_order:
+            keys.insert(0, OrderItem.order_id)
+        return db.execute(
+            select(*keys, func.sum(OrderItem.quantity).label("quantity"), func.min(OrderItem.unit).label("unit"))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(OrderItem.order_id.in_(order_ids))
+            .group_by(*keys)
+        ).all()
+
+    def _reserve_stock(self, db: Session, *, order_ids: List[int], sign: int) -> None:
+        if not order_ids:
+            return
+        crud_inventory.reserve_many(db, reservations=[
+            {"store_id": row.store_id, "item_id": row.item_id, "quantity": sign * row.quantity, "unit": row.unit}
+            for row in self._line_totals(db, order_ids=order_ids)
+        ])
+
+    def _record_sales(self, db: Session, *, order_ids: List[int]) -> None:
+        if not order_ids:
+            return
+        crud_inventory.adjust_many(
+            db,
+            adjustments=[
+                {
+                    "store_id": row.store_id,
+                    "item_id": row.item_id,
+                    "quantity": -row.quantity,
+                    "unit": row.unit,
+                    "reference_id": row.order_id,
+                }
+                for row in self._line_totals(db, order_ids=order_ids, by_order=True)
+            ],
+            movement_type=MovementType.SALE,
+            reference_type="order",
+            commit=False
+        )
+
+    def _insert_items(self, db: Session, *, order_id: int, lines: List[pricing.PricedLine]) -> None:
+        db.execute(insert(OrderItem), [
+            {
+                "order_id": order_id,
+                "item_id": line.item_id,
+                "quantity": line.quantity,
+                "unit": line.unit,
+                "unit_price": line.unit_price,
+                "tax_rate": line.tax_rate,
+                "discount": line.discount,
+                "total": line.total,
+                "notes": line.notes,
+                "customization": line.customization,
+            }
+            for line in lines
+        ])
+
+    def create(self, db: Session, *, obj_in: OrderCreate, manual_discount_limit: float = 0.0) -> Order:
+        """
+        Create an order priced on the server, with its items, in one
+        transaction. Manual line discounts are capped at
+        `manual_discount_limit` (see pricing.price_lines).
+        """
+        priced = pricing.price_order(
+            db, company_id=obj_in.company_id, store_id=obj_in.store_id,
+            lines=[item.dict() for item in obj_in.items], manual_discount_limit=manual_discount_limit
+        )
+        obj_in_data = jsonable_encoder(obj_in, exclude={"items", "status", "payment_status"})
+        obj_in_data.update(
+            subtotal=priced.subtotal, discount=priced.discount, tax=priced.tax, total=priced.total
+        )
+        # Every order starts pending; later statuses go through transition()
+        # and its stock effects, and the payment status follows the payments
+        db_obj = Order(**obj_in_data, status=OrderStatus.PENDING, payment_status=PaymentStatus.PENDING)
         db.add(db_obj)
+        db.flush()
+        db_obj.order_number = f"ORD-{db_obj.id:010d}"
+        self._insert_items(db, order_id=db_obj.id, lines=priced.lines)
+        realtime.emit_order_status(db, order_id=db_obj.id, store_id=db_obj.store_id, status=db_obj.status)
         db.commit()
         db.refresh(db_obj)
 
-        # Create order items
-        if obj_in.items:
-            for item in obj_in.items:
-                item_data = jsonable_encoder(item)
-                db_item = OrderItem(**item_data, order_id=db_obj.id)
-                db.add(db_item)
-            db.commit()
-            db.refresh(db_obj)
-
+        metrics.orders_created_total.inc()
         return db_obj
 
     def update(
-        self, db: Session, *, db_obj: Order, obj_in: OrderUpdate
+        self, db: Session, *, db_obj: Order, obj_in: OrderUpdate, manual_discount_limit: float = 0.0
     ) -> Order:
         obj_data = jsonable_encoder(db_obj)
         update_data = obj_in.dict(exclude_unset=True)
+        # Money follows from the items, and the payment status from the
+        # payments; neither is taken from the client, nor is the owner
+        for field in ("company_id", "store_id", "user_id", "subtotal", "discount", "tax", "total", "payment_status"):
+            update_data.pop(field, None)
 
-        # Update order items if provided
+        # Replace and re-price the items if provided
         if "items" in update_data:
-            # Remove existing items
+            if db_obj.status != OrderStatus.PENDING:
+                raise ValueError("Items can only be changed while the order is pending")
+            priced = pricing.price_order(
+                db, company_id=db_obj.company_id, store_id=db_obj.store_id, lines=update_data.pop("items"),
+                manual_discount_limit=manual_discount_limit
+            )
             db.query(OrderItem).filter(OrderItem.order_id == db_obj.id).delete()
-            
-            # Add new items
-            for item in update_data["items"]:
-                db_item = OrderItem(**item, order_id=db_obj.id)
-                db.add(db_item)
-            
-            del update_data["items"]
+            self._insert_items(db, order_id=db_obj.id, lines=priced.lines)
+            update_data.update(
+                subtotal=priced.subtotal, discount=priced.discount, tax=priced.tax, total=priced.total
+            )
+            reprice = True
+        else:
+            reprice = False
+
+        # Status changes go through the state machine and its stock effects
+        status = update_data.pop("status", None) or db_obj.status
+        if status != db_obj.status:
+            result = self.transition(
+                db, order_ids=[db_obj.id], to_status=status, company_id=db_obj.company_id, commit=False
+            )
+            if result["rejected"]:
+                db.rollback()
+                raise ValueError(result["rejected"][0]["reason"])
 
         # Update order fields
         for field in obj_data:
@@ -71,6 +372,9 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
                 setattr(db_obj, field, update_data[field])
 
         db.add(db_obj)
+        if reprice:
+            db.flush()
+            crud_payment.refresh_order_status(db, order_ids=[db_obj.id])
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -0,0 +1,168 @@
+from typing import Any, Dict, Iterable, Iterator, List, Union
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import case, exists, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.crud.base import CRUDBase
+from app.models.order import Order, Payment, PaymentStatus
+from app.schemas.order import PaymentCreate, PaymentUpdate
+
+# Amounts are floats; anything closer than half a cent is equal
+AMOUNT_TOLERANCE = 0.005
+
+def _payment_status(value: PaymentStatus):
+    return literal(value, Order.payment_status.type)
+
+class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
+    def get_by_order(self, db: Session, *, order_id: int) -> List[Payment]:
+        return db.query(Payment).filter(Payment.order_id == order_id).order_by(Payment.id).all()
+
+    def refresh_order_status(self, db: Session, *, order_ids: Iterable[int]) -> None:
+        """
+        Derive Order.payment_status from the orders' payments in one UPDATE:
+        PAID once paid payments cover the total, PARTIALLY_PAID below that,
+        REFUNDED when nothing is paid but something was refunded, PENDING
+        otherwise. Doesn't commit.
+        """
+        order_ids = list(order_ids)
+        if not order_ids:
+            return
+        paid = (
+            select(func.coalesce(func.sum(Payment.amount), 0))
+            .where(Payment.order_id == Order.id, Payment.status == PaymentStatus.PAID)
+            .scalar_subquery()
+        )
+        refunded = exists().where(Payment.order_id == Order.id, Payment.status == PaymentStatus.REFUNDED)
+        db.execute(
+            update(Order)
+            .where(Order.id.in_(order_ids))
+            .values(
+                payment_status=case(
+                    (paid >= Order.total - AMOUNT_TOLERANCE, _payment_status(PaymentStatus.PAID)),
+                    (paid > 0, _payment_status(PaymentStatus.PARTIALLY_PAID)),
+                    (refunded, _payment_status(PaymentStatus.REFUNDED)),
+                    else_=_payment_status(PaymentStatus.PENDING)
+                ),
+                updated_at=func.now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def create(self, db: Session, *, obj_in: PaymentCreate, order_id: int) -> Payment:
+        """
+        Record a payment against an order and re-derive the order's payment
+        status in the same transaction. The order row is locked first, so
+        concurrent payments on one order sum up correctly.
+        """
+        db.execute(select(Order.id).where(Order.id == order_id).with_for_update())
+        db_obj = Payment(**jsonable_encoder(obj_in), order_id=order_id)
+        db.add(db_obj)
+        db.flush()
+        self.refresh_order_status(db, order_ids=[order_id])
+        db.commit()
+        db.refresh(db_obj)
+        metrics.payments_recorded_total.inc(db_obj.payment_method.value)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Payment,
+        obj_in: Union[PaymentUpdate, Dict[str, Any]]
+    ) -> Payment:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        db.execute(select(Order.id).where(Order.id == db_obj.order_id).with_for_update())
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        db.flush()
+        self.refresh_order_status(db, order_ids=[db_obj.order_id])
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def reconcile_statement(
+        self,
+        db: Session,
+        *,
+        company_id: int,
+        lines: Iterable[Dict[str, Any]],
+        chunk_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Match provider statement lines ({line, reference, amount}) to the
+        company's payments by reference, one chunk at a time, and yield every
+        line that didn't match cleanly with its `result`:
+
+        * unmatched: no payment has the reference
+        * amount_mismatch: the payment's amount differs
+        * duplicate: the reference already matched earlier in the statement
+        * invalid: the line has no reference or no usable amount
+
+        Each chunk costs one indexed lookup (reference IN (...)); its matches
+        are kept in a dict by reference. Pending payments that match are
+        confirmed as PAID, with their orders' payment status, and committed
+        with the chunk. Between chunks only the matched references are kept,
+        to spot duplicates, so memory grows with the number of distinct
+        matched references rather than with the statement's lines.
+        """
+        seen = set()
+        chunk: List[Dict[str, Any]] = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield from self._reconcile_chunk(db, company_id=company_id, lines=chunk, seen=seen)
+                chunk = []
+        if chunk:
+            yield from self._reconcile_chunk(db, company_id=company_id, lines=chunk, seen=seen)
+
+    def _reconcile_chunk(
+        self, db: Session, *, company_id: int, lines: List[Dict[str, Any]], seen: set
+    ) -> List[Dict[str, Any]]:
+        references = {line["reference"] for line in lines if line.get("reference")}
+        payments: Dict[str, List[Any]] = {}
+        if references:
+            for row in db.execute(
+                select(Payment.id, Payment.order_id, Payment.reference, Payment.amount, Payment.status)
+                .join(Order, Order.id == Payment.order_id)
+                .where(Payment.reference.in_(references), Order.company_id == company_id)
+                .order_by(Payment.id)
+            ):
+                payments.setdefault(row.reference, []).append(row)
+
+        exceptions = []
+        confirm: Dict[int, int] = {}
+        for line in lines:
+            reference, amount = line.get("reference"), line.get("amount")
+            if not reference or amount is None:
+                exceptions.append({**line, "result": "invalid", "payment_id": None})
+                continue
+            if reference in seen:
+                exceptions.append({**line, "result": "duplicate", "payment_id": None})
+                continue
+            candidates = payments.get(reference)
+            if not candidates:
+                exceptions.append({**line, "result": "unmatched", "payment_id": None})
+                continue
+            match = next((row for row in candidates if abs(row.amount - amount) <= AMOUNT_TOLERANCE), None)
+            if match is None:
+                exceptions.append({**line, "result": "amount_mismatch", "payment_id": candidates[0].id,
+                                   "payment_amount": candidates[0].amount})
+                continue
+            seen.add(reference)
+            if match.status == PaymentStatus.PENDING:
+                confirm[match.id] = match.order_id
+
+        if confirm:
+            db.execute(
+                update(Payment)
+                .where(Payment.id.in_(confirm))
+                .values(status=PaymentStatus.PAID, updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            self.refresh_order_status(db, order_ids=set(confirm.values()))
+        db.commit()
+        return exceptions
+
+crud_payment = CRUDPayment(Payment)
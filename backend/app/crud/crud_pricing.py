@@ -0,0 +1,165 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.company import Store
+from app.models.item import Category, Item
+from app.models.pricing import PriceList, PriceListItem, Promotion
+from app.schemas.pricing import (
+    PriceListCreate,
+    PriceListItemCreate,
+    PriceListUpdate,
+    PromotionCreate,
+    PromotionUpdate
+)
+from app.services.pricing import pricing_rules
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Promotion times are stored as naive UTC"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _check_owned(db: Session, model, id: Optional[int], company_id: int) -> None:
+    if id is None:
+        return
+    owner = db.scalar(select(model.company_id).where(model.id == id))
+    if owner != company_id:
+        raise ValueError(f"{model.__name__} {id} not found in this company")
+
+class CRUDPriceList(CRUDBase[PriceList, PriceListCreate, PriceListUpdate]):
+    """Every committed write invalidates the company's pricing rules"""
+
+    def get_multi_by_company(self, db: Session, *, company_id: int) -> List[PriceList]:
+        return db.query(PriceList).filter(PriceList.company_id == company_id).order_by(PriceList.id).all()
+
+    def get_items(self, db: Session, *, price_list_id: int) -> List[PriceListItem]:
+        return (
+            db.query(PriceListItem)
+            .filter(PriceListItem.price_list_id == price_list_id)
+            .order_by(PriceListItem.item_id)
+            .all()
+        )
+
+    def _insert_items(self, db: Session, *, price_list: PriceList, items: List[Dict[str, Any]]) -> None:
+        if not items:
+            return
+        item_ids = {item["item_id"] for item in items}
+        found = set(db.scalars(select(Item.id).where(Item.id.in_(item_ids), Item.company_id == price_list.company_id)))
+        if item_ids - found:
+            raise ValueError(f"Item {min(item_ids - found)} not found in this company")
+        db.execute(insert(PriceListItem), [
+            {"price_list_id": price_list.id, "item_id": item_id, "price": price}
+            # A repeated item keeps its last price
+            for item_id, price in {item["item_id"]: item["price"] for item in items}.items()
+        ])
+
+    def create(self, db: Session, *, obj_in: PriceListCreate) -> PriceList:
+        obj_in_data = jsonable_encoder(obj_in, exclude={"items"})
+        _check_owned(db, Store, obj_in_data["store_id"], obj_in_data["company_id"])
+        db_obj = PriceList(**obj_in_data)
+        db.add(db_obj)
+        db.flush()
+        try:
+            self._insert_items(db, price_list=db_obj, items=[item.dict() for item in obj_in.items])
+        except ValueError:
+            db.rollback()
+            raise
+        db.commit()
+        db.refresh(db_obj)
+        pricing_rules.invalidate(db_obj.company_id)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: PriceList,
+        obj_in: Union[PriceListUpdate, Dict[str, Any]]
+    ) -> PriceList:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        _check_owned(db, Store, update_data.get("store_id"), db_obj.company_id)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        pricing_rules.invalidate(db_obj.company_id)
+        return db_obj
+
+    def set_items(self, db: Session, *, db_obj: PriceList, items: List[PriceListItemCreate]) -> List[PriceListItem]:
+        """Replace the list's prices with one DELETE and one bulk INSERT"""
+        db.execute(delete(PriceListItem).where(PriceListItem.price_list_id == db_obj.id))
+        try:
+            self._insert_items(db, price_list=db_obj, items=[item.dict() for item in items])
+        except ValueError:
+            db.rollback()
+            raise
+        db.commit()
+        pricing_rules.invalidate(db_obj.company_id)
+        return self.get_items(db, price_list_id=db_obj.id)
+
+    def remove(self, db: Session, *, id: int) -> PriceList:
+        db_obj = super().remove(db, id=id)
+        pricing_rules.invalidate(db_obj.company_id)
+        return db_obj
+
+class CRUDPromotion(CRUDBase[Promotion, PromotionCreate, PromotionUpdate]):
+    """Every committed write invalidates the company's pricing rules"""
+
+    def get_multi_by_company(
+        self,
+        db: Session,
+        *,
+        company_id: int,
+        active_at: Optional[datetime] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Promotion]:
+        query = db.query(Promotion).filter(Promotion.company_id == company_id)
+        if active_at is not None:
+            active_at = _utc(active_at)
+            query = query.filter(
+                Promotion.is_active.is_(True),
+                Promotion.starts_at <= active_at,
+                (Promotion.ends_at.is_(None)) | (Promotion.ends_at > active_at)
+            )
+        return query.order_by(Promotion.id).offset(skip).limit(limit).all()
+
+    def _check(self, db: Session, data: Dict[str, Any], company_id: int) -> None:
+        _check_owned(db, Store, data.get("store_id"), company_id)
+        _check_owned(db, Item, data.get("item_id"), company_id)
+        _check_owned(db, Category, data.get("category_id"), company_id)
+        for field in ("starts_at", "ends_at"):
+            if field in data:
+                data[field] = _utc(data[field])
+
+    def create(self, db: Session, *, obj_in: PromotionCreate) -> Promotion:
+        data = obj_in.dict()
+        self._check(db, data, data["company_id"])
+        db_obj = Promotion(**data)
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        pricing_rules.invalidate(db_obj.company_id)
+        return db_obj
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Promotion,
+        obj_in: Union[PromotionUpdate, Dict[str, Any]]
+    ) -> Promotion:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        self._check(db, update_data, db_obj.company_id)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        pricing_rules.invalidate(db_obj.company_id)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Promotion:
+        db_obj = super().remove(db, id=id)
+        pricing_rules.invalidate(db_obj.company_id)
+        return db_obj
+
+crud_price_list = CRUDPriceList(PriceList)
+crud_promotion = CRUDPromotion(Promotion)
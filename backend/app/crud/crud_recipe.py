@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List, Union
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
@@ -7,6 +7,8 @@ from app.models.recipe import Recipe
 from app.schemas.recipe import RecipeCreate, RecipeUpdate
 
 class CRUDRecipe(CRUDBase[Recipe, RecipeCreate, RecipeUpdate]):
+    catalog = True
+
     def get_multi_by_company(
         self, db: Session, *, company_id: int, skip: int = 0, limit: int = 100
     ) -> List[Recipe]:
@@ -24,6 +26,14 @@ class CRUDRecipe(CRUDBase[Recipe, RecipeCreate, RecipeUpdate]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        self._touch_catalog(db, db_obj)
         return db_obj
 
+    def update(
+        self, db: Session, *, db_obj: Recipe, obj_in: Union[RecipeUpdate, Dict[str, Any]]
+    ) -> Recipe:
+        update_data = dict(obj_in) if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        update_data.pop("company_id", None)
+        return super().update(db, db_obj=db_obj, obj_in=update_data)
+
 crud_recipe = CRUDRecipe(Recipe) 
\ No newline at end of file
@@ -1,11 +1,26 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Union
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, literal, or_, select, true, update
+from sqlalchemy.orm import Session, aliased
 
+from app.core.tenancy import tenant_cache
 from app.crud.base import CRUDBase
-from app.models.company import Store
+from app.models.company import Store, StoreClosure
 from app.schemas.company import StoreCreate, StoreUpdate
 
+def scope_to_store(query, column, store_id: int, include_sub_stores: bool = False):
+    """
+    Restrict a select on `column` to one store or, with `include_sub_stores`,
+    to the store and every store below it. The subtree comes from one join
+    on store_closure instead of walking parent_store_id level by level.
+    """
+    if not include_sub_stores:
+        return query.where(column == store_id)
+    return (
+        query.join(StoreClosure, StoreClosure.descendant_id == column)
+        .where(StoreClosure.ancestor_id == store_id)
+    )
+
 class CRUDStore(CRUDBase[Store, StoreCreate, StoreUpdate]):
     def get_multi_by_company(
         self, db: Session, *, company_id: int, skip: int = 0, limit: int = 100
@@ -18,12 +33,114 @@ class CRUDStore(CRUDBase[Store, StoreCreate, StoreUpdate]):
             .all()
         )
 
+    def get_subtree_ids(self, db: Session, *, store_id: int) -> List[int]:
+        """The store and every store below it"""
+        return list(db.scalars(
+            select(StoreClosure.descendant_id).where(StoreClosure.ancestor_id == store_id)
+        ))
+
+    def get_ancestor_ids(self, db: Session, *, store_id: int) -> List[int]:
+        """The stores above `store_id`, nearest first"""
+        return list(db.scalars(
+            select(StoreClosure.ancestor_id)
+            .where(StoreClosure.descendant_id == store_id, StoreClosure.depth > 0)
+            .order_by(StoreClosure.depth)
+        ))
+
+    def _check_parent(self, db: Session, *, company_id: int, parent_store_id: Optional[int]) -> None:
+        if parent_store_id is None:
+            return
+        parent = self.get(db, id=parent_store_id)
+        if parent is None or parent.company_id != company_id:
+            raise ValueError(f"Parent store {parent_store_id} not found in this company")
+
     def create(self, db: Session, *, obj_in: StoreCreate) -> Store:
         obj_in_data = jsonable_encoder(obj_in)
+        self._check_parent(db, company_id=obj_in_data["company_id"], parent_store_id=obj_in_data["parent_store_id"])
         db_obj = Store(**obj_in_data)
         db.add(db_obj)
+        db.flush()
+        # The parent's ancestors plus the parent, one level further down, and the store itself
+        db.execute(insert(StoreClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(StoreClosure.ancestor_id, literal(db_obj.id), StoreClosure.depth + 1)
+            .where(StoreClosure.descendant_id == db_obj.parent_store_id)
+            .union_all(select(literal(db_obj.id), literal(db_obj.id), literal(0)))
+        ))
         db.commit()
         db.refresh(db_obj)
+        tenant_cache.invalidate_company(db_obj.company_id)
         return db_obj
 
-crud_store = CRUDStore(Store) 
\ No newline at end of file
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Store,
+        obj_in: Union[StoreUpdate, Dict[str, Any]]
+    ) -> Store:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        if "parent_store_id" in update_data and update_data["parent_store_id"] != db_obj.parent_store_id:
+            self._move(db, store=db_obj, parent_store_id=update_data["parent_store_id"])
+        store = super().update(db, db_obj=db_obj, obj_in=update_data)
+        # After the commit, like create and remove: a context loaded in between would be cached stale
+        tenant_cache.invalidate_company(store.company_id)
+        return store
+
+    def _move(self, db: Session, *, store: Store, parent_store_id: Optional[int]) -> None:
+        """Re-link the closure rows of the store's subtree under a new parent. Nothing is committed."""
+        self._check_parent(db, company_id=store.company_id, parent_store_id=parent_store_id)
+        subtree = self.get_subtree_ids(db, store_id=store.id)
+        if parent_store_id in subtree:
+            raise ValueError("A store cannot be moved below itself")
+
+        # Paths from the old ancestors into the subtree go
+        db.execute(
+            delete(StoreClosure)
+            .where(
+                StoreClosure.descendant_id.in_(subtree),
+                StoreClosure.ancestor_id.notin_(subtree)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if parent_store_id is not None:
+            # Every ancestor of the new parent (itself included) times every
+            # member of the subtree
+            above = aliased(StoreClosure)
+            below = aliased(StoreClosure)
+            db.execute(insert(StoreClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+                .select_from(above)
+                .join(below, true())
+                .where(above.descendant_id == parent_store_id, below.ancestor_id == store.id)
+            ))
+
+    def remove(self, db: Session, *, id: int) -> Store:
+        """Delete a store. Its sub-stores move up to its parent."""
+        store = self.get(db, id=id)
+        ancestors = self.get_ancestor_ids(db, store_id=id)
+        descendants = [store_id for store_id in self.get_subtree_ids(db, store_id=id) if store_id != id]
+        if ancestors and descendants:
+            db.execute(
+                update(StoreClosure)
+                .where(StoreClosure.ancestor_id.in_(ancestors), StoreClosure.descendant_id.in_(descendants))
+                .values(depth=StoreClosure.depth - 1)
+                .execution_options(synchronize_session=False)
+            )
+        db.execute(
+            delete(StoreClosure)
+            .where(or_(StoreClosure.ancestor_id == id, StoreClosure.descendant_id == id))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(Store)
+            .where(Store.parent_store_id == id)
+            .values(parent_store_id=store.parent_store_id)
+        )
+        db.delete(store)
+        db.commit()
+        tenant_cache.invalidate_company(store.company_id)
+        return store
+
+crud_store = CRUDStore(Store)
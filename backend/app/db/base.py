@@ -1,9 +1,12 @@
 # Import all models for Alembic
 from app.db.base_class import Base
-from app.models.company import Company, Store
+from app.models.company import Company, CompanyShard, Store, StoreClosure
 from app.models.user import User
 from app.models.item import Item, Category
 from app.models.recipe import Recipe, RecipeIngredient, Batch
-from app.models.inventory import Inventory, InventoryMovement
+from app.models.inventory import Inventory, InventoryMovement, InventorySnapshot, InventoryValuation
 from app.models.order import Order, OrderItem, Payment
+from app.models.pricing import PriceList, PriceListItem, Promotion
+from app.models.outbox import OutboxMessage
+from app.models.replication import ReplicationHeartbeat
 from app.models.academy import Course, CourseSection, Lesson, CourseEnrollment, LessonProgress
@@ -0,0 +1,275 @@
+"""
+Read replicas.
+
+REPLICA_URLS lists read-only copies of each shard's database. GET
+endpoints that only read take their session from deps.get_read_db, which
+picks one of the shard's replicas, round robin, except:
+
+- for READ_YOUR_WRITES_SECONDS after the client wrote. Every successful
+  POST, PUT, PATCH or DELETE sets a cookie (ReadYourWritesMiddleware)
+  that sends the client's reads to the primary until then. Clients that
+  don't keep cookies go back to the replicas at once.
+- when no replica is within REPLICA_MAX_LAG_SECONDS of the primary, or
+  none can be reached: the primary serves the reads.
+
+Lag is measured with a heartbeat. Every API process updates the
+replication_heartbeats row on each primary that has replicas every
+REPLICA_HEARTBEAT_SECONDS, and a replica is as far behind as its copy of
+the row is old, less that interval. Each process measures a replica at
+most once per interval. A replica without the row counts as lagging, so
+it serves nothing until the heartbeat has reached it.
+
+Read sessions refuse to write, on the primary as well.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import create_db_engine
+from app.db.shards import shard_router
+from app.models.replication import ReplicationHeartbeat
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_ID = 1
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class ReadOnlySessionError(Exception):
+    """A write through a session from get_read_db"""
+
+class ReadOnlySession(Session):
+    pass
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _refuse_flush(session, flush_context, instances):
+    raise ReadOnlySessionError("Read sessions cannot flush changes")
+
+@event.listens_for(ReadOnlySession, "do_orm_execute")
+def _refuse_writes(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        raise ReadOnlySessionError("Read sessions cannot execute writes")
+
+class ReplicaSet:
+    """A shard's primary and its replicas"""
+
+    def __init__(
+        self,
+        shard: str,
+        primary: Engine,
+        replicas: Dict[str, Engine],
+        *,
+        max_lag: float,
+        heartbeat_interval: float
+    ):
+        self.shard = shard
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.heartbeat_interval = heartbeat_interval
+        self._primary_reads = sessionmaker(
+            autocommit=False, autoflush=False, bind=primary, class_=ReadOnlySession, info={"shard": shard}
+        )
+        self._replica_reads = {
+            name: sessionmaker(
+                autocommit=False, autoflush=False, bind=replica, class_=ReadOnlySession,
+                info={"shard": shard, "replica": name}
+            )
+            for name, replica in replicas.items()
+        }
+        # name -> (measured at, lag in seconds or None when unknown)
+        self._lags: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def _measure(self, name: str) -> Optional[float]:
+        try:
+            with self.replicas[name].connect() as conn:
+                beat_at = conn.scalar(
+                    select(ReplicationHeartbeat.beat_at).where(ReplicationHeartbeat.id == HEARTBEAT_ID)
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Replica {name} of shard {self.shard} is unreachable: {e}")
+            return None
+        if beat_at is None:
+            return None
+        return max(0.0, time.time() - beat_at - self.heartbeat_interval)
+
+    def lag(self, name: str) -> Optional[float]:
+        """Seconds the replica is behind, at most one heartbeat interval old. None when unknown."""
+        now = time.monotonic()
+        with self._lock:
+            measured = self._lags.get(name)
+        if measured is not None and now - measured[0] < self.heartbeat_interval:
+            return measured[1]
+        lag = self._measure(name)
+        with self._lock:
+            self._lags[name] = (now, lag)
+        return lag
+
+    def lags(self) -> Dict[str, Optional[float]]:
+        """Last measured lag of every replica, without measuring"""
+        with self._lock:
+            return {name: measured[1] for name, measured in self._lags.items()}
+
+    def available(self) -> List[str]:
+        """Replicas within max_lag of the primary"""
+        available = []
+        for name in self.replicas:
+            lag = self.lag(name)
+            if lag is not None and lag <= self.max_lag:
+                available.append(name)
+        return available
+
+    def read_session(self, *, primary: bool = False) -> Session:
+        """Read-only session on an available replica, else on the primary"""
+        if not primary and self.replicas:
+            available = self.available()
+            if available:
+                name = available[next(self._turn) % len(available)]
+                metrics.db_reads_total.inc(self.shard, name)
+                return self._replica_reads[name]()
+        metrics.db_reads_total.inc(self.shard, "primary")
+        return self._primary_reads()
+
+    def beat(self) -> None:
+        """Update the primary's heartbeat row"""
+        now = time.time()
+        try:
+            with self.primary.begin() as conn:
+                updated = conn.execute(
+                    update(ReplicationHeartbeat).where(ReplicationHeartbeat.id == HEARTBEAT_ID).values(beat_at=now)
+                ).rowcount
+                if not updated:
+                    conn.execute(insert(ReplicationHeartbeat).values(id=HEARTBEAT_ID, beat_at=now))
+        except IntegrityError:
+            # Another process inserted the row first, its beat will do
+            pass
+
+def _create_replica_sets() -> Dict[str, ReplicaSet]:
+    unknown = set(settings.REPLICA_URLS) - set(shard_router.names)
+    if unknown:
+        raise ValueError(f"REPLICA_URLS names unknown shards: {', '.join(sorted(unknown))}")
+    replica_sets = {}
+    for shard, primary in shard_router.engines.items():
+        replicas = {}
+        for i, url in enumerate(settings.REPLICA_URLS.get(shard, [])):
+            name = f"replica-{i + 1}"
+            replicas[name] = create_db_engine(url)
+            metrics.track_pool(f"{shard}-{name}", replicas[name])
+        replica_sets[shard] = ReplicaSet(
+            shard, primary, replicas,
+            max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+            heartbeat_interval=settings.REPLICA_HEARTBEAT_SECONDS
+        )
+    return replica_sets
+
+replica_sets = _create_replica_sets()
+
+def has_replicas() -> bool:
+    return any(replica_set.replicas for replica_set in replica_sets.values())
+
+def read_session(shard: str, *, primary: bool = False) -> Session:
+    return replica_sets[shard].read_session(primary=primary)
+
+def _lag_collector():
+    return [
+        ("leymax_db_replica_lag_seconds", "gauge", "Last measured replica lag, -1 when unknown",
+         {"shard": shard, "replica": name}, lag if lag is not None else -1.0)
+        for shard, replica_set in replica_sets.items()
+        for name, lag in sorted(replica_set.lags().items())
+    ]
+
+metrics.registry.add_collector(_lag_collector)
+
+# Read-your-writes
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client's reads should still go to the primary"""
+    try:
+        until = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the read_primary_until cookie on successful write requests. ASGI
+    middleware rather than a dependency: the status is only known once the
+    endpoint has returned.
+    """
+
+    def __init__(self, app, window: Optional[float] = None):
+        self.app = app
+        self.window = window if window is not None else settings.READ_YOUR_WRITES_SECONDS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 400:
+                until = time.time() + self.window
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}={until:.3f}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# Heartbeat
+
+class HeartbeatWriter:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, interval: float) -> None:
+        """Beat every `interval` seconds from a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="replica-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while True:
+            for replica_set in replica_sets.values():
+                if not replica_set.replicas:
+                    continue
+                try:
+                    replica_set.beat()
+                except Exception:
+                    logger.exception(f"Writing the replication heartbeat of shard {replica_set.shard} failed")
+            if self._stop.wait(interval):
+                return
+
+heartbeat_writer = HeartbeatWriter()
+
+def start_heartbeat() -> None:
+    if has_replicas():
+        heartbeat_writer.start(settings.REPLICA_HEARTBEAT_SECONDS)
+
+def stop_heartbeat() -> None:
+    heartbeat_writer.stop()
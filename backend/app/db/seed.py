@@ -0,0 +1,405 @@
+"""
+Fast, deterministic data generator for local databases.
+
+Every company is generated independently from its own random stream
+(`seed` + company number) into a pre-computed primary key range, so the
+output does not depend on how many worker processes are used and companies
+can be written in parallel. Rows go out through chunked executemany
+`insert()` statements, one transaction per company.
+"""
+import logging
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.security import get_password_hash
+from app.db.base import Base
+from app.models.company import Company, Store, StoreClosure, CompanyType, StoreType
+from app.models.user import User, UserRole
+from app.models.item import Item, Category, ItemType
+from app.models.inventory import Inventory, InventoryMovement, MovementType
+from app.models.recipe import Recipe, RecipeIngredient
+from app.models.order import Order, OrderItem, OrderStatus, PaymentStatus, PaymentMethod
+from app.models.academy import (
+    Course, CourseSection, Lesson, CourseEnrollment, LessonProgress, CourseStatus, EnrollmentStatus
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PASSWORD = "password123"
+DEFAULT_ADMIN_EMAIL = "admin@example.com"
+
+# Upper bounds used to give every parent a fixed block of child ids
+MAX_ORDER_LINES = 5
+MAX_RECIPE_INGREDIENTS = 8
+
+COMPANY_TYPES = (CompanyType.BAKERY, CompanyType.TOOLS, CompanyType.ACADEMY)
+
+@dataclass
+class SeedConfig:
+    """Volumes are per company unless stated otherwise"""
+    companies: int = 1
+    stores: int = 1
+    staff_per_store: int = 0
+    categories: int = 0
+    items: int = 0
+    recipes: int = 0  # bakery companies only
+    orders: int = 0
+    courses: int = 0  # academy companies only
+    sections_per_course: int = 4
+    lessons_per_section: int = 5
+    students: int = 0  # academy companies only, each enrolls in a few courses
+    order_days: int = 90  # orders are spread over this many past days
+    seed: int = 42
+    chunk_size: int = 10000
+
+class _Ids:
+    """Primary key block owned by one company (company number n, 0-based)"""
+
+    def __init__(self, config: SeedConfig, n: int):
+        c = config
+        self.company = n + 1
+        self.store = n * c.stores
+        self.user = n * (1 + c.stores * (1 + c.staff_per_store) + c.students)
+        self.category = n * c.categories
+        self.item = n * c.items
+        self.inventory = n * c.stores * c.items
+        self.recipe = n * c.recipes
+        self.order = n * c.orders
+        self.course = n * c.courses
+        # ingredients, order lines, sections and lessons derive their ids from the parent id
+        self.enrollment = n * c.students * 3
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _write(conn: Connection, model, rows: Iterator[dict], size: int) -> int:
+    total = 0
+    for chunk in _chunks(rows, size):
+        conn.execute(insert(model.__table__), chunk)
+        total += len(chunk)
+    return total
+
+def _company_type(n: int) -> CompanyType:
+    return COMPANY_TYPES[n % len(COMPANY_TYPES)]
+
+def _seed_company(conn: Connection, config: SeedConfig, n: int, password_hash: str, now: datetime) -> Dict[str, int]:
+    rng = random.Random(f"{config.seed}:{n}")
+    ids = _Ids(config, n)
+    company_id = ids.company
+    company_type = _company_type(n)
+    size = config.chunk_size
+    counts: Dict[str, int] = {}
+
+    def write(model, rows):
+        counts[model.__tablename__] = _write(conn, model, rows, size)
+
+    write(Company, iter([{
+        "id": company_id,
+        "name": "Default Company" if n == 0 else f"Company {company_id}",
+        "type": company_type,
+        "description": "Generated by app.db.seed",
+        "email": f"company{company_id}@example.com",
+        "phone": f"{1000000000 + company_id}",
+    }]))
+
+    store_ids = [ids.store + i + 1 for i in range(config.stores)]
+    write(Store, ({
+        "id": store_id,
+        "company_id": company_id,
+        "parent_store_id": None if i == 0 else store_ids[0],
+        "name": "Main Store" if i == 0 else f"Branch {i}",
+        "type": StoreType.MAIN if i == 0 else StoreType.SUB,
+        "email": f"store{store_id}@example.com",
+    } for i, store_id in enumerate(store_ids)))
+    write(StoreClosure, iter(
+        [{"ancestor_id": store_id, "descendant_id": store_id, "depth": 0} for store_id in store_ids]
+        + [{"ancestor_id": store_ids[0], "descendant_id": store_id, "depth": 1} for store_id in store_ids[1:]]
+    ))
+
+    user_id = ids.user
+    users = []
+    user_id += 1
+    admin_id = user_id
+    users.append((user_id, DEFAULT_ADMIN_EMAIL if n == 0 else f"admin{company_id}@example.com",
+                  UserRole.ADMIN, store_ids[0] if store_ids else None))
+    for store_id in store_ids:
+        user_id += 1
+        users.append((user_id, f"manager{store_id}@example.com", UserRole.MANAGER, store_id))
+        for s in range(config.staff_per_store):
+            user_id += 1
+            users.append((user_id, f"staff{store_id}-{s + 1}@example.com", UserRole.STAFF, store_id))
+    student_ids = []
+    if company_type == CompanyType.ACADEMY:
+        for s in range(config.students):
+            user_id += 1
+            student_ids.append(user_id)
+            users.append((user_id, f"student{company_id}-{s + 1}@example.com", UserRole.STAFF, None))
+    write(User, ({
+        "id": uid, "email": email, "password_hash": password_hash,
+        "first_name": role.value.title(), "last_name": str(uid), "role": role,
+        "company_id": company_id, "store_id": store_id, "is_active": True, "created_at": now,
+    } for uid, email, role, store_id in users))
+
+    category_ids = [ids.category + i + 1 for i in range(config.categories)]
+    write(Category, ({
+        "id": category_id, "company_id": company_id, "name": f"Category {i + 1}",
+        # second level categories hang under the first few
+        "parent_id": category_ids[i % 3] if i >= 3 else None,
+        "path": f"{category_ids[i % 3]}/{category_id}/" if i >= 3 else f"{category_id}/",
+    } for i, category_id in enumerate(category_ids)))
+
+    prices: List[float] = []
+    costs: List[float] = []
+
+    def item_rows():
+        for i in range(config.items):
+            item_id = ids.item + i + 1
+            cost = round(rng.uniform(0.5, 50), 2)
+            price = round(cost * rng.uniform(1.2, 2.0), 2)
+            prices.append(price)
+            costs.append(cost)
+            yield {
+                "id": item_id,
+                "company_id": company_id,
+                "name": f"Item {item_id}",
+                "barcode": f"{890000000000 + item_id}",
+                "type": ItemType.RAW_MATERIAL if company_type == CompanyType.BAKERY and i % 4 == 0
+                else ItemType.TOOL if company_type == CompanyType.TOOLS else ItemType.FINISHED_GOOD,
+                "unit_type": "pcs",
+                "category_id": rng.choice(category_ids) if category_ids else None,
+                "cost_price": cost,
+                "sell_price": price,
+                "tax_rate": 18.0,
+                "reorder_point": 10.0,
+            }
+    write(Item, item_rows())
+
+    opened_at = now - timedelta(days=config.order_days)
+    openings: List[dict] = []
+
+    def inventory_rows():
+        inventory_id = ids.inventory
+        for store_id in store_ids:
+            for i in range(config.items):
+                inventory_id += 1
+                quantity = float(rng.randint(0, 500))
+                if quantity:
+                    # opening balance movements reuse the inventory id
+                    openings.append({
+                        "id": inventory_id, "inventory_id": inventory_id,
+                        "movement_type": MovementType.ADJUSTMENT, "quantity": quantity, "unit": "pcs",
+                        "unit_cost": costs[i],
+                        "notes": "Opening balance", "created_at": opened_at,
+                    })
+                yield {
+                    "id": inventory_id, "store_id": store_id, "item_id": ids.item + i + 1,
+                    "quantity": quantity, "unit": "pcs", "created_at": opened_at,
+                }
+    write(Inventory, inventory_rows())
+    write(InventoryMovement, iter(openings))
+    openings.clear()
+
+    if company_type == CompanyType.BAKERY and config.items:
+        write(Recipe, ({
+            "id": ids.recipe + i + 1, "company_id": company_id, "name": f"Recipe {i + 1}",
+            "yield_quantity": float(rng.randint(10, 50)), "yield_unit": "pcs",
+            "category_id": rng.choice(category_ids) if category_ids else None,
+        } for i in range(config.recipes)))
+
+        def ingredient_rows():
+            for i in range(config.recipes):
+                recipe_id = ids.recipe + i + 1
+                picks = rng.sample(range(config.items), k=min(config.items, rng.randint(2, MAX_RECIPE_INGREDIENTS)))
+                for line, pick in enumerate(picks):
+                    yield {
+                        "id": (recipe_id - 1) * MAX_RECIPE_INGREDIENTS + line + 1,
+                        "recipe_id": recipe_id, "item_id": ids.item + pick + 1,
+                        "quantity": round(rng.uniform(0.1, 5), 2), "unit": "kg",
+                    }
+        write(RecipeIngredient, ingredient_rows())
+
+    if config.orders and config.items and store_ids:
+        order_lines: List[dict] = []
+        order_span = config.order_days * 24 * 3600
+
+        def order_rows():
+            for i in range(config.orders):
+                order_id = ids.order + i + 1
+                subtotal = tax = 0.0
+                for line in range(rng.randint(1, MAX_ORDER_LINES)):
+                    pick = rng.randrange(config.items)
+                    quantity = float(rng.randint(1, 3))
+                    line_total = round(prices[pick] * quantity, 2)
+                    subtotal += line_total
+                    tax += line_total * 0.18
+                    order_lines.append({
+                        "id": (order_id - 1) * MAX_ORDER_LINES + line + 1,
+                        "order_id": order_id, "item_id": ids.item + pick + 1,
+                        "quantity": quantity, "unit": "pcs", "unit_price": prices[pick],
+                        "tax_rate": 18.0, "discount": 0.0, "total": line_total,
+                    })
+                status = OrderStatus.COMPLETED if rng.random() < 0.9 else rng.choice(list(OrderStatus))
+                yield {
+                    "id": order_id,
+                    "company_id": company_id,
+                    "store_id": rng.choice(store_ids),
+                    "user_id": admin_id,
+                    "order_number": f"ORD-{order_id:010d}",
+                    "status": status,
+                    "subtotal": round(subtotal, 2),
+                    "tax": round(tax, 2),
+                    "discount": 0.0,
+                    "total": round(subtotal + tax, 2),
+                    "payment_status": PaymentStatus.PAID if status == OrderStatus.COMPLETED else PaymentStatus.PENDING,
+                    "payment_method": rng.choice(list(PaymentMethod)),
+                    "created_at": now - timedelta(seconds=rng.randrange(order_span)),
+                }
+
+        orders = lines = 0
+        for chunk in _chunks(order_rows(), size):
+            conn.execute(insert(Order.__table__), chunk)
+            conn.execute(insert(OrderItem.__table__), order_lines)
+            orders += len(chunk)
+            lines += len(order_lines)
+            order_lines.clear()
+        counts["orders"] = orders
+        counts["order_items"] = lines
+
+        # Open orders hold their stock, as crud_order.transition would have left it
+        conn.execute(
+            update(Inventory.__table__)
+            .where(Inventory.store_id.in_(store_ids))
+            .values(reserved_quantity=select(func.coalesce(func.sum(OrderItem.quantity), 0))
+                    .join(Order, Order.id == OrderItem.order_id)
+                    .where(
+                        Order.store_id == Inventory.store_id,
+                        OrderItem.item_id == Inventory.item_id,
+                        Order.status.in_([OrderStatus.CONFIRMED, OrderStatus.PROCESSING, OrderStatus.READY])
+                    )
+                    .scalar_subquery())
+        )
+
+    if company_type == CompanyType.ACADEMY and config.courses:
+        course_ids = [ids.course + i + 1 for i in range(config.courses)]
+        sections = config.sections_per_course
+        lessons = config.lessons_per_section
+        lesson_count = sections * lessons
+        write(Course, ({
+            "id": course_id, "company_id": company_id, "title": f"Course {course_id}",
+            "price": float(rng.randint(0, 200)), "duration": rng.randint(60, 600), "level": "beginner",
+            "status": CourseStatus.PUBLISHED, "is_featured": False, "lesson_count": lesson_count,
+            "created_at": now,
+        } for course_id in course_ids))
+        write(CourseSection, ({
+            "id": (course_id - 1) * sections + s + 1, "course_id": course_id,
+            "title": f"Section {s + 1}", "order": s + 1, "created_at": now,
+        } for course_id in course_ids for s in range(sections)))
+        write(Lesson, ({
+            "id": (section_id - 1) * lessons + l + 1, "section_id": section_id,
+            "title": f"Lesson {l + 1}", "duration": rng.randint(5, 30), "order": l + 1,
+            "is_preview": l == 0, "created_at": now,
+        } for course_id in course_ids
+            for section_id in range((course_id - 1) * sections + 1, course_id * sections + 1)
+            for l in range(lessons)))
+
+        enrollments = []
+        enrollment_id = ids.enrollment
+        for student_id in student_ids:
+            for course_id in rng.sample(course_ids, k=min(3, len(course_ids))):
+                enrollment_id += 1
+                completed = rng.randint(0, lesson_count)
+                progress = completed * 100.0 / lesson_count if lesson_count else 0.0
+                enrollments.append({
+                    "id": enrollment_id, "course_id": course_id, "user_id": student_id,
+                    "status": EnrollmentStatus.COMPLETED if progress == 100 else EnrollmentStatus.ACTIVE,
+                    "progress": progress, "completed_lessons": completed,
+                    "enrolled_at": now - timedelta(days=rng.randint(0, 180)),
+                })
+        write(CourseEnrollment, iter(enrollments))
+        # The completed lessons behind each counter: the course's first ones,
+        # whose ids run on from (course_id - 1) * lesson_count
+        write(LessonProgress, ({
+            "id": (enrollment["id"] - 1) * lesson_count + l + 1, "enrollment_id": enrollment["id"],
+            "lesson_id": (enrollment["course_id"] - 1) * lesson_count + l + 1, "is_completed": True,
+            "progress": 100.0, "last_position": 0.0, "completed_at": enrollment["enrolled_at"],
+            "created_at": enrollment["enrolled_at"],
+        } for enrollment in enrollments for l in range(enrollment["completed_lessons"])))
+
+    return counts
+
+def _seed_companies(engine: Engine, config: SeedConfig, numbers: List[int], password_hash: str, now: datetime) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for n in numbers:
+        with engine.begin() as conn:
+            for table, count in _seed_company(conn, config, n, password_hash, now).items():
+                totals[table] = totals.get(table, 0) + count
+    return totals
+
+def _seed_worker(url: str, config_data: dict, numbers: List[int], password_hash: str, now: datetime) -> Dict[str, int]:
+    """Subprocess entry point, each worker opens its own engine"""
+    from app.db.session import create_db_engine
+
+    engine = create_db_engine(url)
+    try:
+        return _seed_companies(engine, SeedConfig(**config_data), numbers, password_hash, now)
+    finally:
+        engine.dispose()
+
+def seed(
+    engine: Engine,
+    config: SeedConfig,
+    *,
+    workers: int = 1,
+    recreate: bool = True,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None
+) -> Dict[str, int]:
+    """
+    Generate `config` into `engine`. With `recreate` every table is dropped
+    and created first. Returns row counts per table.
+    """
+    if recreate:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+    if workers > 1 and engine.dialect.name == "sqlite":
+        logger.warning("SQLite allows a single writer; seeding with one worker")
+        workers = 1
+
+    # bcrypt is slow on purpose, hash once and share it between every user
+    password_hash = get_password_hash(DEFAULT_PASSWORD)
+    now = datetime.utcnow().replace(microsecond=0)
+    numbers = list(range(config.companies))
+    totals: Dict[str, int] = {}
+
+    def merge(counts: Dict[str, int]) -> None:
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+        if progress:
+            progress(totals)
+
+    if workers <= 1:
+        for n in numbers:
+            merge(_seed_companies(engine, config, [n], password_hash, now))
+    else:
+        url = engine.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_seed_worker, url, asdict(config), numbers[w::workers], password_hash, now)
+                for w in range(workers)
+            ]
+            for future in futures:
+                merge(future.result())
+    return totals
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from app.core import metrics
 from app.core.config import settings
 import logging
 import pymysql
@@ -9,15 +10,24 @@ pymysql.install_as_MySQLdb()
 
 logger = logging.getLogger(__name__)
 
+def create_db_engine(url: str):
+    """Create an engine with the connect args the URL's dialect expects"""
+    if url.startswith("sqlite"):
+        # Local benchmark/dev databases are shared across the threadpool
+        connect_args = {"check_same_thread": False}
+    else:
+        connect_args = {"charset": "utf8mb4"}
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        echo=settings.SQL_ECHO,
+        connect_args=connect_args
+    )
+
 logger.debug(f"Connecting to database: {settings.DATABASE_URL}")
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=True,  # Enable SQL logging
-    connect_args={
-        "charset": "utf8mb4"
-    }
-)
+engine = create_db_engine(settings.DATABASE_URL)
+
+metrics.track_pool("primary", engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,294 @@
+"""
+Horizontal sharding by company.
+
+Every shard is a database with the full schema. DATABASE_URL is the
+"default" shard, SHARD_URLS names the others. A company's rows (its
+stores, users, catalog, orders, inventory, ...) all live on one shard,
+and the company_shards table on the default shard lists the companies
+that don't live there. The directory is small, so each process caches all
+of it for SHARD_DIRECTORY_TTL_SECONDS. Without SHARD_URLS nothing is
+looked up and every session is a default one.
+
+Requests get a session on their company's shard from deps.get_db, which
+reads the company_id claim of the session token. New companies are always
+created on the default shard, which therefore hands out every company id.
+Reads that span companies (the admin listings) go through fan_out, which
+runs a query on every shard in parallel, and the caller merges the
+results.
+
+Ids other than company ids come from each shard's own counters, so they
+are only unique within a shard. On MySQL, give each shard server its own
+auto_increment_offset (with a shared auto_increment_increment) to keep them
+unique everywhere; the caches keyed by row id alone (course trees,
+realtime store channels) rely on it. move_company refuses to move rows
+onto ids that are already taken on the target.
+
+A move marks the company MOVING, so requests for it get a 503, and waits
+for every process to see that. It then copies the rows, points the
+directory at the new shard and deletes the rows from the old shard.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import create_db_engine, engine
+from app.models.company import CompanyShard, ShardStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD = "default"
+
+T = TypeVar("T")
+
+class CompanyMovingError(Exception):
+    """The company is being moved to another shard"""
+
+def session_shard(db: Session) -> str:
+    """Name of the shard a session is bound to"""
+    return db.info.get("shard", DEFAULT_SHARD)
+
+class ShardRouter:
+    def __init__(self, engines: Dict[str, Engine], directory_ttl: float):
+        self.engines = engines
+        self.directory_ttl = directory_ttl
+        self._sessions = {
+            name: sessionmaker(autocommit=False, autoflush=False, bind=shard_engine, info={"shard": name})
+            for name, shard_engine in engines.items()
+        }
+        self._directory: Dict[int, Tuple[str, ShardStatus]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.engines)
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def session(self, shard: str = DEFAULT_SHARD) -> Session:
+        if shard not in self._sessions:
+            raise ValueError(f"Unknown shard {shard}")
+        return self._sessions[shard]()
+
+    def _entries(self) -> Dict[int, Tuple[str, ShardStatus]]:
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.directory_ttl:
+                return self._directory
+        db = self.session(DEFAULT_SHARD)
+        try:
+            directory = {
+                row.company_id: (row.shard, ShardStatus(row.status))
+                for row in db.execute(select(CompanyShard.company_id, CompanyShard.shard, CompanyShard.status))
+            }
+        finally:
+            db.close()
+        with self._lock:
+            self._directory, self._loaded_at = directory, now
+        return directory
+
+    def shard_for(self, company_id: int) -> str:
+        """The company's shard. Raises CompanyMovingError while it is being moved."""
+        if not self.sharded:
+            return DEFAULT_SHARD
+        shard, status = self._entries().get(company_id, (DEFAULT_SHARD, ShardStatus.ACTIVE))
+        if status == ShardStatus.MOVING:
+            raise CompanyMovingError(f"Company {company_id} is being moved to another shard")
+        return shard
+
+    def session_for(self, company_id: int) -> Session:
+        return self.session(self.shard_for(company_id))
+
+    def invalidate(self) -> None:
+        """Re-read the directory on next use"""
+        with self._lock:
+            self._loaded_at = None
+
+    def fan_out(self, query: Callable[[Session], T], shards: Optional[Iterable[str]] = None) -> Dict[str, T]:
+        """Run `query` with a session on every shard (or `shards`) in parallel, {shard: result}"""
+        shards = list(shards) if shards is not None else self.names
+
+        def run(shard: str) -> T:
+            db = self.session(shard)
+            try:
+                return query(db)
+            finally:
+                db.close()
+
+        if len(shards) == 1:
+            return {shards[0]: run(shards[0])}
+        with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="shard-fan-out") as pool:
+            return dict(zip(shards, pool.map(run, shards)))
+
+def _create_router() -> ShardRouter:
+    engines = {DEFAULT_SHARD: engine}
+    for name, url in settings.SHARD_URLS.items():
+        if name == DEFAULT_SHARD:
+            raise ValueError(f'SHARD_URLS cannot name a shard "{DEFAULT_SHARD}", that is DATABASE_URL')
+        engines[name] = create_db_engine(url)
+        metrics.track_pool(f"shard-{name}", engines[name])
+    return ShardRouter(engines, settings.SHARD_DIRECTORY_TTL_SECONDS)
+
+shard_router = _create_router()
+
+def merge_pages(pages: Iterable[Sequence[T]], *, key: Callable[[T], object], skip: int, limit: int) -> List[T]:
+    """
+    One page of the union of per-shard pages, ordered by `key`. Each shard
+    must return its first skip + limit rows in that order.
+    """
+    rows = sorted((row for page in pages for row in page), key=key)
+    return rows[skip:skip + limit]
+
+def _company_tables() -> List[Tuple[object, Optional[Tuple[object, str]]]]:
+    """
+    Tables holding company rows, parents first, each with how its rows are
+    found: None when it has a company_id column (or is `companies`), else
+    (foreign key column, parent table name) through a parent's ids.
+    """
+    tables = []
+    owned = set()
+    for table in Base.metadata.sorted_tables:
+        if table.name == CompanyShard.__tablename__:
+            continue
+        if table.name == "companies" or "company_id" in table.c:
+            tables.append((table, None))
+        else:
+            parents = [
+                (fk.parent, fk.column.table.name) for fk in table.foreign_keys
+                if fk.column.table.name in owned and fk.column.name == "id"
+            ]
+            if not parents:
+                continue
+            tables.append((table, parents[0]))
+        owned.add(table.name)
+    return tables
+
+def _parent_tables() -> set:
+    """Company tables that other company tables are found through"""
+    return {parent[1] for _, parent in _company_tables() if parent is not None}
+
+def _chunks(values: Sequence[int], size: int) -> Iterable[Sequence[int]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _company_selects(company_id: int, ids: Dict[str, List[int]], batch_size: int):
+    """(table, selects) pairs covering the company's rows, in insert order"""
+    for table, parent in _company_tables():
+        if parent is None:
+            column = table.c.id if table.name == "companies" else table.c.company_id
+            yield table, [select(table).where(column == company_id)]
+        else:
+            column, parent_name = parent
+            yield table, [
+                select(table).where(column.in_(chunk)) for chunk in _chunks(ids.get(parent_name, []), batch_size)
+            ]
+
+def _disable_foreign_keys(conn: Connection) -> None:
+    # Self-referencing rows (store and category trees) aren't in parent
+    # order, and deletes can't be either
+    if conn.dialect.name == "mysql":
+        conn.exec_driver_sql("SET FOREIGN_KEY_CHECKS=0")
+
+def _set_directory(company_id: int, shard: str, status: ShardStatus) -> None:
+    with engine.begin() as conn:
+        conn.execute(delete(CompanyShard).where(CompanyShard.company_id == company_id))
+        if shard != DEFAULT_SHARD or status != ShardStatus.ACTIVE:
+            conn.execute(insert(CompanyShard).values(company_id=company_id, shard=shard, status=status))
+    shard_router.invalidate()
+
+def copy_company(source: Connection, target: Connection, *, company_id: int, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Copy a company's rows between two connections, keeping their ids.
+    Raises ValueError if an id is already taken on the target. Returns
+    {table: rows copied} and leaves committing to the caller.
+    """
+    ids: Dict[str, List[int]] = {}
+    counts: Dict[str, int] = {}
+    parents = _parent_tables()
+    for table, statements in _company_selects(company_id, ids, batch_size):
+        keep_ids = table.name in parents
+        for statement in statements:
+            result = source.execute(statement.execution_options(yield_per=batch_size)).mappings()
+            for rows in result.partitions(batch_size):
+                rows = [dict(row) for row in rows]
+                if "id" in table.c:
+                    row_ids = [row["id"] for row in rows]
+                    taken = target.execute(select(table.c.id).where(table.c.id.in_(row_ids)).limit(1)).first()
+                    if taken is not None:
+                        raise ValueError(f"{table.name} id {taken[0]} already exists on the target shard")
+                    if keep_ids:
+                        ids.setdefault(table.name, []).extend(row_ids)
+                target.execute(insert(table), rows)
+                counts[table.name] = counts.get(table.name, 0) + len(rows)
+    return counts
+
+def delete_company(conn: Connection, *, company_id: int, batch_size: int = 1000) -> Dict[str, int]:
+    """Delete a company's rows, children first. Leaves committing to the caller."""
+    ids: Dict[str, List[int]] = {}
+    plan = []
+    parents = _parent_tables()
+    # Collect the ids first: children are found through their parents' ids
+    for table, statements in _company_selects(company_id, ids, batch_size):
+        if table.name in parents:
+            for statement in statements:
+                ids.setdefault(table.name, []).extend(
+                    conn.scalars(statement.with_only_columns(table.c.id))
+                )
+        plan.append((table, statements))
+    counts: Dict[str, int] = {}
+    for table, statements in reversed(plan):
+        for statement in statements:
+            result = conn.execute(delete(table).where(statement.whereclause))
+            counts[table.name] = counts.get(table.name, 0) + result.rowcount
+    return counts
+
+def move_company(company_id: int, to_shard: str, *, batch_size: int = 1000, settle_seconds: float = 0.0) -> Dict[str, int]:
+    """
+    Move a company to `to_shard`. Requests for the company fail with 503
+    from marking it MOVING until the directory points at the new shard;
+    `settle_seconds` (the directory TTL plus the longest request, across
+    processes) is waited out before copying. Returns {table: rows moved}.
+    """
+    if to_shard not in shard_router.engines:
+        raise ValueError(f"Unknown shard {to_shard}")
+    from_shard = shard_router.shard_for(company_id)
+    if from_shard == to_shard:
+        raise ValueError(f"Company {company_id} is already on shard {to_shard}")
+
+    source_engine, target_engine = shard_router.engines[from_shard], shard_router.engines[to_shard]
+    with source_engine.connect() as source:
+        if source.execute(select(Base.metadata.tables["companies"].c.id).where(
+            Base.metadata.tables["companies"].c.id == company_id
+        )).first() is None:
+            raise ValueError(f"Company {company_id} not found on shard {from_shard}")
+
+    _set_directory(company_id, from_shard, ShardStatus.MOVING)
+    try:
+        if settle_seconds:
+            logger.info(f"Company {company_id} marked moving, waiting {settle_seconds:g}s for requests to drain")
+            time.sleep(settle_seconds)
+        with source_engine.connect() as source, target_engine.begin() as target:
+            _disable_foreign_keys(target)
+            counts = copy_company(source, target, company_id=company_id, batch_size=batch_size)
+    except Exception:
+        _set_directory(company_id, from_shard, ShardStatus.ACTIVE)
+        raise
+    _set_directory(company_id, to_shard, ShardStatus.ACTIVE)
+    logger.info(f"Company {company_id} copied to shard {to_shard}: {sum(counts.values())} rows")
+
+    with source_engine.begin() as source:
+        _disable_foreign_keys(source)
+        delete_company(source, company_id=company_id, batch_size=batch_size)
+    logger.info(f"Company {company_id} removed from shard {from_shard}")
+    return counts
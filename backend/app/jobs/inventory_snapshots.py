@@ -0,0 +1,42 @@
+"""
+Take inventory ledger snapshots.
+
+    python -m app.jobs.inventory_snapshots              # daily, from cron
+    python -m app.jobs.inventory_snapshots --every 500  # only busy rows
+    python -m app.jobs.inventory_snapshots --shard eu   # once per shard
+
+Point-in-time stock (`GET /inventory/store/{id}?as_of=`) and the
+reconciliation job start from the newest snapshot and only sum the
+movements after it, so running this regularly keeps both cheap.
+"""
+import argparse
+import logging
+import time
+
+from app.crud.crud_inventory import crud_inventory
+from app.db.shards import DEFAULT_SHARD, shard_router
+
+logger = logging.getLogger(__name__)
+
+def run(min_movements: int = 1, chunk_size: int = 1000, shard: str = DEFAULT_SHARD) -> int:
+    db = shard_router.session(shard)
+    try:
+        return crud_inventory.take_snapshots(db, min_movements=min_movements, chunk_size=chunk_size)
+    finally:
+        db.close()
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--every", type=int, default=1,
+                        help="snapshot rows with at least this many movements since their last snapshot")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--shard", choices=shard_router.names, default=DEFAULT_SHARD)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    taken = run(min_movements=args.every, chunk_size=args.chunk_size, shard=args.shard)
+    logger.info(f"Took {taken} inventory snapshots in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Bring inventory valuation state up to date with the movement ledger.
+
+    python -m app.jobs.inventory_valuation
+    python -m app.jobs.inventory_valuation --store-id 3
+    python -m app.jobs.inventory_valuation --shard eu
+
+GET /inventory/valuation catches up on its own before answering; running
+this regularly keeps the amount of work left for the request small.
+"""
+import argparse
+import logging
+import time
+
+from app.db.shards import DEFAULT_SHARD, shard_router
+from app.services.valuation import refresh_valuations
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store-id", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--shard", choices=shard_router.names, default=DEFAULT_SHARD)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    db = shard_router.session(args.shard)
+    try:
+        applied = refresh_valuations(db, store_id=args.store_id, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    logger.info(f"Applied {applied} movements to valuations in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Deliver transactional outbox messages (low-stock alerts and other side
+effects written alongside orders and movements).
+
+    python -m app.jobs.outbox_worker              # long-running, one or more processes
+    python -m app.jobs.outbox_worker --shard eu   # the outbox of another shard
+    python -m app.jobs.outbox_worker --once       # drain every shard and exit (cron)
+
+Several workers may run at once: each claims its own batches. A
+long-running worker drains one shard, so run at least one per shard.
+SIGTERM finishes the current batch and exits.
+"""
+import argparse
+import logging
+import signal
+import time
+from functools import partial
+
+from app.core.config import settings
+from app.db.shards import DEFAULT_SHARD, shard_router
+from app.services import outbox
+# Handlers register themselves on import
+from app.services import stock_alerts  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain everything that is due, then exit")
+    parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=settings.OUTBOX_POLL_SECONDS,
+                        help="seconds to wait when the outbox is empty")
+    parser.add_argument("--shard", choices=shard_router.names, default=None,
+                        help=f"shard to drain, {DEFAULT_SHARD} by default (every shard with --once)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        started = time.perf_counter()
+        shards = [args.shard] if args.shard else shard_router.names
+        claimed = sum(shard_router.fan_out(
+            lambda db: outbox.drain_all(db, batch_size=args.batch_size), shards=shards
+        ).values())
+        logger.info(f"Handled {claimed} outbox messages in {time.perf_counter() - started:.1f}s")
+        return
+
+    worker = outbox.OutboxWorker()
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    shard = args.shard or DEFAULT_SHARD
+    logger.info(f"Outbox worker started on shard {shard}")
+    try:
+        worker.run(partial(shard_router.session, shard), args.interval, batch_size=args.batch_size)
+    except KeyboardInterrupt:
+        pass
+    logger.info("Outbox worker stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Check Inventory.quantity against the movement ledger.
+
+    python -m app.jobs.reconcile_inventory --chunk-size 1000
+    python -m app.jobs.reconcile_inventory --shard eu
+
+Inventory rows are read in primary key order, one chunk at a time, and
+compared with their ledger balance (latest snapshot plus later movements).
+Everything runs in one transaction, so on MySQL both sides come from the
+same consistent read. Exits with status 1 when any row disagrees.
+"""
+import argparse
+import logging
+import sys
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud.crud_inventory import crud_inventory
+from app.db.shards import DEFAULT_SHARD, shard_router
+from app.models.inventory import Inventory
+
+logger = logging.getLogger(__name__)
+
+def reconcile(db: Session, *, chunk_size: int = 1000, tolerance: float = 1e-6) -> Iterator[Dict[str, Any]]:
+    """Yield the inventory rows whose quantity differs from the ledger"""
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Inventory.id, Inventory.store_id, Inventory.item_id, Inventory.quantity)
+            .where(Inventory.id > last_id)
+            .order_by(Inventory.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        balances = crud_inventory.ledger_balances(db, inventory_ids=[row.id for row in rows])
+        for row in rows:
+            ledger = balances.get(row.id, 0.0)
+            if abs((row.quantity or 0.0) - ledger) > tolerance:
+                yield {
+                    "inventory_id": row.id,
+                    "store_id": row.store_id,
+                    "item_id": row.item_id,
+                    "quantity": row.quantity,
+                    "ledger": ledger,
+                }
+        last_id = rows[-1].id
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--shard", choices=shard_router.names, default=DEFAULT_SHARD)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db = shard_router.session(args.shard)
+    mismatches = 0
+    try:
+        for mismatch in reconcile(db, chunk_size=args.chunk_size):
+            mismatches += 1
+            logger.warning(
+                f"Inventory {mismatch['inventory_id']} (store {mismatch['store_id']}, item {mismatch['item_id']}): "
+                f"quantity {mismatch['quantity']} but ledger says {mismatch['ledger']}"
+            )
+    finally:
+        db.close()
+    logger.info(f"Reconciliation finished with {mismatches} mismatch(es)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
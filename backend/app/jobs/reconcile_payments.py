@@ -0,0 +1,90 @@
+"""
+Match a payment provider's statement against recorded payments.
+
+    python -m app.jobs.reconcile_payments statement.csv --company-id 1
+    python -m app.jobs.reconcile_payments mpesa.csv --company-id 1 \\
+        --reference-column "Receipt No." --amount-column "Paid In" --output exceptions.csv
+
+The statement is a CSV export (mobile money, card acquirer) with a header
+row. It is read line by line and matched in chunks to Payment.reference,
+so only one chunk of lines is held at a time, plus the references already
+matched (to report duplicates).
+Pending payments found on the statement are confirmed as paid. Lines that
+don't match cleanly are written to --output (stdout by default). Exits
+with status 1 when there are any.
+"""
+import argparse
+import csv
+import logging
+import sys
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from app.crud.crud_payment import crud_payment
+from app.db.shards import shard_router
+
+logger = logging.getLogger(__name__)
+
+EXCEPTION_FIELDS = ["line", "reference", "amount", "result", "payment_id", "payment_amount"]
+
+def _amount(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value.replace(",", "").strip())
+    except (AttributeError, ValueError):
+        return None
+
+def read_statement(
+    file: TextIO, *, reference_column: str = "reference", amount_column: str = "amount"
+) -> Iterator[Dict[str, Any]]:
+    """Statement lines as {line, reference, amount}, numbered from the first data row"""
+    reader = csv.DictReader(file)
+    missing = {reference_column, amount_column} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Statement has no {', '.join(sorted(missing))} column")
+    for number, row in enumerate(reader, start=1):
+        yield {
+            "line": number,
+            "reference": (row[reference_column] or "").strip(),
+            "amount": _amount(row[amount_column]),
+        }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("statement", help="CSV file with a header row")
+    parser.add_argument("--company-id", type=int, required=True)
+    parser.add_argument("--reference-column", default="reference")
+    parser.add_argument("--amount-column", default="amount")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--output", help="where to write the exceptions CSV, stdout by default")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    results = Counter()
+    db = shard_router.session_for(args.company_id)
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        # utf-8-sig: spreadsheet exports often start with a byte order mark
+        with open(args.statement, newline="", encoding="utf-8-sig") as statement:
+            writer = csv.DictWriter(output, fieldnames=EXCEPTION_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            lines = read_statement(
+                statement, reference_column=args.reference_column, amount_column=args.amount_column
+            )
+            for exception in crud_payment.reconcile_statement(
+                db, company_id=args.company_id, lines=lines, chunk_size=args.chunk_size
+            ):
+                results[exception["result"]] += 1
+                writer.writerow(exception)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    finally:
+        db.close()
+        if output is not sys.stdout:
+            output.close()
+    summary = ", ".join(f"{count} {result}" for result, count in sorted(results.items())) or "no exceptions"
+    logger.info(f"Reconciliation finished: {summary}")
+    return 1 if results else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
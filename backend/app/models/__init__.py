@@ -1,7 +1,10 @@
 from .user import User
-from .company import Company, Store
+from .company import Company, CompanyShard, Store, StoreClosure
 from .item import Item, Category
 from .inventory import Inventory
 from .recipe import Recipe
 from .order import Order, OrderItem, Payment
+from .pricing import PriceList, PriceListItem, Promotion
+from .outbox import OutboxMessage
+from .replication import ReplicationHeartbeat
 from .academy import Course, CourseSection, Lesson, CourseEnrollment, LessonProgress 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 import enum
@@ -19,6 +19,9 @@ class EnrollmentStatus(str, enum.Enum):
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        Index("ix_courses_company_id", "company_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -32,15 +35,23 @@ class Course(Base):
     is_featured = Column(Boolean, default=False)
     requirements = Column(String(1000))  # Store as JSON string
     what_you_learn = Column(String(1000))  # Store as JSON string
+    lesson_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every update; keys the cached course trees
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
 
     company = relationship("Company", back_populates="courses")
-    sections = relationship("CourseSection", back_populates="course", cascade="all, delete-orphan")
+    sections = relationship(
+        "CourseSection", back_populates="course", cascade="all, delete-orphan", order_by="CourseSection.order"
+    )
     enrollments = relationship("CourseEnrollment", back_populates="course", cascade="all, delete-orphan")
 
 class CourseSection(Base):
     __tablename__ = "course_sections"
+    __table_args__ = (
+        Index("ix_course_sections_course_id_order", "course_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
@@ -51,10 +62,13 @@ class CourseSection(Base):
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
 
     course = relationship("Course", back_populates="sections")
-    lessons = relationship("Lesson", back_populates="section", cascade="all, delete-orphan")
+    lessons = relationship("Lesson", back_populates="section", cascade="all, delete-orphan", order_by="Lesson.order")
 
 class Lesson(Base):
     __tablename__ = "lessons"
+    __table_args__ = (
+        Index("ix_lessons_section_id_order", "section_id", "order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     section_id = Column(Integer, ForeignKey("course_sections.id"), nullable=False)
@@ -73,12 +87,17 @@ class Lesson(Base):
 
 class CourseEnrollment(Base):
     __tablename__ = "course_enrollments"
+    __table_args__ = (
+        Index("uq_course_enrollments_user_id_course_id", "user_id", "course_id", unique=True),
+        Index("ix_course_enrollments_course_id", "course_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     status = Column(SQLEnum(EnrollmentStatus), nullable=False, default=EnrollmentStatus.ACTIVE)
     progress = Column(Float, nullable=False, default=0)
+    completed_lessons = Column(Integer, nullable=False, default=0, server_default="0")
     enrolled_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed_at = Column(DateTime)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
@@ -89,6 +108,9 @@ class CourseEnrollment(Base):
 
 class LessonProgress(Base):
     __tablename__ = "lesson_progress"
+    __table_args__ = (
+        Index("uq_lesson_progress_enrollment_id_lesson_id", "enrollment_id", "lesson_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     enrollment_id = Column(Integer, ForeignKey("course_enrollments.id"), nullable=False)
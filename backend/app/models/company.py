@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Float, Boolean, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Float, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -22,6 +22,8 @@ class Company(Base):
     logo_url = Column(String(255))
     tax_number = Column(String(50))
     registration_number = Column(String(50))
+    # Bumped after every catalog write, see app.core.cache
+    catalog_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -36,6 +38,9 @@ class StoreType(str, enum.Enum):
 
 class Store(Base):
     __tablename__ = "stores"
+    __table_args__ = (
+        Index("ix_stores_company_id", "company_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -54,3 +59,31 @@ class Store(Base):
     inventory = relationship("Inventory", back_populates="store")
     users = relationship("User", back_populates="store")
     orders = relationship("Order", back_populates="store", cascade="all, delete-orphan")
+
+class StoreClosure(Base):
+    """
+    Every (ancestor, descendant) pair of the store tree, including each
+    store paired with itself at depth 0. Maintained by CRUDStore.
+    """
+    __tablename__ = "store_closure"
+    __table_args__ = (
+        Index("ix_store_closure_descendant_id_depth", "descendant_id", "depth"),
+    )
+
+    ancestor_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+class ShardStatus(str, enum.Enum):
+    ACTIVE = "active"
+    MOVING = "moving"
+
+class CompanyShard(Base):
+    """Which shard a company's rows live on, for companies not on the default shard"""
+    __tablename__ = "company_shards"
+
+    # No foreign key: the company row lives on its shard
+    company_id = Column(Integer, primary_key=True)
+    shard = Column(String(50), nullable=False)
+    status = Column(Enum(ShardStatus), nullable=False, default=ShardStatus.ACTIVE)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text, Enum, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -13,11 +13,16 @@ class MovementType(str, enum.Enum):
 
 class Inventory(Base):
     __tablename__ = "inventory"
+    __table_args__ = (
+        Index("uq_inventory_store_id_item_id", "store_id", "item_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
     quantity = Column(Float, default=0)
+    # Held for confirmed orders that haven't been completed yet
+    reserved_quantity = Column(Float, nullable=False, default=0, server_default="0")
     unit = Column(String(20), nullable=False)
     last_counted_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -27,9 +32,15 @@ class Inventory(Base):
     store = relationship("Store", back_populates="inventory")
     item = relationship("Item", back_populates="inventory")
     movements = relationship("InventoryMovement", back_populates="inventory")
+    snapshots = relationship("InventorySnapshot", back_populates="inventory")
+    valuation = relationship("InventoryValuation", back_populates="inventory", uselist=False)
+    batches = relationship("Batch", back_populates="inventory")
 
 class InventoryMovement(Base):
     __tablename__ = "inventory_movements"
+    __table_args__ = (
+        Index("ix_inventory_movements_inventory_id_created_at", "inventory_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False)
@@ -37,6 +48,7 @@ class InventoryMovement(Base):
     movement_type = Column(Enum(MovementType), nullable=False)
     quantity = Column(Float, nullable=False)
     unit = Column(String(20), nullable=False)
+    unit_cost = Column(Float)  # Cost of incoming stock, used for valuation
     reference_id = Column(Integer)  # For linking to PO, SO, Transfer, etc.
     reference_type = Column(String(50))
     notes = Column(Text)
@@ -46,3 +58,45 @@ class InventoryMovement(Base):
     # Relationships
     inventory = relationship("Inventory", back_populates="movements")
     batch = relationship("Batch", back_populates="inventory_movements")
+
+class InventorySnapshot(Base):
+    """
+    Ledger balance of one inventory row after all movements up to and
+    including `last_movement_id`. `taken_at` is the newest of those
+    movements' created_at, so a snapshot is valid for any time at or after it.
+    """
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        Index("uq_inventory_snapshots_inventory_id_last_movement_id", "inventory_id", "last_movement_id", unique=True),
+        Index("ix_inventory_snapshots_inventory_id_taken_at", "inventory_id", "taken_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False)
+    quantity = Column(Float, nullable=False)
+    last_movement_id = Column(Integer, nullable=False)
+    taken_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    inventory = relationship("Inventory", back_populates="snapshots")
+
+class InventoryValuation(Base):
+    """
+    Valuation state of one inventory row after all movements up to
+    `last_movement_id`: FIFO cost layers and the weighted average cost.
+    Maintained incrementally by app.services.valuation.
+    """
+    __tablename__ = "inventory_valuations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"), nullable=False, unique=True)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+    quantity = Column(Float, nullable=False, default=0)
+    average_cost = Column(Float, nullable=False, default=0)
+    fifo_value = Column(Float, nullable=False, default=0)
+    layers = Column(JSON, nullable=False)  # [[quantity, unit_cost], ...], oldest first
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    inventory = relationship("Inventory", back_populates="valuation")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -11,6 +11,10 @@ class ItemType(str, enum.Enum):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        Index("ix_items_company_id_name", "company_id", "name"),
+        Index("ix_items_category_id", "category_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -36,12 +40,20 @@ class Item(Base):
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        Index("ix_categories_company_id_name", "company_id", "name"),
+        Index("ix_categories_parent_id", "parent_id"),
+        Index("ix_categories_company_id_path", "company_id", "path"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
     name = Column(String(50), nullable=False)
     description = Column(Text)
     parent_id = Column(Integer, ForeignKey("categories.id"))
+    # Materialized path: the ids from the root down to this category, each
+    # followed by "/", e.g. "3/17/42/". A subtree is every path with its prefix.
+    path = Column(String(255), nullable=False, server_default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
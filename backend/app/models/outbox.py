@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Text, Index, JSON
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+import enum
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    DEAD = "dead"
+
+class OutboxMessage(Base):
+    """
+    A side effect to run after the transaction that wrote it commits.
+    Delivered messages are deleted; messages that ran out of attempts stay
+    behind as DEAD for inspection.
+    """
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        Index("ix_outbox_messages_status_available_at", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not picked up before this time: the retry backoff, or the lease of
+    # the worker that claimed it (naive UTC)
+    available_at = Column(DateTime, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,76 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum, Boolean, Time, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+import enum
+
+class DiscountType(str, enum.Enum):
+    PERCENT = "percent"  # value is a percentage of the unit price
+    AMOUNT = "amount"  # value is taken off each unit
+    FIXED_PRICE = "fixed_price"  # value is the unit price while the promotion runs
+
+class PriceList(Base):
+    """
+    Prices that replace Item.sell_price, in one store or, without a store,
+    in every store of the company. A store's own list beats a company-wide
+    one; among lists of the same kind the highest priority wins.
+    """
+    __tablename__ = "price_lists"
+    __table_args__ = (
+        Index("ix_price_lists_company_id", "company_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"))
+    name = Column(String(100), nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    items = relationship("PriceListItem", back_populates="price_list", cascade="all, delete-orphan")
+
+class PriceListItem(Base):
+    __tablename__ = "price_list_items"
+    __table_args__ = (
+        Index("uq_price_list_items_price_list_id_item_id", "price_list_id", "item_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    price_list_id = Column(Integer, ForeignKey("price_lists.id"), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    price = Column(Float, nullable=False)
+
+    # Relationships
+    price_list = relationship("PriceList", back_populates="items")
+
+class Promotion(Base):
+    """
+    A discount on one item, on a category and everything below it, or
+    (with neither) on every item, between starts_at and ends_at (naive
+    UTC, ends_at open if empty). daily_start/daily_end and weekdays
+    (bit 0 = Monday) narrow it to a happy hour in STORE_TIMEZONE.
+    """
+    __tablename__ = "promotions"
+    __table_args__ = (
+        Index("ix_promotions_company_id_ends_at", "company_id", "ends_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"))
+    name = Column(String(100), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"))
+    category_id = Column(Integer, ForeignKey("categories.id"))
+    discount_type = Column(Enum(DiscountType), nullable=False)
+    value = Column(Float, nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime)
+    daily_start = Column(Time)
+    daily_end = Column(Time)
+    weekdays = Column(Integer)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
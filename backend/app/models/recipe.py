@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
 class Recipe(Base):
     __tablename__ = "recipes"
+    __table_args__ = (
+        Index("ix_recipes_company_id", "company_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
@@ -25,6 +28,9 @@ class Recipe(Base):
 
 class RecipeIngredient(Base):
     __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        Index("ix_recipe_ingredients_recipe_id", "recipe_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
@@ -41,12 +47,20 @@ class RecipeIngredient(Base):
 
 class Batch(Base):
     __tablename__ = "batches"
+    __table_args__ = (
+        # "expiring soon" per store, and FEFO order within an inventory row
+        # remaining_quantity lets expiry lookups skip sold-out batches in the index
+        Index("ix_batches_store_id_expiry_date_remaining", "store_id", "expiry_date", "remaining_quantity"),
+        Index("ix_batches_inventory_id_expiry_date", "inventory_id", "expiry_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
     store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
+    inventory_id = Column(Integer, ForeignKey("inventory.id"))  # Stock the batch was produced into
     batch_number = Column(String(50), unique=True)
     quantity = Column(Float, nullable=False)
+    remaining_quantity = Column(Float, nullable=False, default=0)  # Not yet sold or written off
     unit = Column(String(20), nullable=False)
     production_date = Column(DateTime(timezone=True), nullable=False)
     expiry_date = Column(DateTime(timezone=True))
@@ -58,4 +72,5 @@ class Batch(Base):
     # Relationships
     recipe = relationship("Recipe", back_populates="batches")
     store = relationship("Store")
+    inventory = relationship("Inventory", back_populates="batches")
     inventory_movements = relationship("InventoryMovement", back_populates="batch")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Double, Integer
+from app.db.base_class import Base
+
+class ReplicationHeartbeat(Base):
+    """
+    One row per database, updated on the primary every
+    REPLICA_HEARTBEAT_SECONDS. How old a replica's copy is tells its lag.
+    """
+    __tablename__ = "replication_heartbeats"
+
+    id = Column(Integer, primary_key=True)
+    # Unix time of the last beat, from the writing process's clock
+    beat_at = Column(Double, nullable=False)
@@ -5,7 +5,9 @@ from . import item
 from . import inventory
 from . import recipe
 from . import order
+from . import pricing
 from . import academy
+from . import report
 
 __all__ = [
     "user",
@@ -15,5 +17,7 @@ __all__ = [
     "inventory",
     "recipe",
     "order",
-    "academy"
+    "pricing",
+    "academy",
+    "report"
 ] 
\ No newline at end of file
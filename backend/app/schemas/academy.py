@@ -16,7 +16,8 @@ class LessonCreate(LessonBase):
     pass
 
 class LessonUpdate(LessonBase):
-    pass
+    # Set to update a stored lesson, leave out to add a new one
+    id: Optional[int] = None
 
 class Lesson(LessonBase):
     id: int
@@ -36,6 +37,9 @@ class CourseSectionCreate(CourseSectionBase):
     lessons: Optional[List[LessonCreate]] = None
 
 class CourseSectionUpdate(CourseSectionBase):
+    # Set to update a stored section, leave out to add a new one
+    id: Optional[int] = None
+    # Left out, the section keeps its lessons
     lessons: Optional[List[LessonUpdate]] = None
 
 class CourseSection(CourseSectionBase):
@@ -65,6 +69,8 @@ class CourseCreate(CourseBase):
     sections: Optional[List[CourseSectionCreate]] = None
 
 class CourseUpdate(CourseBase):
+    # A course never changes company: the field is accepted but ignored
+    company_id: Optional[int] = None
     sections: Optional[List[CourseSectionUpdate]] = None
 
 class Course(CourseBase):
@@ -90,6 +96,7 @@ class CourseEnrollmentUpdate(CourseEnrollmentBase):
 
 class CourseEnrollment(CourseEnrollmentBase):
     id: int
+    completed_lessons: int = 0
     enrolled_at: datetime
     completed_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -110,6 +117,16 @@ class LessonProgressCreate(LessonProgressBase):
 class LessonProgressUpdate(LessonProgressBase):
     pass
 
+class LessonHeartbeat(BaseModel):
+    enrollment_id: int
+    lesson_id: int
+    last_position: float = Field(ge=0)
+    progress: float = Field(default=0, ge=0, le=100)
+    is_completed: bool = False
+
+class LessonHeartbeatBatch(BaseModel):
+    heartbeats: List[LessonHeartbeat] = Field(max_length=1000)
+
 class LessonProgress(LessonProgressBase):
     id: int
     completed_at: Optional[datetime] = None
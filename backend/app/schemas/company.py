@@ -16,7 +16,8 @@ class StoreCreate(StoreBase):
     parent_store_id: Optional[int] = None
 
 class StoreUpdate(StoreBase):
-    pass
+    # Set to move the store (and everything below it) under another store
+    parent_store_id: Optional[int] = None
 
 class Store(StoreBase):
     id: int
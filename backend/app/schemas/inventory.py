@@ -18,6 +18,7 @@ class InventoryUpdate(InventoryBase):
 
 class Inventory(InventoryBase):
     id: int
+    reserved_quantity: float = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -30,6 +31,7 @@ class InventoryMovementBase(BaseModel):
     movement_type: MovementType
     quantity: float
     unit: str
+    unit_cost: Optional[float] = None
     reference_id: Optional[int] = None
     reference_type: Optional[str] = None
     notes: Optional[str] = None
@@ -48,6 +50,20 @@ class InventoryMovement(InventoryMovementBase):
     class Config:
         from_attributes = True
 
+class ItemValuation(BaseModel):
+    inventory_id: int
+    item_id: int
+    quantity: float
+    average_cost: float
+    weighted_average_value: float
+    fifo_value: float
+
+class StoreValuation(BaseModel):
+    store_id: int
+    weighted_average_value: float
+    fifo_value: float
+    items: List[ItemValuation]
+
 class StockTransferBase(BaseModel):
     from_store_id: int
     to_store_id: int
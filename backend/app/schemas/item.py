@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List
 from pydantic import BaseModel, validator, Field
 from datetime import datetime
 from app.models.item import ItemType
@@ -26,19 +26,18 @@ class Category(CategoryBase):
         from_attributes = True
 
 class ItemBase(BaseModel):
-    code: str
     name: str
     description: Optional[str] = None
-    category_id: int
+    barcode: Optional[str] = None
+    type: ItemType
+    category_id: Optional[int] = None
     unit_type: str
     cost_price: float = Field(ge=0)
     sell_price: float = Field(ge=0)
     tax_rate: float = Field(ge=0, le=100, default=0)
-    reorder_point: int = Field(ge=0, default=0)
+    image_url: Optional[str] = None
+    reorder_point: Optional[float] = Field(ge=0, default=None)
     company_id: int
-    store_id: int
-    is_active: bool = True
-    metadata: Optional[Dict[str, Any]] = None
 
 class ItemCreate(ItemBase):
     pass
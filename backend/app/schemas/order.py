@@ -14,7 +14,10 @@ class OrderItemBase(BaseModel):
     customization: Optional[Dict[str, Any]] = None
 
 class OrderItemCreate(OrderItemBase):
-    pass
+    # Priced on the server; whatever the client sends is ignored
+    unit: Optional[str] = None
+    unit_price: Optional[float] = None
+    tax_rate: Optional[float] = None
 
 class OrderItemUpdate(OrderItemBase):
     pass
@@ -30,13 +33,15 @@ class OrderItem(OrderItemBase):
         from_attributes = True
 
 class PaymentBase(BaseModel):
-    amount: float
+    amount: float = Field(gt=0)
     payment_method: PaymentMethod
     reference: Optional[str] = None
     transaction_data: Optional[Dict[str, Any]] = None
 
 class PaymentCreate(PaymentBase):
-    pass
+    # Pending until confirmed: by the cashier for cash, otherwise by a
+    # manager or the provider's statement (app.jobs.reconcile_payments)
+    status: PaymentStatus = PaymentStatus.PENDING
 
 class PaymentUpdate(PaymentBase):
     status: PaymentStatus
@@ -66,9 +71,24 @@ class OrderBase(BaseModel):
     delivery_address: Optional[Dict[str, Any]] = None
 
 class OrderCreate(OrderBase):
-    items: List[OrderItemCreate]
+    # Set from the current user
+    company_id: Optional[int] = None
+    store_id: Optional[int] = None
+    user_id: Optional[int] = None
+    # Computed from the items on the server
+    subtotal: Optional[float] = None
+    total: Optional[float] = None
+    items: List[OrderItemCreate] = Field(min_length=1)
 
 class OrderUpdate(OrderBase):
+    # Partial: only the fields sent are changed. The owner fields, money and
+    # payment status are never taken from the client.
+    company_id: Optional[int] = None
+    store_id: Optional[int] = None
+    user_id: Optional[int] = None
+    status: Optional[OrderStatus] = None
+    subtotal: Optional[float] = None
+    total: Optional[float] = None
     items: Optional[List[OrderItemCreate]] = None
 
 class Order(OrderBase):
@@ -80,4 +100,38 @@ class Order(OrderBase):
     payments: List[Payment] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class OrderTransitionRequest(BaseModel):
+    order_ids: List[int] = Field(min_length=1, max_length=1000)
+    to_status: OrderStatus
+
+class OrderTransitionRejection(BaseModel):
+    order_id: int
+    status: Optional[OrderStatus] = None
+    reason: str
+
+class OrderTransitionResult(BaseModel):
+    transitioned: List[int]
+    rejected: List[OrderTransitionRejection]
+
+class OrderQuoteRequest(BaseModel):
+    items: List[OrderItemCreate] = Field(min_length=1)
+
+class OrderQuoteLine(BaseModel):
+    item_id: int
+    quantity: float
+    unit: str
+    unit_price: float
+    tax_rate: float
+    discount: float
+    total: float
+    tax: float
+    promotion_id: Optional[int] = None
+
+class OrderQuote(BaseModel):
+    lines: List[OrderQuoteLine]
+    subtotal: float
+    discount: float
+    tax: float
+    total: float
@@ -0,0 +1,81 @@
+from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime, time
+from app.models.pricing import DiscountType
+
+class PriceListItemBase(BaseModel):
+    item_id: int
+    price: float = Field(ge=0)
+
+class PriceListItemCreate(PriceListItemBase):
+    pass
+
+class PriceListItem(PriceListItemBase):
+    id: int
+    price_list_id: int
+
+    class Config:
+        from_attributes = True
+
+class PriceListBase(BaseModel):
+    name: str
+    store_id: Optional[int] = None
+    priority: int = 0
+    is_active: bool = True
+
+class PriceListCreate(PriceListBase):
+    company_id: Optional[int] = None
+    items: List[PriceListItemCreate] = []
+
+class PriceListUpdate(PriceListBase):
+    pass
+
+class PriceList(PriceListBase):
+    id: int
+    company_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class PromotionBase(BaseModel):
+    name: str
+    store_id: Optional[int] = None
+    item_id: Optional[int] = None
+    category_id: Optional[int] = None
+    discount_type: DiscountType
+    value: float = Field(ge=0)
+    starts_at: datetime
+    ends_at: Optional[datetime] = None
+    daily_start: Optional[time] = None
+    daily_end: Optional[time] = None
+    weekdays: Optional[int] = Field(default=None, ge=1, le=127)
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def check_promotion(self):
+        if self.item_id is not None and self.category_id is not None:
+            raise ValueError("A promotion targets an item or a category, not both")
+        if self.ends_at is not None and self.ends_at <= self.starts_at:
+            raise ValueError("ends_at must be after starts_at")
+        if (self.daily_start is None) != (self.daily_end is None):
+            raise ValueError("daily_start and daily_end go together")
+        if self.discount_type == DiscountType.PERCENT and self.value > 100:
+            raise ValueError("A percentage discount can't exceed 100")
+        return self
+
+class PromotionCreate(PromotionBase):
+    company_id: Optional[int] = None
+
+class PromotionUpdate(PromotionBase):
+    pass
+
+class Promotion(PromotionBase):
+    id: int
+    company_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -36,7 +36,8 @@ class RecipeCreate(RecipeBase):
     pass
 
 class RecipeUpdate(RecipeBase):
-    pass
+    # A recipe never changes company: the field is accepted but ignored
+    company_id: Optional[int] = None
 
 class Recipe(RecipeBase):
     id: int
@@ -45,4 +46,31 @@ class Recipe(RecipeBase):
     ingredients: List[RecipeIngredient] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+class BatchBase(BaseModel):
+    recipe_id: int
+    store_id: int
+    batch_number: Optional[str] = None
+    quantity: float
+    unit: str
+    production_date: datetime
+    expiry_date: Optional[datetime] = None
+    cost: Optional[float] = None
+    notes: Optional[str] = None
+
+class BatchCreate(BatchBase):
+    item_id: int  # Finished good the batch adds to the store's stock
+
+class BatchUpdate(BaseModel):
+    expiry_date: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class Batch(BatchBase):
+    id: int
+    inventory_id: Optional[int] = None
+    remaining_quantity: float
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
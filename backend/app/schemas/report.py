@@ -0,0 +1,15 @@
+from typing import Optional
+from datetime import date
+from pydantic import BaseModel
+
+class SalesSummary(BaseModel):
+    date: date
+    orders: int
+    subtotal: float
+    tax: Optional[float] = 0
+    total: float
+
+class TopItem(BaseModel):
+    item_id: int
+    quantity: float
+    total: float
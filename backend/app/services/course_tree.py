@@ -0,0 +1,75 @@
+"""
+Serialized course trees (course, sections, lessons), cached per course.
+
+Entries are keyed by (course id, version). CRUDCourse.update increments
+the version in the database on every write, so an edited course gets a new
+key in every process, and its old entry ages out of the LRU. A listing
+reads only the page of ids and versions and loads the trees of the courses
+that missed, three more queries however many there are.
+"""
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.cache import CatalogCache, make_etag
+from app.core.config import settings
+from app.crud.crud_course import crud_course
+from app.models.academy import Course
+from app.schemas import academy as academy_schemas
+
+course_tree_cache = CatalogCache(settings.COURSE_TREE_CACHE_MAX_BYTES)
+
+_adapter = TypeAdapter(academy_schemas.Course)
+
+def _key(course_id: int, version: int) -> Hashable:
+    return (course_id, version)
+
+def _load(db: Session, versions: Dict[int, int]) -> Dict[int, Tuple[str, bytes]]:
+    """Load, serialize and cache the trees of {course id: version read}"""
+    entries = {}
+    for tree in crud_course.get_trees(db, course_ids=list(versions)):
+        body = _adapter.dump_json(_adapter.validate_python(tree), by_alias=True)
+        entries[tree["id"]] = entry = (make_etag(body), body)
+        # A write after the version was read leaves a newer tree under the older
+        # key: harmless, that key is only asked for by readers who were behind
+        course_tree_cache.put(_key(tree["id"], versions[tree["id"]]), *entry)
+    return entries
+
+def course_tree(db: Session, course: Course) -> Tuple[str, bytes]:
+    """ETag and JSON body of one course tree"""
+    entry = course_tree_cache.get(_key(course.id, course.version))
+    metrics.record_cache("course_tree", entry is not None)
+    if entry is None:
+        entry = _load(db, {course.id: course.version})[course.id]
+    return entry
+
+def company_course_trees(db: Session, *, company_id: int, skip: int = 0, limit: int = 100) -> bytes:
+    """JSON array of a page of the company's course trees, in id order"""
+    rows = db.execute(
+        select(Course.id, Course.version)
+        .where(Course.company_id == company_id)
+        .order_by(Course.id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+
+    bodies: List[Optional[bytes]] = []
+    missing: Dict[int, int] = {}
+    for position, row in enumerate(rows):
+        entry = course_tree_cache.get(_key(row.id, row.version))
+        metrics.record_cache("course_tree", entry is not None)
+        if entry is None:
+            missing[row.id] = position
+            bodies.append(None)
+        else:
+            bodies.append(entry[1])
+
+    if missing:
+        versions = {row.id: row.version for row in rows if row.id in missing}
+        for course_id, (_, body) in _load(db, versions).items():
+            bodies[missing[course_id]] = body
+    # A course deleted between the two reads just drops out of the page
+    return b"[" + b",".join(body for body in bodies if body is not None) + b"]"
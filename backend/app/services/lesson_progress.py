@@ -0,0 +1,128 @@
+"""
+Lesson progress heartbeats.
+
+Video players report their position every few seconds. Heartbeats are
+coalesced in process memory, one pending entry per (enrollment, lesson):
+the latest position wins, progress keeps its maximum and a completion
+sticks. A background thread flushes the buffer every
+LESSON_PROGRESS_FLUSH_SECONDS with CRUDEnrollment.record_progress, so the
+database sees one upsert batch per interval however often players ping.
+
+A flush that fails puts its entries back, merged with anything reported
+meanwhile, unless it failed on an integrity error. Heartbeats still buffered when a worker dies are lost, which
+costs at most one interval of playback position. Each shard has its own
+buffer and flush thread, since enrollments live on their company's shard.
+"""
+import logging
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.crud_enrollment import crud_enrollment
+from app.db.shards import DEFAULT_SHARD, shard_router
+
+logger = logging.getLogger(__name__)
+
+class ProgressBuffer:
+    def __init__(self, name: str = "lesson-progress-flush"):
+        self.name = name
+        self._pending: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, heartbeats: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for heartbeat in heartbeats:
+                self._merge(heartbeat)
+
+    def _merge(self, heartbeat: Dict[str, Any]) -> None:
+        key = (heartbeat["enrollment_id"], heartbeat["lesson_id"])
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = dict(heartbeat)
+            return
+        pending["last_position"] = heartbeat["last_position"]
+        pending["progress"] = max(pending["progress"], heartbeat["progress"])
+        pending["is_completed"] = pending["is_completed"] or heartbeat["is_completed"]
+
+    def flush(self, db: Session) -> int:
+        """Write everything buffered so far. Returns the number of entries written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        # Sorted keys keep the upsert's row locks in the same order across workers
+        heartbeats = [pending[key] for key in sorted(pending)]
+        try:
+            crud_enrollment.record_progress(db, heartbeats=heartbeats)
+        except IntegrityError:
+            # A lesson or enrollment was deleted since it was reported, and
+            # retrying would fail the same way
+            db.rollback()
+            logger.warning(f"Dropped {len(heartbeats)} lesson progress entries that no longer apply")
+            return 0
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # Older than anything reported since, so merge those on top
+                newer, self._pending = self._pending, pending
+                for heartbeat in newer.values():
+                    self._merge(heartbeat)
+            raise
+        return len(heartbeats)
+
+    def start(self, session_factory: Callable[[], Session], interval: float) -> None:
+        """Flush every `interval` seconds from a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory, interval), name=self.name, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, session_factory: Callable[[], Session]) -> None:
+        """Stop the flush thread and write what is left"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._flush_with(session_factory)
+
+    def _run(self, session_factory: Callable[[], Session], interval: float) -> None:
+        while not self._stop.wait(interval):
+            self._flush_with(session_factory)
+
+    def _flush_with(self, session_factory: Callable[[], Session]) -> None:
+        db = session_factory()
+        try:
+            self.flush(db)
+        except Exception:
+            logger.exception("Flushing lesson progress failed, will retry")
+        finally:
+            db.close()
+
+# One per shard
+progress_buffers: Dict[str, ProgressBuffer] = {
+    shard: ProgressBuffer(f"lesson-progress-flush-{shard}") for shard in shard_router.names
+}
+
+def progress_buffer(shard: str = DEFAULT_SHARD) -> ProgressBuffer:
+    """Buffer of the shard the heartbeats' enrollments live on"""
+    return progress_buffers[shard]
+
+def start_flusher() -> None:
+    for shard, buffer in progress_buffers.items():
+        buffer.start(partial(shard_router.session, shard), settings.LESSON_PROGRESS_FLUSH_SECONDS)
+
+def stop_flusher() -> None:
+    for shard, buffer in progress_buffers.items():
+        buffer.stop(partial(shard_router.session, shard))
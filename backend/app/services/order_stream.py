@@ -0,0 +1,159 @@
+"""
+Live order queue per store, streamed as Server-Sent Events.
+
+The hub listens on the realtime event bus, so it only ever sees committed
+writes. Every store keeps a ring buffer of its last ORDER_STREAM_BUFFER_SIZE
+events with ids "<epoch>-<seq>", where seq counts up per store and epoch is
+random per process. A client reconnecting with Last-Event-ID gets the
+events it missed from the buffer. When they are gone (the buffer wrapped,
+or the id comes from another process) it gets a `reset` event instead and
+should re-read /orders/ before following the stream.
+
+Each connection is an asyncio task waiting on its own small queue, so an
+idle connection costs a queue and a coroutine, not a thread or a database
+connection. Frames are encoded once per event and shared by every
+subscriber. A subscriber whose queue fills up is sent `reset` and
+disconnected rather than buffering without bound.
+
+The pub/sub is in process memory: with several workers a display only
+sees writes made through its own worker.
+"""
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services import realtime
+
+# Frames a slow subscriber may fall behind by before it is reset
+SUBSCRIBER_QUEUE_SIZE = 256
+
+_RESET = b"event: reset\ndata: {}\n\n"
+_KEEPALIVE = b": keepalive\n\n"
+
+class _Subscriber:
+    __slots__ = ("loop", "queue", "overflowed")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, frame: bytes) -> None:
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(_RESET)
+
+class _StoreStream:
+    __slots__ = ("events", "subscribers", "last_seq")
+
+    def __init__(self, buffer_size: int):
+        self.events: Deque[Tuple[int, bytes]] = deque(maxlen=buffer_size)
+        self.subscribers: Set[_Subscriber] = set()
+        self.last_seq = 0
+
+class OrderStreamHub:
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self.epoch = secrets.token_hex(4)
+        self._streams: Dict[int, _StoreStream] = {}
+        self._lock = threading.Lock()
+
+    def _stream(self, store_id: int) -> _StoreStream:
+        stream = self._streams.get(store_id)
+        if stream is None:
+            stream = self._streams[store_id] = _StoreStream(self.buffer_size)
+        return stream
+
+    def publish(self, events: List[realtime.Event]) -> None:
+        """Append committed events to their store's buffer and fan them out"""
+        # Delivering under the lock keeps every subscriber's frames in seq
+        # order when several threads commit at once
+        with self._lock:
+            for channel, name, _, data in events:
+                store_id = realtime.channel_store_id(channel)
+                if store_id is None:
+                    continue
+                stream = self._stream(store_id)
+                stream.last_seq += 1
+                frame = (
+                    f"id: {self.epoch}-{stream.last_seq}\nevent: {name}\n"
+                    f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+                ).encode()
+                stream.events.append((stream.last_seq, frame))
+                for subscriber in stream.subscribers:
+                    try:
+                        subscriber.loop.call_soon_threadsafe(subscriber.deliver, frame)
+                    except RuntimeError:
+                        # The subscriber's loop is closed; it unsubscribes as it unwinds
+                        pass
+
+    def _backlog(self, stream: _StoreStream, last_event_id: Optional[str]) -> List[bytes]:
+        if not last_event_id:
+            return []
+        # A reset carries the current id, so the next reconnect resumes from here
+        reset = f"id: {self.epoch}-{stream.last_seq}\n".encode() + _RESET
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > stream.last_seq:
+            return [reset]
+        seq = int(seq)
+        oldest = stream.events[0][0] if stream.events else stream.last_seq + 1
+        if seq < oldest - 1:
+            return [reset]
+        return [frame for event_seq, frame in stream.events if event_seq > seq]
+
+    def subscribe(self, store_id: int, last_event_id: Optional[str] = None) -> Tuple[_Subscriber, List[bytes]]:
+        """
+        Register a subscriber on the running event loop. Returns it with the
+        frames to replay first; registering and reading the backlog under one
+        lock means no event falls in between.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            stream = self._stream(store_id)
+            backlog = self._backlog(stream, last_event_id)
+            stream.subscribers.add(subscriber)
+        return subscriber, backlog
+
+    def unsubscribe(self, store_id: int, subscriber: _Subscriber) -> None:
+        with self._lock:
+            self._stream(store_id).subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(stream.subscribers) for stream in self._streams.values())
+
+    async def frames(
+        self, store_id: int, last_event_id: Optional[str] = None, keepalive: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """SSE frames for one connection: the replay, then live events, with keepalive comments"""
+        keepalive = keepalive or settings.ORDER_STREAM_KEEPALIVE_SECONDS
+        subscriber, backlog = self.subscribe(store_id, last_event_id)
+        try:
+            # Tells EventSource how long to wait before reconnecting
+            yield b"retry: 3000\n\n"
+            for frame in backlog:
+                yield frame
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield _KEEPALIVE
+                    continue
+                yield frame
+                if frame is _RESET:
+                    return
+        finally:
+            self.unsubscribe(store_id, subscriber)
+
+order_stream_hub = OrderStreamHub(settings.ORDER_STREAM_BUFFER_SIZE)
+realtime.event_bus.listen(order_stream_hub.publish)
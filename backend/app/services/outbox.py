@@ -0,0 +1,178 @@
+"""
+Transactional outbox.
+
+Side effects that talk to other systems (email, alerts) are not run by the
+request. The request writes an OutboxMessage with enqueue() in the same
+transaction as the order or movement that caused it, so the message exists
+exactly when the change does. A worker (app.jobs.outbox_worker, or a
+thread of the API process with OUTBOX_IN_PROCESS) drains it. Each shard
+has its own outbox, next to the rows that caused its messages.
+
+A drain claims up to OUTBOX_BATCH_SIZE due messages. The claim selects
+them FOR UPDATE SKIP LOCKED on MySQL, counts the attempt and leases them
+for OUTBOX_LEASE_SECONDS, so concurrent workers never claim the same
+message. A worker that dies mid-batch only delays its messages until the
+lease runs out. Each message then runs its topic's handler with the
+worker's session. The handler's own writes and the deletion of the message
+commit together. A failure is retried after an exponential backoff, and
+after OUTBOX_MAX_ATTEMPTS the message is marked DEAD.
+
+Handlers must tolerate running twice: a crash between a handler's external
+call and the commit repeats the message.
+"""
+import logging
+import threading
+from functools import partial
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.shards import shard_router
+from app.models.outbox import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Session, Dict[str, Any]], None]
+
+_handlers: Dict[str, Handler] = {}
+
+def register(topic: str, handler: Handler) -> None:
+    _handlers[topic] = handler
+
+def enqueue(db: Session, topic: str, payload: Dict[str, Any]) -> OutboxMessage:
+    """Add a message to the session; it is written, and later delivered, only if the session commits"""
+    message = OutboxMessage(
+        topic=topic,
+        payload=payload,
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        available_at=datetime.utcnow()
+    )
+    db.add(message)
+    return message
+
+def backoff(attempts: int) -> float:
+    """Seconds to wait before the next try after `attempts` failed ones"""
+    return min(settings.OUTBOX_MAX_BACKOFF_SECONDS, settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+def _claim(db: Session, batch_size: int) -> list:
+    now = datetime.utcnow()
+    rows = db.execute(
+        select(OutboxMessage.id, OutboxMessage.topic, OutboxMessage.payload, OutboxMessage.attempts)
+        .where(OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.available_at <= now)
+        .order_by(OutboxMessage.available_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if rows:
+        db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_([row.id for row in rows]))
+            .values(
+                attempts=OutboxMessage.attempts + 1,
+                available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return rows
+
+def _fail(db: Session, *, message_id: int, topic: str, attempts: int, error: Exception) -> None:
+    dead = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+    db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(
+            status=OutboxStatus.DEAD if dead else OutboxStatus.PENDING,
+            available_at=datetime.utcnow() + timedelta(seconds=backoff(attempts)),
+            last_error=f"{type(error).__name__}: {error}"[:2000]
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    metrics.outbox_messages_total.inc(topic, "dead" if dead else "retry")
+    if dead:
+        logger.error(f"Outbox message {message_id} ({topic}) failed {attempts} times, giving up: {error}")
+    else:
+        logger.warning(f"Outbox message {message_id} ({topic}) failed, attempt {attempts}: {error}")
+
+def drain(db: Session, *, batch_size: Optional[int] = None) -> int:
+    """Claim and handle one batch of due messages. Returns the number claimed."""
+    rows = _claim(db, batch_size or settings.OUTBOX_BATCH_SIZE)
+    for row in rows:
+        try:
+            handler = _handlers.get(row.topic)
+            if handler is None:
+                raise LookupError(f"No outbox handler for topic {row.topic!r}")
+            handler(db, row.payload)
+            db.execute(delete(OutboxMessage).where(OutboxMessage.id == row.id))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _fail(db, message_id=row.id, topic=row.topic, attempts=row.attempts + 1, error=e)
+            continue
+        metrics.outbox_messages_total.inc(row.topic, "delivered")
+    return len(rows)
+
+def drain_all(db: Session, *, batch_size: Optional[int] = None) -> int:
+    """Drain batches until nothing is due. Returns the number of messages claimed."""
+    total = 0
+    while True:
+        claimed = drain(db, batch_size=batch_size)
+        total += claimed
+        if not claimed:
+            return total
+
+class OutboxWorker:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self, session_factory: Callable[[], Session], interval: float, batch_size: Optional[int] = None) -> None:
+        """Drain until stop() is called, waiting `interval` seconds whenever the outbox is empty"""
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        while not self._stop.is_set():
+            db = session_factory()
+            try:
+                claimed = drain(db, batch_size=batch_size)
+            except Exception:
+                logger.exception("Draining the outbox failed, will retry")
+                claimed = 0
+            finally:
+                db.close()
+            # A full batch means there is probably more waiting
+            if claimed < batch_size:
+                self._stop.wait(interval)
+
+    def start(self, session_factory: Callable[[], Session], interval: float) -> None:
+        """Run from a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, args=(session_factory, interval), name="outbox-worker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+# One per shard
+outbox_workers: Dict[str, OutboxWorker] = {}
+
+def start_worker() -> None:
+    if settings.OUTBOX_IN_PROCESS:
+        for shard in shard_router.names:
+            worker = outbox_workers.setdefault(shard, OutboxWorker())
+            worker.start(partial(shard_router.session, shard), settings.OUTBOX_POLL_SECONDS)
+
+def stop_worker() -> None:
+    for worker in outbox_workers.values():
+        worker.stop()
@@ -0,0 +1,387 @@
+"""
+Server-side order pricing.
+
+Clients send what they sell (item, quantity, optional manual discount);
+unit prices, tax rates and every total are computed here, so a till can't
+under-charge by sending its own numbers, and it doesn't need a price
+lookup per line before checkout either.
+
+Item prices come from a per-company cache of {item_id: ItemPrice} tied
+to the company's catalog version: any committed item write bumps the
+version (CRUDBase._touch_catalog) and the company's prices are reloaded on
+next use. Items missing from the cache are loaded with one query for the
+whole basket.
+
+Price lists and promotions (app.models.pricing) are held per company in
+a PricingRules snapshot: list prices in a dict by (store, item), and
+promotions in static interval trees keyed by what they target (an item, a
+category, or everything), so resolving a line costs a few dict lookups
+and O(log n) stabbing queries however many promotions run. Edits through
+crud_pricing invalidate only their company's snapshot, which is rebuilt
+on next use.
+
+A line's unit price is the store's list price, else a company-wide list
+price, else Item.sell_price. The promotion giving the biggest discount
+applies; promotions don't stack, but a manual line discount adds to it.
+
+Money is rounded to cents per line; order totals are sums of the rounded
+lines, so they always add up on the receipt:
+
+    line subtotal = unit_price * quantity
+    line total    = line subtotal - discount
+    line tax      = line total * tax_rate / 100
+    order total   = sum(line total) + sum(line tax)
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import catalog_versions
+from app.core.config import settings
+from app.models.item import Category, Item
+from app.models.pricing import DiscountType, PriceList, PriceListItem, Promotion
+
+# (sell_price, tax_rate, unit_type, category path)
+ItemPrice = Tuple[float, float, str, str]
+
+def _money(value: float) -> float:
+    return round(value, 2)
+
+class PriceCache:
+    def __init__(self):
+        self._companies: Dict[int, Tuple[int, Dict[int, ItemPrice]]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, db: Session, *, company_id: int, item_ids: Iterable[int]) -> Dict[int, ItemPrice]:
+        """Prices of the company's items among `item_ids`; unknown ids are left out"""
+        item_ids = set(item_ids)
+        version = catalog_versions.version(db, company_id)
+        with self._lock:
+            cached_version, prices = self._companies.get(company_id, (None, None))
+            if cached_version != version:
+                prices = {}
+                self._companies[company_id] = (version, prices)
+            found = {item_id: prices[item_id] for item_id in item_ids if item_id in prices}
+        missing = item_ids - found.keys()
+        if missing:
+            loaded = {
+                row.id: (row.sell_price, row.tax_rate or 0.0, row.unit_type, row.path or "")
+                for row in db.execute(
+                    select(Item.id, Item.sell_price, Item.tax_rate, Item.unit_type, Category.path)
+                    .outerjoin(Category, Category.id == Item.category_id)
+                    .where(Item.id.in_(missing), Item.company_id == company_id)
+                )
+            }
+            found.update(loaded)
+            with self._lock:
+                # Only keep them if no write bumped the version meanwhile
+                entry = self._companies.get(company_id)
+                if entry is not None and entry[0] == version == catalog_versions.version(db, company_id):
+                    entry[1].update(loaded)
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._companies.clear()
+
+price_cache = PriceCache()
+
+class IntervalTree:
+    """
+    Static centered interval tree over half-open [start, end) intervals.
+    stab(point) yields the values of every interval containing the point
+    in O(log n + matches).
+    """
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals: Sequence[Tuple[float, float, Any]]):
+        # The median start lies inside its own interval, so every node keeps
+        # at least one and both sides shrink
+        starts = sorted(start for start, _, _ in intervals)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end <= self.center:
+                left.append(interval)
+            elif start > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, point: float) -> Iterator[Any]:
+        node = self
+        while node is not None:
+            if point < node.center:
+                # Every interval here ends after the center, so after the point
+                for start, _, value in node.by_start:
+                    if start > point:
+                        break
+                    yield value
+                node = node.left
+            else:
+                # Every interval here starts at or before the center
+                for _, end, value in node.by_end:
+                    if end <= point:
+                        break
+                    yield value
+                node = node.right if point > node.center else None
+
+class ActivePromotion:
+    __slots__ = ("id", "store_id", "discount_type", "value", "daily_start", "daily_end", "weekdays")
+
+    def __init__(self, promotion: Any):
+        self.id = promotion.id
+        self.store_id = promotion.store_id
+        self.discount_type = DiscountType(promotion.discount_type)
+        self.value = promotion.value
+        self.daily_start = promotion.daily_start
+        self.daily_end = promotion.daily_end
+        self.weekdays = promotion.weekdays
+
+    def applies(self, store_id: Optional[int], local: datetime) -> bool:
+        """Whether it runs in `store_id` at store-local time `local` (the date range is the index's job)"""
+        if self.store_id is not None and self.store_id != store_id:
+            return False
+        if self.weekdays is not None and not self.weekdays & (1 << local.weekday()):
+            return False
+        if self.daily_start is not None and self.daily_end is not None:
+            now = local.time()
+            if self.daily_start <= self.daily_end:
+                return self.daily_start <= now < self.daily_end
+            # Past midnight, e.g. 22:00 to 02:00
+            return now >= self.daily_start or now < self.daily_end
+        return True
+
+    def unit_discount(self, unit_price: float) -> float:
+        if self.discount_type == DiscountType.PERCENT:
+            discount = unit_price * self.value / 100
+        elif self.discount_type == DiscountType.AMOUNT:
+            discount = self.value
+        else:
+            discount = unit_price - self.value
+        return min(max(discount, 0.0), unit_price)
+
+def _timestamp(value: Optional[datetime], default: float) -> float:
+    if value is None:
+        return default
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def _target(item_id: Optional[int], category_id: Optional[int]) -> Hashable:
+    if item_id is not None:
+        return ("item", item_id)
+    if category_id is not None:
+        return ("category", category_id)
+    return ("all", None)
+
+class CompanyRules:
+    """A company's list prices and running or upcoming promotions"""
+
+    def __init__(self, list_prices: Dict[Tuple[Optional[int], int], float], promotions: List[Any]):
+        self.list_prices = list_prices
+        self.promotion_count = len(promotions)
+        buckets: Dict[Hashable, List[Tuple[float, float, ActivePromotion]]] = {}
+        for promotion in promotions:
+            start = _timestamp(promotion.starts_at, float("-inf"))
+            end = _timestamp(promotion.ends_at, float("inf"))
+            if end > start:
+                buckets.setdefault(_target(promotion.item_id, promotion.category_id), []).append(
+                    (start, end, ActivePromotion(promotion))
+                )
+        self.trees = {target: IntervalTree(intervals) for target, intervals in buckets.items()}
+
+    def unit_price(self, store_id: Optional[int], item_id: int, sell_price: float) -> float:
+        price = self.list_prices.get((store_id, item_id)) if store_id is not None else None
+        if price is None:
+            price = self.list_prices.get((None, item_id), sell_price)
+        return price
+
+    def promotions(self, item_id: int, category_path: str, at: float) -> Iterator[ActivePromotion]:
+        """Promotions on the item, its category or any category above it, or everything, running at `at`"""
+        targets = [("item", item_id), ("all", None)]
+        targets += [("category", int(category_id)) for category_id in category_path.split("/") if category_id]
+        for target in targets:
+            tree = self.trees.get(target)
+            if tree is not None:
+                yield from tree.stab(at)
+
+def load_rules(db: Session, *, company_id: int, now: Optional[datetime] = None) -> CompanyRules:
+    """Read a company's active price lists and its promotions that haven't ended, in two queries"""
+    now = now or datetime.utcnow()
+    list_prices: Dict[Tuple[Optional[int], int], float] = {}
+    # Lower priorities first, so the highest priority is written last and wins
+    for row in db.execute(
+        select(PriceList.store_id, PriceListItem.item_id, PriceListItem.price)
+        .join(PriceListItem, PriceListItem.price_list_id == PriceList.id)
+        .where(PriceList.company_id == company_id, PriceList.is_active.is_(True))
+        .order_by(PriceList.priority, PriceList.id)
+    ):
+        list_prices[(row.store_id, row.item_id)] = row.price
+    promotions = db.execute(
+        select(
+            Promotion.id, Promotion.store_id, Promotion.item_id, Promotion.category_id,
+            Promotion.discount_type, Promotion.value, Promotion.starts_at, Promotion.ends_at,
+            Promotion.daily_start, Promotion.daily_end, Promotion.weekdays
+        )
+        .where(
+            Promotion.company_id == company_id,
+            or_(Promotion.ends_at.is_(None), Promotion.ends_at > now),
+            Promotion.is_active.is_(True)
+        )
+    ).all()
+    return CompanyRules(list_prices, promotions)
+
+class PricingRules:
+    """CompanyRules per company, rebuilt lazily after invalidate()"""
+
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+        self._rules: Dict[int, Tuple[int, CompanyRules]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, company_id: int) -> None:
+        with self._lock:
+            self._versions[company_id] = self._versions.get(company_id, 0) + 1
+            self._rules.pop(company_id, None)
+
+    def get(self, db: Session, *, company_id: int) -> CompanyRules:
+        with self._lock:
+            version = self._versions.get(company_id, 0)
+            cached = self._rules.get(company_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rules = load_rules(db, company_id=company_id)
+        with self._lock:
+            # An edit committed while loading makes this snapshot stale already
+            if self._versions.get(company_id, 0) == version:
+                self._rules[company_id] = (version, rules)
+        return rules
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rules.clear()
+
+pricing_rules = PricingRules()
+
+@dataclass
+class PricedLine:
+    item_id: int
+    quantity: float
+    unit: str
+    unit_price: float
+    tax_rate: float
+    discount: float
+    total: float
+    tax: float
+    promotion_id: Optional[int] = None
+    notes: Optional[str] = None
+    customization: Optional[Dict[str, Any]] = None
+
+@dataclass
+class PricedOrder:
+    lines: List[PricedLine] = field(default_factory=list)
+    subtotal: float = 0.0
+    discount: float = 0.0
+    tax: float = 0.0
+    total: float = 0.0
+
+def price_lines(
+    prices: Dict[int, ItemPrice],
+    lines: Iterable[Dict[str, Any]],
+    *,
+    rules: Optional[CompanyRules] = None,
+    store_id: Optional[int] = None,
+    at: Optional[datetime] = None,
+    manual_discount_limit: float = 0.0
+) -> PricedOrder:
+    """
+    Price basket lines ({item_id, quantity, discount, unit, notes,
+    customization}) with `prices`, and with `rules` the list prices of
+    `store_id` and the promotions running at `at` (naive UTC, now by
+    default). A line's manual `discount` may be at most
+    `manual_discount_limit` (a share of the line, 0 allows none). Raises
+    ValueError for an item without a price, a quantity that isn't
+    positive or a discount over those limits.
+    """
+    at = at or datetime.utcnow()
+    stamp = _timestamp(at, 0.0)
+    local = at.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(settings.STORE_TIMEZONE))
+    order = PricedOrder()
+    for line in lines:
+        price = prices.get(line["item_id"])
+        if price is None:
+            raise ValueError(f"Item {line['item_id']} not found")
+        if line["quantity"] <= 0:
+            raise ValueError(f"Quantity of item {line['item_id']} must be positive")
+        unit_price, tax_rate, unit_type, category_path = price
+        promotion_id = None
+        promotion_discount = 0.0
+        if rules is not None:
+            unit_price = rules.unit_price(store_id, line["item_id"], unit_price)
+            best = 0.0
+            for promotion in rules.promotions(line["item_id"], category_path, stamp):
+                if promotion.applies(store_id, local):
+                    unit_discount = promotion.unit_discount(unit_price)
+                    if unit_discount > best:
+                        best, promotion_id = unit_discount, promotion.id
+            promotion_discount = best * line["quantity"]
+        gross = _money(unit_price * line["quantity"])
+        manual = line.get("discount") or 0.0
+        if manual > 0 and manual_discount_limit <= 0:
+            raise ValueError(f"Manual discounts on item {line['item_id']} need a manager")
+        if manual > _money(gross * manual_discount_limit):
+            raise ValueError(
+                f"Manual discount on item {line['item_id']} is over {manual_discount_limit:.0%} of the line"
+            )
+        discount = _money(promotion_discount + manual)
+        if discount > gross:
+            raise ValueError(f"Discount on item {line['item_id']} is larger than the line")
+        total = _money(gross - discount)
+        tax = _money(total * tax_rate / 100)
+        order.lines.append(PricedLine(
+            item_id=line["item_id"],
+            quantity=line["quantity"],
+            unit=line.get("unit") or unit_type,
+            unit_price=unit_price,
+            tax_rate=tax_rate,
+            discount=discount,
+            total=total,
+            tax=tax,
+            promotion_id=promotion_id,
+            notes=line.get("notes"),
+            customization=line.get("customization")
+        ))
+        order.subtotal += gross
+        order.discount += discount
+        order.tax += tax
+    order.subtotal = _money(order.subtotal)
+    order.discount = _money(order.discount)
+    order.tax = _money(order.tax)
+    order.total = _money(order.subtotal - order.discount + order.tax)
+    return order
+
+def price_order(
+    db: Session,
+    *,
+    company_id: int,
+    lines: Iterable[Dict[str, Any]],
+    store_id: Optional[int] = None,
+    at: Optional[datetime] = None,
+    manual_discount_limit: float = 0.0
+) -> PricedOrder:
+    """Price a basket for a store of the company, in one call and with at most one price query once the rules are loaded"""
+    lines = list(lines)
+    prices = price_cache.get_many(db, company_id=company_id, item_ids=[line["item_id"] for line in lines])
+    rules = pricing_rules.get(db, company_id=company_id)
+    return price_lines(
+        prices, lines, rules=rules, store_id=store_id, at=at, manual_discount_limit=manual_discount_limit
+    )
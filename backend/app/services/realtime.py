@@ -0,0 +1,205 @@
+"""
+Realtime order and stock events for tills and kitchen displays.
+
+CRUD code calls emit() inside its transaction. Events wait in the
+session's info dict and reach the bus only once the session commits; a
+rollback discards them, so clients never hear about a write that didn't
+happen. Each store has one private Pusher channel, "private-store-<id>".
+
+The bus coalesces events for REALTIME_FLUSH_SECONDS: within a window only
+the latest event per (channel, event name, key) survives, so an order that
+goes PROCESSING then READY in one window is published once, as READY. A
+daemon thread publishes each window with Pusher's trigger_batch, ten events
+per call, so publishing never runs on the request path. A failed batch is
+logged and dropped: clients re-read state when they reconnect, and a late
+stale event would be worse than a missing one.
+
+Without PUSHER_APP_ID the bus has no publisher and drops events. Tests set
+`event_bus.publisher = FakePublisher()` and call `event_bus.flush()`.
+
+In-process consumers (the SSE order stream) register with
+`event_bus.listen()` and get every committed event, uncoalesced, on the
+committing thread. Listeners must hand the events off without blocking.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Protocol, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pusher accepts at most ten events per trigger_batch call
+BATCH_SIZE = 10
+
+_SESSION_KEY = "realtime_events"
+
+ORDER_STATUS = "order.status"
+STOCK_UPDATED = "stock.updated"
+
+_STORE_CHANNEL_PREFIX = "private-store-"
+
+def store_channel(store_id: int) -> str:
+    return f"{_STORE_CHANNEL_PREFIX}{store_id}"
+
+def channel_store_id(channel: str) -> Optional[int]:
+    """The store id of a store channel name, None for any other name"""
+    if not channel.startswith(_STORE_CHANNEL_PREFIX):
+        return None
+    store_id = channel[len(_STORE_CHANNEL_PREFIX):]
+    return int(store_id) if store_id.isdigit() else None
+
+class Publisher(Protocol):
+    def trigger_batch(self, events: List[Dict[str, Any]]) -> Any:
+        ...
+
+class FakePublisher:
+    """Keeps published batches in memory"""
+
+    def __init__(self):
+        self.batches: List[List[Dict[str, Any]]] = []
+
+    def trigger_batch(self, events: List[Dict[str, Any]]) -> None:
+        self.batches.append(list(events))
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        return [event for batch in self.batches for event in batch]
+
+def pusher_client():
+    """The Pusher client for the configured app, or None when there is none"""
+    if not settings.PUSHER_APP_ID:
+        return None
+    import pusher
+
+    return pusher.Pusher(
+        app_id=settings.PUSHER_APP_ID,
+        key=settings.PUSHER_KEY,
+        secret=settings.PUSHER_SECRET,
+        cluster=settings.PUSHER_CLUSTER,
+        ssl=True
+    )
+
+Event = Tuple[str, str, Hashable, Dict[str, Any]]
+
+class EventBus:
+    def __init__(self, publisher: Optional[Publisher] = None):
+        self.publisher = publisher
+        self._listeners: List[Callable[[List[Event]], None]] = []
+        self._pending: "OrderedDict[Tuple[str, str, Hashable], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def listen(self, listener: Callable[[List[Event]], None]) -> None:
+        """Call `listener` with the events of every commit"""
+        self._listeners.append(listener)
+
+    def publish(self, events: Iterable[Event]) -> None:
+        """Queue committed events for the next window"""
+        events = list(events)
+        for listener in self._listeners:
+            try:
+                listener(events)
+            except Exception:
+                logger.exception("Realtime listener failed")
+        with self._lock:
+            for channel, name, key, data in events:
+                # The latest event replaces an older one and takes its place at the end
+                self._pending.pop((channel, name, key), None)
+                self._pending[(channel, name, key)] = data
+
+    def flush(self) -> int:
+        """Publish everything queued so far. Returns the number of events sent."""
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+        if not pending:
+            return 0
+        if self.publisher is None:
+            metrics.realtime_events_total.inc("dropped", amount=len(pending))
+            return 0
+        events = [
+            {"channel": channel, "name": name, "data": data}
+            for (channel, name, _), data in pending.items()
+        ]
+        sent = 0
+        for start in range(0, len(events), BATCH_SIZE):
+            batch = events[start:start + BATCH_SIZE]
+            try:
+                self.publisher.trigger_batch(batch)
+            except Exception:
+                logger.exception(f"Publishing {len(batch)} realtime events failed")
+                metrics.realtime_events_total.inc("failed", amount=len(batch))
+                continue
+            sent += len(batch)
+        metrics.realtime_events_total.inc("published", amount=sent)
+        return sent
+
+    def start(self, interval: float) -> None:
+        """Flush every `interval` seconds from a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="realtime-publish", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the publish thread and send what is left"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.flush()
+
+event_bus = EventBus()
+
+def emit(db: Session, channel: str, name: str, data: Dict[str, Any], key: Hashable = None) -> None:
+    """
+    Queue an event on the session, to be published if and when it commits.
+    Events with the same channel, name and key coalesce.
+    """
+    db.info.setdefault(_SESSION_KEY, []).append((channel, name, key, data))
+
+def emit_order_status(db: Session, *, order_id: int, store_id: int, status: Any) -> None:
+    emit(db, store_channel(store_id), ORDER_STATUS, {
+        "order_id": order_id,
+        "status": getattr(status, "value", status),
+    }, key=order_id)
+
+def emit_stock(db: Session, *, inventory_id: int, store_id: int, item_id: int, quantity: float) -> None:
+    emit(db, store_channel(store_id), STOCK_UPDATED, {
+        "inventory_id": inventory_id,
+        "item_id": item_id,
+        "quantity": quantity,
+    }, key=inventory_id)
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    events = session.info.pop(_SESSION_KEY, None)
+    if events:
+        event_bus.publish(events)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
+
+def start_publisher() -> None:
+    client = pusher_client()
+    if client is not None:
+        event_bus.publisher = client
+    event_bus.start(settings.REALTIME_FLUSH_SECONDS)
+
+def stop_publisher() -> None:
+    event_bus.stop()
@@ -0,0 +1,67 @@
+"""
+Low-stock alerts.
+
+When a stock change takes an inventory row from above its item's
+reorder_point to at or below it, the writing transaction enqueues a
+"stock.low" outbox message. The outbox worker emails the store's managers
+and the company's admins. A row that stays low doesn't alert again until
+it has been restocked above the reorder point.
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.email import send_email
+from app.models.company import Store
+from app.models.item import Item
+from app.models.user import User, UserRole
+from app.services import outbox
+
+LOW_STOCK = "stock.low"
+
+def check_low_stock(
+    db: Session,
+    *,
+    inventory_id: int,
+    store_id: int,
+    item_id: int,
+    quantity: float,
+    change: float,
+    reorder_point: Optional[float]
+) -> None:
+    """Enqueue an alert if a change of `change` that left `quantity` crossed the reorder point"""
+    if reorder_point is None or change >= 0:
+        return
+    if quantity - change > reorder_point >= quantity:
+        outbox.enqueue(db, LOW_STOCK, {
+            "inventory_id": inventory_id,
+            "store_id": store_id,
+            "item_id": item_id,
+            "quantity": quantity,
+            "reorder_point": reorder_point,
+        })
+
+def send_low_stock_alert(db: Session, payload: Dict[str, Any]) -> None:
+    store = db.get(Store, payload["store_id"])
+    item = db.get(Item, payload["item_id"])
+    if store is None or item is None:
+        return
+    recipients = db.scalars(
+        select(User.email).where(
+            User.company_id == store.company_id,
+            User.is_active.is_(True),
+            or_(
+                User.role == UserRole.ADMIN,
+                (User.role == UserRole.MANAGER) & (User.store_id == store.id)
+            )
+        )
+    ).all()
+    send_email(
+        recipients,
+        f"Low stock: {item.name} at {store.name}",
+        f"{item.name} is down to {payload['quantity']:g} {item.unit_type} at {store.name}, "
+        f"at or below its reorder point of {payload['reorder_point']:g}.\n"
+    )
+
+outbox.register(LOW_STOCK, send_low_stock_alert)
@@ -0,0 +1,261 @@
+"""
+Inventory valuation over the movement ledger.
+
+Every inventory row keeps a persisted InventoryValuation state: FIFO cost
+layers, the weighted average cost and the id of the last movement applied.
+refresh_valuations only reads the movements after that id, so a run
+costs as much as the new part of the ledger, not the whole history. It
+leaves movements younger than LEDGER_SETTLE_SECONDS for the next run, so
+valuations trail the ledger by that much.
+
+Incoming stock is valued at the movement's unit_cost, else at its batch
+cost per unit, else at Item.cost_price. Outgoing stock consumes the
+oldest FIFO layers and leaves the average cost unchanged. Issuing more
+than is on hand leaves a negative layer at the average cost, which the
+next receipt nets off.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, func, select, tuple_, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from app.crud.crud_inventory import settled_movement_id, signed_quantity
+from app.models.inventory import Inventory, InventoryMovement, InventoryValuation
+from app.models.item import Item
+from app.models.recipe import Batch
+
+EPSILON = 1e-9
+
+@dataclass
+class ValuationState:
+    inventory_id: int
+    last_movement_id: int = 0
+    quantity: float = 0.0
+    average_cost: float = 0.0
+    layers: List[List[float]] = field(default_factory=list)
+    # last_movement_id as loaded, None for a row that has no state yet
+    previous_movement_id: Optional[int] = None
+
+    @property
+    def fifo_value(self) -> float:
+        return sum(quantity * cost for quantity, cost in self.layers)
+
+    def receive(self, quantity: float, unit_cost: float) -> None:
+        on_hand = self.quantity
+        self.quantity += quantity
+        if on_hand > EPSILON:
+            self.average_cost = (on_hand * self.average_cost + quantity * unit_cost) / self.quantity
+        else:
+            self.average_cost = unit_cost
+
+        remaining = quantity
+        if self.layers and self.layers[0][0] < 0:
+            covered = min(remaining, -self.layers[0][0])
+            self.layers[0][0] += covered
+            remaining -= covered
+            if abs(self.layers[0][0]) <= EPSILON:
+                self.layers.pop(0)
+        if remaining > EPSILON:
+            self.layers.append([remaining, unit_cost])
+
+    def issue(self, quantity: float) -> None:
+        self.quantity -= quantity
+        remaining = quantity
+        while remaining > EPSILON and self.layers and self.layers[0][0] > 0:
+            taken = min(remaining, self.layers[0][0])
+            self.layers[0][0] -= taken
+            remaining -= taken
+            if self.layers[0][0] <= EPSILON:
+                self.layers.pop(0)
+        if remaining > EPSILON:
+            if self.layers:
+                self.layers[0][0] -= remaining
+            else:
+                self.layers.append([-remaining, self.average_cost])
+
+    def apply(self, movement_id: int, change: float, unit_cost: float) -> None:
+        if change > 0:
+            self.receive(change, unit_cost)
+        elif change < 0:
+            self.issue(-change)
+        self.last_movement_id = movement_id
+
+def _load_states(db: Session, inventory_ids: Iterable[int]) -> Dict[int, ValuationState]:
+    states = {}
+    for row in db.execute(
+        select(
+            InventoryValuation.inventory_id,
+            InventoryValuation.last_movement_id,
+            InventoryValuation.quantity,
+            InventoryValuation.average_cost,
+            InventoryValuation.layers
+        ).where(InventoryValuation.inventory_id.in_(list(inventory_ids)))
+    ):
+        states[row.inventory_id] = ValuationState(
+            inventory_id=row.inventory_id,
+            last_movement_id=row.last_movement_id,
+            quantity=row.quantity,
+            average_cost=row.average_cost,
+            layers=[list(layer) for layer in row.layers],
+            previous_movement_id=row.last_movement_id
+        )
+    return states
+
+def _save_states(db: Session, states: List[ValuationState], chunk_size: int) -> None:
+    """
+    Insert new states and update existing ones. Updates only apply if the
+    row is still at the movement it was loaded at; when a concurrent run got
+    there first its result is the same, so losing the race is harmless.
+    """
+    table = InventoryValuation.__table__
+    guarded_update = (
+        update(table)
+        .where(
+            table.c.inventory_id == bindparam("b_inventory_id"),
+            table.c.last_movement_id == bindparam("b_previous_movement_id")
+        )
+        .values(
+            last_movement_id=bindparam("b_last_movement_id"),
+            quantity=bindparam("b_quantity"),
+            average_cost=bindparam("b_average_cost"),
+            fifo_value=bindparam("b_fifo_value"),
+            layers=bindparam("b_layers", type_=table.c.layers.type),
+            updated_at=func.now()
+        )
+    )
+    if db.get_bind().dialect.name == "mysql":
+        insert_new = mysql.insert(table).prefix_with("IGNORE")
+    else:
+        insert_new = sqlite.insert(table).on_conflict_do_nothing(index_elements=[table.c.inventory_id])
+
+    for start in range(0, len(states), chunk_size):
+        chunk = states[start:start + chunk_size]
+        new = [state for state in chunk if state.previous_movement_id is None]
+        changed = [state for state in chunk if state.previous_movement_id is not None]
+        if new:
+            db.execute(insert_new, [
+                {
+                    "inventory_id": state.inventory_id,
+                    "last_movement_id": state.last_movement_id,
+                    "quantity": state.quantity,
+                    "average_cost": state.average_cost,
+                    "fifo_value": state.fifo_value,
+                    "layers": state.layers,
+                }
+                for state in new
+            ])
+        if changed:
+            db.execute(guarded_update, [
+                {
+                    "b_inventory_id": state.inventory_id,
+                    "b_previous_movement_id": state.previous_movement_id,
+                    "b_last_movement_id": state.last_movement_id,
+                    "b_quantity": state.quantity,
+                    "b_average_cost": state.average_cost,
+                    "b_fifo_value": state.fifo_value,
+                    "b_layers": state.layers,
+                }
+                for state in changed
+            ])
+        db.commit()
+
+def refresh_valuations(
+    db: Session,
+    *,
+    store_id: Optional[int] = None,
+    chunk_size: int = 5000,
+    settle_seconds: Optional[float] = None
+) -> int:
+    """
+    Apply the movements recorded since the last run to the valuation state
+    of every inventory row, or of one store's rows. Movements are read in
+    (inventory_id, id) order, `chunk_size` at a time; those newer than
+    `settle_seconds` wait for a later run (see settled_movement_id).
+    Returns the number of movements applied.
+    """
+    upto = settled_movement_id(db, settle_seconds=settle_seconds)
+    if upto is None:
+        return 0
+    batch_unit_cost = Batch.cost / func.nullif(Batch.quantity, 0)
+    query = (
+        select(
+            InventoryMovement.id,
+            InventoryMovement.inventory_id,
+            InventoryMovement.movement_type,
+            InventoryMovement.quantity,
+            func.coalesce(InventoryMovement.unit_cost, batch_unit_cost, Item.cost_price).label("unit_cost")
+        )
+        .join(Inventory, Inventory.id == InventoryMovement.inventory_id)
+        .join(Item, Item.id == Inventory.item_id)
+        .outerjoin(Batch, Batch.id == InventoryMovement.batch_id)
+        .outerjoin(InventoryValuation, InventoryValuation.inventory_id == InventoryMovement.inventory_id)
+        .where(
+            InventoryMovement.id > func.coalesce(InventoryValuation.last_movement_id, 0),
+            InventoryMovement.id <= upto
+        )
+        .order_by(InventoryMovement.inventory_id, InventoryMovement.id)
+        .limit(chunk_size)
+    )
+    if store_id is not None:
+        query = query.where(Inventory.store_id == store_id)
+
+    states: Dict[int, ValuationState] = {}
+    applied = 0
+    after = (0, 0)
+    while True:
+        # Keyset pages, each read in full before the states are loaded: a
+        # server-side stream would hold the connection, which MySQL drivers
+        # can't share with another query
+        chunk = db.execute(
+            query.where(tuple_(InventoryMovement.inventory_id, InventoryMovement.id) > after)
+        ).all()
+        if not chunk:
+            break
+        unseen = {row.inventory_id for row in chunk} - states.keys()
+        if unseen:
+            states.update(_load_states(db, unseen))
+        for row in chunk:
+            state = states.get(row.inventory_id)
+            if state is None:
+                state = states[row.inventory_id] = ValuationState(inventory_id=row.inventory_id)
+            state.apply(row.id, signed_quantity(row.movement_type, row.quantity), row.unit_cost or 0.0)
+            applied += 1
+        after = (chunk[-1].inventory_id, chunk[-1].id)
+
+    _save_states(db, list(states.values()), chunk_size)
+    return applied
+
+def store_valuation_rows(db: Session, *, store_id: int) -> Dict[str, Any]:
+    """Valuation of every inventory row of a store, shaped like schemas.inventory.StoreValuation"""
+    query = (
+        select(
+            Inventory.id,
+            Inventory.item_id,
+            func.coalesce(InventoryValuation.quantity, 0.0),
+            func.coalesce(InventoryValuation.average_cost, 0.0),
+            func.coalesce(InventoryValuation.fifo_value, 0.0)
+        )
+        .outerjoin(InventoryValuation, InventoryValuation.inventory_id == Inventory.id)
+        .where(Inventory.store_id == store_id)
+        .order_by(Inventory.item_id)
+    )
+    # Plain tuples: at tens of thousands of rows, Row objects are most of the cost
+    items = [
+        {
+            "inventory_id": inventory_id,
+            "item_id": item_id,
+            "quantity": quantity,
+            "average_cost": average_cost,
+            "weighted_average_value": quantity * average_cost,
+            "fifo_value": fifo_value,
+        }
+        for inventory_id, item_id, quantity, average_cost, fifo_value in db.execute(query).tuples()
+    ]
+    return {
+        "store_id": store_id,
+        "weighted_average_value": sum(item["weighted_average_value"] for item in items),
+        "fifo_value": sum(item["fifo_value"] for item in items),
+        "items": items,
+    }
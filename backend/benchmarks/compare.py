@@ -0,0 +1,52 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Exits with status 1 when any flow's p95 latency regressed by more than
+--threshold percent, or its error count went up.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+def _change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    regressions = 0
+    print(f"baseline {baseline.get('git_revision')} @ {baseline['timestamp']}")
+    print(f"current  {current.get('git_revision')} @ {current['timestamp']}\n")
+    print(f"{'flow':<18}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>9}")
+    for flow, new in current["flows"].items():
+        old = baseline["flows"].get(flow)
+        if old is None:
+            print(f"{flow:<18}(new flow)")
+            continue
+        for metric in METRICS:
+            print(f"{flow:<18}{metric:<16}{old[metric]:>12}{new[metric]:>12}"
+                  f"{_change(old[metric], new[metric]):>+8.1f}%")
+        if _change(old["p95_ms"], new["p95_ms"]) > threshold or new["errors"] > old["errors"]:
+            regressions += 1
+            print(f"{flow:<18}! regression (p95 or errors)")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 increase in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return 1 if compare(baseline, current, args.threshold) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Core POS flows driven by each virtual user.
+
+Every flow takes the virtual user's client and fixtures and returns the HTTP
+status of the request it timed.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import httpx
+
+API = "/api/v1"
+
+@dataclass
+class Fixtures:
+    """Data a virtual user needs, read from the seeded database"""
+    email: str
+    company_id: int
+    store_id: int
+    user_id: int
+    other_store_ids: List[int]
+    items: List[Tuple[int, str, float]]  # (id, barcode, sell_price)
+    token: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+
+async def login(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random, password: str) -> int:
+    response = await client.post(
+        f"{API}/auth/login", data={"username": fx.email, "password": password}
+    )
+    if response.status_code == 200:
+        fx.token = response.json()["token"]["access_token"]
+        fx.headers = {"Authorization": f"Bearer {fx.token}"}
+    return response.status_code
+
+async def catalog_browse(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random) -> int:
+    page = rng.randint(0, max(0, len(fx.items) // 50 - 1))
+    response = await client.get(
+        f"{API}/items/",
+        params={"company_id": fx.company_id, "skip": page * 50, "limit": 50},
+        headers=fx.headers,
+    )
+    return response.status_code
+
+async def barcode_scan(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random) -> int:
+    _, barcode, _ = rng.choice(fx.items)
+    response = await client.get(f"{API}/items/barcode/{barcode}", headers=fx.headers)
+    return response.status_code
+
+async def checkout(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random) -> int:
+    lines = []
+    subtotal = 0.0
+    for item_id, _, price in rng.sample(fx.items, k=min(len(fx.items), rng.randint(1, 5))):
+        quantity = float(rng.randint(1, 3))
+        subtotal += price * quantity
+        lines.append({
+            "item_id": item_id, "quantity": quantity, "unit": "pcs",
+            "unit_price": price, "tax_rate": 18.0,
+        })
+    tax = round(subtotal * 0.18, 2)
+    body = {
+        "company_id": fx.company_id,
+        "store_id": fx.store_id,
+        "user_id": fx.user_id,
+        "subtotal": round(subtotal, 2),
+        "tax": tax,
+        "total": round(subtotal + tax, 2),
+        "payment_method": "cash",
+        "items": lines,
+    }
+    response = await client.post(f"{API}/orders/", json=body, headers=fx.headers)
+    return response.status_code
+
+async def stock_transfer(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random) -> int:
+    if not fx.other_store_ids:
+        return 0
+    item_id, _, _ = rng.choice(fx.items)
+    body = {
+        "from_store_id": fx.store_id,
+        "to_store_id": rng.choice(fx.other_store_ids),
+        "items": [{"item_id": item_id, "quantity": 1.0, "unit": "pcs"}],
+    }
+    response = await client.post(f"{API}/inventory/transfer/", json=body, headers=fx.headers)
+    return response.status_code
+
+async def report_sales(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random) -> int:
+    response = await client.get(
+        f"{API}/reports/sales", params={"store_id": fx.store_id}, headers=fx.headers
+    )
+    return response.status_code
+
+async def report_top_items(client: httpx.AsyncClient, fx: Fixtures, rng: random.Random) -> int:
+    response = await client.get(f"{API}/reports/top-items", headers=fx.headers)
+    return response.status_code
+
+# Relative weight of each flow in the steady-state mix (login runs once per user)
+MIX = {
+    "catalog_browse": (catalog_browse, 25),
+    "barcode_scan": (barcode_scan, 40),
+    "checkout": (checkout, 25),
+    "stock_transfer": (stock_transfer, 5),
+    "report_sales": (report_sales, 3),
+    "report_top_items": (report_top_items, 2),
+}
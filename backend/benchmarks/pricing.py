@@ -0,0 +1,168 @@
+"""
+Cost of resolving basket prices with price lists and many running promotions.
+
+    python -m benchmarks.pricing --promotions 10000 --basket 20 --repeat 200
+
+Cases:
+  indexed   app.services.pricing: list prices from a dict, promotions from
+            the per-company interval trees (the checkout path)
+  linear    the same rules checked by scanning every promotion per line
+  rebuild   loading the company's rules from the database and building the
+            trees, what the first checkout after a pricing edit pays
+
+Promotions target an item (90%), a category (9%) or everything, a third
+are limited to one store and a fifth to a happy hour. Both resolvers must
+price every basket the same. Results use the same JSON format as
+benchmarks.run, one sample per basket.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, time as clock, timedelta
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/pricing.db")
+    parser.add_argument("--promotions", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--basket", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SQL_ECHO", "false")
+    logging.basicConfig(level=logging.WARNING)
+
+    from sqlalchemy import insert, select
+
+    from app.db.seed import SeedConfig, seed
+    from app.db.session import engine, SessionLocal
+    from app.models.company import Store
+    from app.models.item import Category, Item
+    from app.models.pricing import DiscountType, PriceList, PriceListItem, Promotion
+    from app.services import pricing
+    from benchmarks import stats
+
+    seed(engine, SeedConfig(companies=1, stores=2, categories=50, items=args.items))
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    db = SessionLocal()
+    company_id = 1
+    store_ids = list(db.scalars(select(Store.id).where(Store.company_id == company_id)))
+    item_ids = list(db.scalars(select(Item.id).where(Item.company_id == company_id)))
+    category_ids = list(db.scalars(select(Category.id).where(Category.company_id == company_id)))
+
+    db.execute(insert(PriceList), [{"id": 1, "company_id": company_id, "store_id": store_ids[0], "name": "Store",
+                                    "priority": 0, "is_active": True}])
+    db.execute(insert(PriceListItem), [
+        {"price_list_id": 1, "item_id": item_id, "price": round(rng.uniform(1, 50), 2)}
+        for item_id in rng.sample(item_ids, len(item_ids) // 4)
+    ])
+    promotions = []
+    for i in range(args.promotions):
+        target = rng.random()
+        happy_hour = rng.random() < 0.2
+        starts_at = now - timedelta(days=rng.randint(0, 30))
+        promotions.append({
+            "company_id": company_id,
+            "store_id": rng.choice(store_ids) if rng.random() < 0.33 else None,
+            "name": f"Promotion {i + 1}",
+            "item_id": rng.choice(item_ids) if target < 0.9 else None,
+            "category_id": rng.choice(category_ids) if 0.9 <= target < 0.99 else None,
+            "discount_type": rng.choice(list(DiscountType)),
+            "value": round(rng.uniform(0.5, 20), 2),
+            "starts_at": starts_at,
+            "ends_at": starts_at + timedelta(days=rng.randint(31, 90)) if rng.random() < 0.8 else None,
+            "daily_start": clock(rng.randint(0, 23)) if happy_hour else None,
+            "daily_end": clock(rng.randint(0, 23)) if happy_hour else None,
+            "weekdays": None,
+            "is_active": True,
+        })
+    db.execute(insert(Promotion), promotions)
+    db.commit()
+
+    rules = pricing.load_rules(db, company_id=company_id)
+    prices = pricing.price_cache.get_many(db, company_id=company_id, item_ids=item_ids)
+    scan = [(target, start, end, promotion)
+            for target, tree in rules.trees.items() for start, end, promotion in _all_intervals(tree)]
+
+    def linear(lines, store_id, at):
+        """Price lines checking every promotion, as a query-per-checkout design would"""
+        stamp = pricing._timestamp(at, 0.0)
+        local = at.replace(tzinfo=pricing.timezone.utc).astimezone(pricing.ZoneInfo(pricing.settings.STORE_TIMEZONE))
+        result = []
+        for line in lines:
+            sell_price, _, _, path = prices[line["item_id"]]
+            unit_price = rules.unit_price(store_id, line["item_id"], sell_price)
+            categories = {int(category_id) for category_id in path.split("/") if category_id}
+            best, best_id = 0.0, None
+            for (kind, key), start, end, promotion in scan:
+                if not start <= stamp < end:
+                    continue
+                if kind == "item" and key != line["item_id"] or kind == "category" and key not in categories:
+                    continue
+                if promotion.applies(store_id, local):
+                    discount = promotion.unit_discount(unit_price)
+                    if discount > best:
+                        best, best_id = discount, promotion.id
+            result.append((unit_price, best_id, round(best * line["quantity"], 2)))
+        return result
+
+    baskets = []
+    for _ in range(args.repeat):
+        lines = [{"item_id": item_id, "quantity": float(rng.randint(1, 3))}
+                 for item_id in rng.sample(item_ids, args.basket)]
+        baskets.append((lines, rng.choice(store_ids), now + timedelta(minutes=rng.randint(0, 24 * 60))))
+
+    # Both resolvers must agree on every line of every basket
+    for lines, store_id, at in baskets:
+        order = pricing.price_lines(prices, lines, rules=rules, store_id=store_id, at=at)
+        expected = linear(lines, store_id, at)
+        got = [(line.unit_price, line.promotion_id, line.discount) for line in order.lines]
+        assert [(price, discount) for price, _, discount in got] == \
+            [(price, discount) for price, _, discount in expected], (got, expected)
+
+    recorder = stats.Recorder()
+    started = time.perf_counter()
+    for lines, store_id, at in baskets:
+        t = time.perf_counter()
+        pricing.price_lines(prices, lines, rules=rules, store_id=store_id, at=at)
+        recorder.record("indexed", time.perf_counter() - t, 200)
+    for lines, store_id, at in baskets:
+        t = time.perf_counter()
+        linear(lines, store_id, at)
+        recorder.record("linear", time.perf_counter() - t, 200)
+    for _ in range(min(args.repeat, 20)):
+        t = time.perf_counter()
+        pricing.load_rules(db, company_id=company_id)
+        recorder.record("rebuild", time.perf_counter() - t, 200)
+    db.close()
+    flows = recorder.summary(time.perf_counter() - started)
+
+    result = stats.build_result("pricing", flows, {
+        "database": engine.dialect.name,
+        "promotions": args.promotions,
+        "items": args.items,
+        "basket": args.basket,
+        "repeat": args.repeat,
+        "unit": "ms per basket (rebuild: ms per company)",
+    })
+    stats.print_table(flows)
+    print(f"\nSaved {stats.save_result(result, args.output)}")
+    return 0
+
+def _all_intervals(tree):
+    """Every interval stored in an IntervalTree"""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield from node.by_start
+        stack += [child for child in (node.left, node.right) if child is not None]
+
+if __name__ == "__main__":
+    sys.exit(main())
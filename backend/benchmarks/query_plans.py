@@ -0,0 +1,219 @@
+"""
+Check that every hot query in app/crud is served by an index.
+
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --database-url mysql+pymysql://root:@localhost/leymax_plans
+
+Seeds a small database, runs each CRUD read below with a cursor listener
+attached, and asks the database to EXPLAIN every statement it captured,
+with the same parameters. A statement fails when its plan reads a whole
+table: "SCAN <table>" on SQLite, access type ALL on MySQL.
+
+Exits with status 1 if any query fails. Add new CRUD reads to _hot_queries().
+tests/test_query_plans.py runs the same check on SQLite with the test suite.
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Tuple
+
+def _hot_queries() -> List[Tuple[str, Callable]]:
+    from app import crud, schemas
+    from app.core.tenancy import tenant_cache
+    from app.services import outbox, pricing, valuation
+
+    since = datetime(2000, 1, 1)
+    until = datetime.utcnow() + timedelta(days=1)
+    return [
+        ("user.get", lambda db, f: crud.crud_user.get(db, f.user.id)),
+        ("user.get_by_email", lambda db, f: crud.crud_user.get_by_email(db, email=f.user.email)),
+        ("tenant_cache.get", lambda db, f: (tenant_cache.clear(), tenant_cache.get(db, user_id=f.user.id))),
+        ("order.get_for_tenant", lambda db, f: crud.crud_order.get_for_tenant(
+            db, id=f.order_id, tenant=tenant_cache.get(db, user_id=f.user.id))),
+        ("inventory.get_for_tenant", lambda db, f: crud.crud_inventory.get_for_tenant(
+            db, id=f.inventory_id, tenant=tenant_cache.get(db, user_id=f.user.id))),
+        ("user.get_company_users", lambda db, f: crud.crud_user.get_company_users(db, company_id=f.company_id)),
+        ("user.get_store_users", lambda db, f: crud.crud_user.get_store_users(db, store_id=f.store_id)),
+        ("store.get_multi_by_company", lambda db, f: crud.crud_store.get_multi_by_company(db, company_id=f.company_id)),
+        ("company.get_company_stores", lambda db, f: crud.crud_company.get_company_stores(db, company_id=f.company_id)),
+        ("item.get_by_barcode", lambda db, f: crud.crud_item.get_by_barcode(db, barcode=f.item.barcode)),
+        ("item.get_company_items", lambda db, f: crud.crud_item.get_company_items(db, company_id=f.company_id)),
+        ("item.get_category_items", lambda db, f: crud.crud_item.get_category_items(db, category_id=f.item.category_id)),
+        ("item.get_subtree_items", lambda db, f: crud.crud_item.get_subtree_items(db, category=f.root_category)),
+        ("item.get_by_name", lambda db, f: crud.crud_item.get_by_name(db, name=f.item.name, company_id=f.company_id)),
+        ("category.get_by_name", lambda db, f: crud.crud_category.get_by_name(db, name=f.category.name, company_id=f.company_id)),
+        ("category.get_company_categories", lambda db, f: crud.crud_category.get_company_categories(db, company_id=f.company_id)),
+        ("category.get_tree", lambda db, f: crud.crud_category.get_tree(db, company_id=f.company_id)),
+        ("category.get_subcategories", lambda db, f: crud.crud_category.get_subcategories(db, parent_id=f.category.id)),
+        ("recipe.get_multi_by_company", lambda db, f: [r.ingredients for r in crud.crud_recipe.get_multi_by_company(db, company_id=f.company_id)]),
+        ("course.get_multi_by_company", lambda db, f: [c.sections for c in crud.crud_course.get_multi_by_company(db, company_id=f.company_id)]),
+        ("course.get_multi_trees", lambda db, f: crud.crud_course.get_multi_trees(db, company_id=f.academy_id)),
+        ("course.get_trees", lambda db, f: crud.crud_course.get_trees(db, course_ids=f.course_ids)),
+        ("enrollment.get_user_lessons", lambda db, f: crud.crud_enrollment.get_user_lessons(
+            db, user_id=f.enrollment.user_id, pairs=[(f.enrollment.id, lesson_id) for lesson_id in range(1, 6)])),
+        ("inventory.get_store_inventory", lambda db, f: crud.crud_inventory.get_store_inventory(db, store_id=f.store_id)),
+        ("inventory.get_store_inventory_rows", lambda db, f: crud.crud_inventory.get_store_inventory_rows(db, store_id=f.store_id)),
+        ("inventory.get_store_inventory_rows(sub_stores)", lambda db, f: crud.crud_inventory.get_store_inventory_rows(
+            db, store_id=f.main_store_id, include_sub_stores=True)),
+        ("inventory.get_item_inventory", lambda db, f: crud.crud_inventory.get_item_inventory(db, store_id=f.store_id, item_id=f.item.id)),
+        ("inventory.movements", lambda db, f: crud.crud_inventory.get(db, f.inventory_id).movements),
+        ("inventory.get_store_inventory_as_of", lambda db, f: crud.crud_inventory.get_store_inventory_as_of(
+            db, store_id=f.store_id, as_of=until)),
+        ("batch.get_expiring", lambda db, f: crud.crud_batch.get_expiring(db, store_id=f.store_id, hours=48)),
+        ("valuation.refresh_valuations", lambda db, f: valuation.refresh_valuations(db, store_id=f.store_id)),
+        ("valuation.store_valuation_rows", lambda db, f: valuation.store_valuation_rows(db, store_id=f.store_id)),
+        ("outbox.drain", lambda db, f: outbox.drain(db)),
+        ("order.get_multi_by_company", lambda db, f: crud.crud_order.get_multi_by_company(db, company_id=f.company_id)),
+        ("order.get_multi_by_store", lambda db, f: [o.items for o in crud.crud_order.get_multi_by_store(db, store_id=f.store_id)]),
+        ("order.get_multi_rows", lambda db, f: crud.crud_order.get_multi_rows(db, company_id=f.company_id)),
+        ("order.get_multi_rows(store)", lambda db, f: crud.crud_order.get_multi_rows(
+            db, company_id=f.company_id, store_id=f.store_id)),
+        ("order.get_multi_rows(sub_stores)", lambda db, f: crud.crud_order.get_multi_rows(
+            db, company_id=f.company_id, store_id=f.main_store_id, include_sub_stores=True)),
+        ("order.get_sales_summary", lambda db, f: crud.crud_order.get_sales_summary(
+            db, company_id=f.company_id, date_from=since, date_to=until)),
+        ("order.get_sales_summary(store)", lambda db, f: crud.crud_order.get_sales_summary(
+            db, company_id=f.company_id, store_id=f.store_id, date_from=since, date_to=until)),
+        ("order.get_sales_summary(sub_stores)", lambda db, f: crud.crud_order.get_sales_summary(
+            db, company_id=f.company_id, store_id=f.main_store_id, include_sub_stores=True, date_from=since, date_to=until)),
+        ("order.get_top_items", lambda db, f: crud.crud_order.get_top_items(
+            db, company_id=f.company_id, date_from=since, date_to=until)),
+        ("order.get_top_items(store)", lambda db, f: crud.crud_order.get_top_items(
+            db, company_id=f.company_id, store_id=f.store_id, date_from=since, date_to=until)),
+        ("order.get_top_items(sub_stores)", lambda db, f: crud.crud_order.get_top_items(
+            db, company_id=f.company_id, store_id=f.main_store_id, include_sub_stores=True, date_from=since, date_to=until)),
+        ("order.transition(completed)", lambda db, f: crud.crud_order.transition(
+            db, order_ids=f.open_order_ids[::2], to_status="completed", company_id=f.company_id)),
+        ("order.transition(cancelled)", lambda db, f: crud.crud_order.transition(
+            db, order_ids=f.open_order_ids, to_status="cancelled", company_id=f.company_id)),
+        ("pricing.price_order", lambda db, f: (pricing.price_cache.clear(), pricing.pricing_rules.clear(), pricing.price_order(
+            db, company_id=f.company_id, lines=[{"item_id": f.item.id, "quantity": 1}], store_id=f.store_id))),
+        ("price_list.get_multi_by_company", lambda db, f: crud.crud_price_list.get_multi_by_company(db, company_id=f.company_id)),
+        ("price_list.get_items", lambda db, f: crud.crud_price_list.get_items(db, price_list_id=1)),
+        ("promotion.get_multi_by_company", lambda db, f: crud.crud_promotion.get_multi_by_company(db, company_id=f.company_id)),
+        ("promotion.get_multi_by_company(active_at)", lambda db, f: crud.crud_promotion.get_multi_by_company(
+            db, company_id=f.company_id, active_at=until)),
+        ("payment.get_by_order", lambda db, f: crud.crud_payment.get_by_order(db, order_id=f.order_id)),
+        ("payment.create", lambda db, f: crud.crud_payment.create(
+            db, obj_in=schemas.order.PaymentCreate(amount=1.0, payment_method="card", reference="REF-1"), order_id=f.order_id)),
+        ("payment.reconcile_statement", lambda db, f: list(crud.crud_payment.reconcile_statement(
+            db, company_id=f.company_id, lines=[{"line": 1, "reference": "REF-1", "amount": 1.0}]))),
+        ("store.get_subtree_ids", lambda db, f: crud.crud_store.get_subtree_ids(db, store_id=f.main_store_id)),
+        ("store.get_ancestor_ids", lambda db, f: crud.crud_store.get_ancestor_ids(db, store_id=f.store_id)),
+    ]
+
+class _Fixtures:
+    def __init__(self, db):
+        from app.models.academy import Course, CourseEnrollment
+        from app.models.company import Store
+        from app.models.inventory import Inventory
+        from app.models.item import Category, Item
+        from app.models.order import Order, OrderStatus
+        from app.models.user import User, UserRole
+
+        self.user = db.query(User).filter(User.role == UserRole.MANAGER).first()
+        self.company_id = self.user.company_id
+        self.store_id = self.user.store_id
+        self.main_store_id = db.get(Store, self.store_id).parent_store_id or self.store_id
+        self.item = db.query(Item).filter(Item.company_id == self.company_id, Item.category_id.isnot(None)).first()
+        self.category = db.get(Category, self.item.category_id)
+        self.root_category = db.get(Category, int(self.category.path.split("/")[0]))
+        self.inventory_id = db.query(Inventory.id).filter(Inventory.store_id == self.store_id).limit(1).scalar()
+        self.order_id = db.query(Order.id).filter(Order.store_id == self.store_id).limit(1).scalar()
+        self.open_order_ids = [order_id for (order_id,) in db.query(Order.id).filter(
+            Order.company_id == self.company_id,
+            Order.status.notin_([OrderStatus.COMPLETED, OrderStatus.CANCELLED])
+        ).limit(10)]
+        self.academy_id = db.query(Course.company_id).limit(1).scalar()
+        self.course_ids = [course_id for (course_id,) in
+                           db.query(Course.id).filter(Course.company_id == self.academy_id).limit(3)]
+        self.enrollment = db.query(CourseEnrollment).first()
+
+def _full_scans(conn, statement: str, parameters, tables: set) -> Tuple[List[str], List[str]]:
+    """Return (plan lines, offending lines) for one captured statement."""
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        plan = [row[-1] for row in rows]
+        bad = [line for line in plan
+               if line.startswith("SCAN ") and line.split()[1] in tables and " INDEX " not in line]
+        return plan, bad
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+    plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+    bad = [line for row, line in zip(rows, plan) if row["type"] == "ALL" and row["table"] in tables]
+    return plan, bad
+
+# The seed main() checks against; tests/test_query_plans.py uses it too
+PLAN_SEED = dict(companies=9, stores=3, categories=10, items=300, recipes=20, orders=1000, courses=5, students=20)
+
+def analyze(engine) -> None:
+    """Refresh statistics, so the planner sees realistic selectivity"""
+    from sqlalchemy import text
+    from app.db.base import Base
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE TABLE " + ", ".join(Base.metadata.tables)))
+
+def explain_hot_queries(engine, db) -> Iterator[Tuple[str, List[Tuple[str, List[str], List[str]]]]]:
+    """Run each hot query on db and yield (name, [(statement, plan lines, offending lines)])."""
+    from sqlalchemy import event
+    from app.db.base import Base
+
+    tables = set(Base.metadata.tables)
+    captured: List[Tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    fixtures = _Fixtures(db)
+    for name, run in _hot_queries():
+        db.expunge_all()
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            run(db, fixtures)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        with engine.connect() as conn:
+            yield name, [(statement, *_full_scans(conn, statement, parameters, tables))
+                         for statement, parameters in captured]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/query_plans.db")
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only failures")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SQL_ECHO", "false")
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.db.seed import SeedConfig, seed
+    from app.db.session import engine, SessionLocal
+
+    seed(engine, SeedConfig(**PLAN_SEED))
+    analyze(engine)
+
+    db = SessionLocal()
+    failures = 0
+    try:
+        for name, statements in explain_hot_queries(engine, db):
+            for statement, plan, bad in statements:
+                if bad:
+                    failures += 1
+                if bad or args.verbose:
+                    print(f"{'FAIL' if bad else 'ok  '} {name}")
+                    print("     " + " ".join(statement.split()))
+                    for line in plan:
+                        print(f"       {'!' if line in bad else ' '} {line}")
+            print(f"{name:<40}{len(statements)} statement(s)")
+    finally:
+        db.close()
+    print(f"\n{failures} statement(s) with a full table scan")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
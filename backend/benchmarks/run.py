@@ -0,0 +1,174 @@
+"""
+Load test for the core POS flows.
+
+    python -m benchmarks.run --scale small --users 20 --duration 30
+    python -m benchmarks.run --skip-seed --base-url http://127.0.0.1:8000
+
+Without --base-url the app is driven in-process through httpx's ASGI
+transport against --database-url. With --base-url a running server is
+load tested; --database-url must then point at the same database so
+fixtures (users, barcodes, stores) can be read from it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+logger = logging.getLogger("benchmarks.run")
+
+def _scales():
+    from app.db.seed import SeedConfig
+    return {
+        "smoke": SeedConfig(companies=2, stores=2, categories=5, items=250, orders=1000),
+        "small": SeedConfig(companies=5, stores=3, categories=10, items=1000, orders=10000),
+        # 50k items and 1M orders in total
+        "realistic": SeedConfig(companies=10, stores=5, categories=20, items=5000, orders=100000),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--scale", default="smoke", help="smoke, small or realistic")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and traffic")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse an already seeded database")
+    parser.add_argument("--workers", type=int, default=1, help="seed companies in parallel (MySQL only)")
+    parser.add_argument("--base-url", default=None, help="load test a running server instead of in-process")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of steady-state traffic")
+    parser.add_argument("--flows", default=None, help="comma separated subset of flows to run")
+    parser.add_argument("--name", default="pos", help="result file prefix")
+    parser.add_argument("--output", default=None, help="result file path (default benchmarks/results/)")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Settings are read at import time, so configure them before importing the app
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SQL_ECHO", "false")
+    # The app logs every request at DEBUG; only show our own progress and real problems
+    handler = logging.StreamHandler()
+    handler.addFilter(lambda record: record.name.startswith("benchmarks") or record.levelno >= logging.WARNING)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", handlers=[handler])
+
+    from app.db.session import engine
+    from app.db.seed import seed
+    from benchmarks import stats
+
+    if not args.skip_seed:
+        config = _scales()[args.scale]
+        config.seed = args.seed
+        started = time.perf_counter()
+        seed(engine, config, workers=args.workers)
+        logger.info(f"Seeded '{args.scale}' dataset in {time.perf_counter() - started:.1f}s")
+
+    recorder = stats.Recorder()
+    elapsed = asyncio.run(_drive(args, engine, recorder))
+
+    flows = recorder.summary(elapsed)
+    result = stats.build_result(args.name, flows, {
+        "database": engine.dialect.name,
+        "scale": None if args.skip_seed else args.scale,
+        "seed": args.seed,
+        "users": args.users,
+        "duration_s": args.duration,
+        "target": args.base_url or "in-process",
+    })
+    stats.print_table(flows)
+    print(f"\nSaved {stats.save_result(result, args.output)}")
+    failed = sum(
+        count for s in flows.values() for code, count in s["status_codes"].items() if not 200 <= int(code) < 300
+    )
+    if failed:
+        logger.error(f"{failed} request(s) got a non-2xx response")
+        return 1
+    return 0
+
+def _load_fixtures(engine, users: int, rng: random.Random):
+    from sqlalchemy import text
+    from benchmarks.flows import Fixtures
+
+    with engine.connect() as conn:
+        managers = conn.execute(text(
+            "SELECT id, email, company_id, store_id FROM users "
+            "WHERE role = 'MANAGER' AND is_active = 1 ORDER BY id"
+        )).all()
+        stores = conn.execute(text("SELECT id, company_id FROM stores ORDER BY id")).all()
+        items = conn.execute(text(
+            "SELECT id, company_id, barcode, sell_price FROM items "
+            "WHERE barcode IS NOT NULL ORDER BY id"
+        )).all()
+    if not managers:
+        raise SystemExit("No manager accounts found - seed the database first")
+
+    company_stores = {}
+    for store_id, company_id in stores:
+        company_stores.setdefault(company_id, []).append(store_id)
+    company_items = {}
+    for item_id, company_id, barcode, price in items:
+        company_items.setdefault(company_id, []).append((item_id, barcode, price))
+
+    fixtures = []
+    for n in range(users):
+        user_id, email, company_id, store_id = managers[n % len(managers)]
+        catalog = company_items.get(company_id, [])
+        fixtures.append(Fixtures(
+            email=email,
+            company_id=company_id,
+            store_id=store_id,
+            user_id=user_id,
+            other_store_ids=[s for s in company_stores.get(company_id, []) if s != store_id],
+            # Each till works with a sample of the catalog, like a real shift
+            items=rng.sample(catalog, k=min(len(catalog), 1000)),
+        ))
+    return fixtures
+
+async def _drive(args, engine, recorder) -> float:
+    import httpx
+    from benchmarks import flows
+    from app.db.seed import DEFAULT_PASSWORD
+
+    rng = random.Random(args.seed)
+    fixtures = _load_fixtures(engine, args.users, rng)
+    mix = flows.MIX
+    if args.flows:
+        wanted = set(args.flows.split(","))
+        mix = {name: value for name, value in mix.items() if name in wanted}
+    names = list(mix)
+    weights = [mix[name][1] for name in names]
+
+    if args.base_url:
+        client_kwargs = {"base_url": args.base_url}
+    else:
+        from main import app
+        client_kwargs = {"transport": httpx.ASGITransport(app=app, raise_app_exceptions=False), "base_url": "http://bench"}
+
+    async def virtual_user(fx, user_rng, deadline):
+        async with httpx.AsyncClient(timeout=30.0, **client_kwargs) as client:
+            started = time.perf_counter()
+            status = await flows.login(client, fx, user_rng, DEFAULT_PASSWORD)
+            recorder.record("login", time.perf_counter() - started, status)
+            if not fx.token or not names:
+                return
+            while time.perf_counter() < deadline:
+                name = user_rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = await mix[name][0](client, fx, user_rng)
+                except httpx.HTTPError:
+                    status = 599
+                if status:
+                    recorder.record(name, time.perf_counter() - started, status)
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        virtual_user(fx, random.Random(args.seed + n), deadline) for n, fx in enumerate(fixtures)
+    ))
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Serialization cost of an order listing, per 1,000 orders.
+
+    python -m benchmarks.serialization --orders 1000 --repeat 30
+
+Cases:
+  validated_stdlib  response_model validation + jsonable_encoder + json.dumps
+                    (FastAPI's default JSONResponse pipeline)
+  validated_orjson  response_model validation, rendered by ORJSONResponse
+  rows_orjson       plain row dicts rendered by ORJSONResponse (fast path)
+  orm_end_to_end    ORM query with lazy-loaded items/payments + validated_stdlib
+  rows_end_to_end   crud_order.get_multi_rows + rows_orjson
+
+The serialization-only cases run on data already loaded in memory.
+Results use the same JSON format as benchmarks.run, one sample per repetition.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import List
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/serialization.db")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SQL_ECHO", "false")
+    logging.basicConfig(level=logging.WARNING)
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import selectinload
+
+    from app.core.responses import ORJSONResponse
+    from app.crud.crud_order import crud_order
+    from app.db.seed import SeedConfig, seed
+    from app.db.session import engine, SessionLocal
+    from app.models.order import Order
+    from app.schemas import order as order_schemas
+    from benchmarks import stats
+
+    seed(engine, SeedConfig(companies=1, stores=2, items=200, orders=args.orders))
+    adapter = TypeAdapter(List[order_schemas.Order])
+    response = ORJSONResponse(None)
+
+    db = SessionLocal()
+    objects = (
+        db.query(Order)
+        .options(selectinload(Order.items), selectinload(Order.payments))
+        .limit(args.orders)
+        .all()
+    )
+    rows = crud_order.get_multi_rows(db, company_id=1, limit=args.orders)
+    db.close()
+
+    def validated_stdlib():
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return json.dumps(jsonable_encoder(adapter.dump_python(validated, mode="json"))).encode()
+
+    def validated_orjson():
+        validated = adapter.validate_python(objects, from_attributes=True)
+        return response.render(adapter.dump_python(validated, mode="json"))
+
+    def rows_orjson():
+        return response.render(rows)
+
+    def orm_end_to_end():
+        session = SessionLocal()
+        try:
+            orders = crud_order.get_multi_by_company(session, company_id=1, limit=args.orders)
+            validated = adapter.validate_python(orders, from_attributes=True)
+            return json.dumps(jsonable_encoder(adapter.dump_python(validated, mode="json"))).encode()
+        finally:
+            session.close()
+
+    def rows_end_to_end():
+        session = SessionLocal()
+        try:
+            return response.render(crud_order.get_multi_rows(session, company_id=1, limit=args.orders))
+        finally:
+            session.close()
+
+    # Both paths must produce the same document
+    assert orjson.loads(validated_stdlib()) == orjson.loads(rows_orjson())
+
+    cases = [validated_stdlib, validated_orjson, rows_orjson, orm_end_to_end, rows_end_to_end]
+    recorder = stats.Recorder()
+    scale = 1000 / args.orders  # report cost per 1,000 orders
+    started = time.perf_counter()
+    for case in cases:
+        case()  # warm up
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            case()
+            recorder.record(case.__name__, (time.perf_counter() - t) * scale, 200)
+    flows = recorder.summary(time.perf_counter() - started)
+
+    result = stats.build_result("serialization", flows, {
+        "database": engine.dialect.name,
+        "orders": args.orders,
+        "repeat": args.repeat,
+        "unit": "ms per 1000 orders",
+    })
+    stats.print_table(flows)
+    print(f"\nSaved {stats.save_result(result, args.output)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
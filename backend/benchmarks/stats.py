@@ -0,0 +1,86 @@
+"""
+Latency recording and result files.
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, flow: str, seconds: float, status: int) -> None:
+        self.statuses[flow][status] += 1
+        if status < 400:
+            self.latencies[flow].append(seconds)
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        flows = {}
+        for flow in sorted(self.statuses):
+            values = sorted(self.latencies[flow])
+            statuses = self.statuses[flow]
+            total = sum(statuses.values())
+            ok = len(values)
+            flows[flow] = {
+                "requests": total,
+                "errors": total - ok,
+                "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(sum(values) / ok * 1000, 3) if ok else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3) if ok else 0.0,
+                "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+            }
+        return flows
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def build_result(name: str, flows: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "flows": flows,
+    }
+
+def save_result(result: Dict[str, Any], path: Optional[str] = None) -> str:
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = result["timestamp"].replace(":", "").replace("-", "")
+        path = os.path.join(RESULTS_DIR, f"{result['name']}-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    return path
+
+def print_table(flows: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'flow':<18}{'reqs':>8}{'errs':>7}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for flow, s in flows.items():
+        print(f"{flow:<18}{s['requests']:>8}{s['errors']:>7}{s['throughput_rps']:>10}"
+              f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
@@ -1,95 +1,79 @@
+import argparse
 import logging
+import os
+import time
 import pymysql
-from sqlalchemy import create_engine, text
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.engine import make_url
 from app.core.config import settings
-from app.db.base import Base
 from app.db.session import engine
-from app.models.user import UserRole
-from app.models.company import CompanyType, StoreType, Company, Store
-from app.crud.crud_user import crud_user
-from app.schemas.user import UserCreate
-from app.db.session import SessionLocal
+from app.db.seed import SeedConfig, seed, DEFAULT_ADMIN_EMAIL, DEFAULT_PASSWORD
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def init_db() -> None:
-    # Try to create database if it doesn't exist
-    try:
-        conn = pymysql.connect(
-            host="localhost",
-            user="root",
-            password="",
-        )
-        cursor = conn.cursor()
-        
-        # Drop database if exists and recreate
-        cursor.execute("DROP DATABASE IF EXISTS leymax_webpos")
-        cursor.execute("CREATE DATABASE leymax_webpos")
-        conn.commit()
-        cursor.close()
-        conn.close()
-        logger.info("Database leymax_webpos recreated")
-    except Exception as e:
-        logger.error(f"Error creating database: {e}")
-        return
+def recreate_database() -> None:
+    """Drop and recreate the MySQL database named in DATABASE_URL"""
+    url = make_url(settings.DATABASE_URL)
+    conn = pymysql.connect(
+        host=url.host or "localhost",
+        port=url.port or 3306,
+        user=url.username or "root",
+        password=url.password or "",
+    )
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{url.database}`")
+    cursor.execute(f"CREATE DATABASE `{url.database}`")
+    conn.commit()
+    cursor.close()
+    conn.close()
+    logger.info(f"Database {url.database} recreated")
 
-    try:
-        # Create tables
-        Base.metadata.create_all(bind=engine)
-        logger.info("Tables created successfully")
+def stamp_head() -> None:
+    """Mark the freshly created schema as up to date with the alembic migrations"""
+    # No ini file: alembic.ini's logging config would silence this script's loggers
+    alembic_cfg = Config()
+    alembic_cfg.set_main_option(
+        "script_location", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic")
+    )
+    command.stamp(alembic_cfg, "head")
 
-        # Create initial data
-        db = SessionLocal()
-        
-        # Create default company if it doesn't exist
-        company = Company(
-            name="Default Company",
-            type=CompanyType.BAKERY,
-            description="Default company for testing",
-            email="company@example.com",
-            phone="1234567890",
-            tax_number="TAX123",
-            registration_number="REG123"
-        )
-        db.add(company)
-        db.commit()
-        db.refresh(company)
-        logger.info(f"Default company created: {company.name}")
-        
-        # Create default store
-        store = Store(
-            company_id=company.id,
-            name="Main Store",
-            type=StoreType.MAIN,
-            email="store@example.com",
-            phone="1234567890"
-        )
-        db.add(store)
-        db.commit()
-        db.refresh(store)
-        logger.info(f"Default store created: {store.name}")
+def init_db(config: SeedConfig, workers: int = 1) -> None:
+    if engine.dialect.name == "mysql":
+        try:
+            recreate_database()
+        except Exception as e:
+            logger.error(f"Error creating database: {e}")
+            return
 
-        # Create a test admin user
-        user_in = UserCreate(
-            email="admin@example.com",
-            password="password123",
-            first_name="Admin",
-            last_name="User",
-            role=UserRole.ADMIN,
-            company_id=company.id,
-            store_id=store.id
-        )
-        user = crud_user.create(db=db, obj_in=user_in)
-        logger.info(f"Admin user created: {user.email}")
-        
-        db.close()
-        
-    except Exception as e:
-        logger.error(f"Error initializing database: {e}")
-        raise  # Re-raise the exception to see the full error trace
+    started = time.perf_counter()
+    counts = seed(
+        engine,
+        config,
+        workers=workers,
+        progress=lambda totals: logger.info(f"Seeded so far: {totals}")
+    )
+    stamp_head()
+    logger.info(f"Tables created and seeded in {time.perf_counter() - started:.1f}s")
+    for table, count in sorted(counts.items()):
+        logger.info(f"  {table}: {count}")
+    logger.info(f"Admin user: {DEFAULT_ADMIN_EMAIL} / {DEFAULT_PASSWORD}")
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recreate the database and seed it. Without options this creates "
+                    "one company, its main store and an admin user."
+    )
+    defaults = SeedConfig()
+    for name, value in vars(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--workers", type=int, default=1, help="seed companies in parallel (MySQL only)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = vars(parse_args())
+    workers = args.pop("workers")
     logger.info("Creating initial data")
-    init_db()
-    logger.info("Initial data created") 
\ No newline at end of file
+    init_db(SeedConfig(**args), workers=workers)
+    logger.info("Initial data created")
@@ -1,12 +1,31 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics
 from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.db import replicas
+from app.services import lesson_progress, outbox, realtime
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lesson_progress.start_flusher()
+    realtime.start_publisher()
+    outbox.start_worker()
+    replicas.start_heartbeat()
+    yield
+    replicas.stop_heartbeat()
+    outbox.stop_worker()
+    realtime.stop_publisher()
+    lesson_progress.stop_flusher()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
     description=settings.PROJECT_DESCRIPTION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -17,6 +36,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if replicas.has_replicas():
+    app.add_middleware(replicas.ReadYourWritesMiddleware)
 
 # Import and include routers
 from app.api.v1.api import api_router
@@ -29,3 +50,11 @@ async def root():
         "version": settings.PROJECT_VERSION,
         "documentation": "/docs"
     }
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+# Added last so it is the outermost middleware and times the others too
+metrics.instrument_app(app)
+
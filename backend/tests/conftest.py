@@ -0,0 +1,59 @@
+"""
+Tests run against a seeded SQLite database in a temporary directory. The
+environment is set here, before anything imports app.core.config.
+"""
+import os
+import tempfile
+
+_directory = tempfile.mkdtemp(prefix="leymax-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory}/test.db"
+os.environ["SQL_ECHO"] = "false"
+for name in ("SHARD_URLS", "REPLICA_URLS"):
+    os.environ.pop(name, None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.security import get_password_hash
+from app.db.seed import DEFAULT_PASSWORD, SeedConfig, seed
+from app.db.session import SessionLocal, engine
+from app.models.user import User, UserRole
+
+# Three companies, so tests can check that nothing leaks between them
+SEED = SeedConfig(companies=3, stores=2, staff_per_store=1, categories=3, items=10, orders=20)
+
+@pytest.fixture(scope="session", autouse=True)
+def seeded():
+    return seed(engine, SEED)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def login():
+    """login(email) -> a TestClient holding that user's session cookie"""
+    import main
+
+    def login(email: str, password: str = DEFAULT_PASSWORD) -> TestClient:
+        client = TestClient(main.app)
+        response = client.post("/api/v1/auth/login", data={"username": email, "password": password})
+        assert response.status_code == 200, response.text
+        return client
+    return login
+
+@pytest.fixture
+def storeless_staff(db):
+    """Email of a company 1 staff member with no store"""
+    email = "nostore@example.com"
+    if not db.query(User).filter(User.email == email).first():
+        db.add(User(
+            email=email, password_hash=get_password_hash(DEFAULT_PASSWORD),
+            first_name="No", last_name="Store", role=UserRole.STAFF, company_id=1, store_id=None, is_active=True
+        ))
+        db.commit()
+    return email
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from app.crud.crud_inventory import crud_inventory
+
+from app.models.inventory import Inventory
+from app.models.item import Item
+from app.models.recipe import Batch, Recipe
+
+@pytest.fixture
+def batch_in(db):
+    recipe = Recipe(company_id=1, name="Bread")
+    db.add(recipe)
+    db.commit()
+    item = db.query(Item).filter(Item.company_id == 1).order_by(Item.id).first()
+    return {
+        "recipe_id": recipe.id, "store_id": 1, "item_id": item.id, "quantity": 10, "unit": "pcs",
+        "production_date": "2026-10-19T08:00:00", "expiry_date": "2026-10-20T08:00:00",
+    }
+
+def test_staff_cannot_record_batches(login, batch_in):
+    response = login("staff1-1@example.com").post("/api/v1/inventory/batches/", json=batch_in)
+    assert response.status_code == 403
+
+def test_batch_item_must_belong_to_the_company(db, login, batch_in):
+    other = db.query(Item).filter(Item.company_id == 2).first()
+    response = login("manager1@example.com").post(
+        "/api/v1/inventory/batches/", json={**batch_in, "item_id": other.id}
+    )
+    assert response.status_code == 404
+
+def test_movement_batch_must_belong_to_the_inventory_row(db, login, batch_in):
+    client = login("manager1@example.com")
+    response = client.post("/api/v1/inventory/batches/", json=batch_in)
+    assert response.status_code == 200
+    batch = response.json()
+    other = db.query(Inventory).filter(Inventory.store_id == 1, Inventory.id != batch["inventory_id"]).first()
+
+    movement = {"batch_id": batch["id"], "movement_type": "sale", "quantity": 1, "unit": "pcs"}
+    response = client.post("/api/v1/inventory/movement/", json={**movement, "inventory_id": other.id})
+    assert response.status_code == 400
+    response = client.post("/api/v1/inventory/movement/", json={**movement, "inventory_id": batch["inventory_id"]})
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(Batch, batch["id"]).remaining_quantity == 9
+
+def test_sales_take_stock_first_expired_first_out(db, batch_in):
+    inventory = db.query(Inventory).filter(Inventory.store_id == 2).order_by(Inventory.id).first()
+    batches = [
+        Batch(recipe_id=batch_in["recipe_id"], store_id=2, inventory_id=inventory.id, quantity=quantity,
+              remaining_quantity=quantity, unit="pcs", production_date=datetime(2026, 10, 1), expiry_date=expiry)
+        for quantity, expiry in ((5, datetime(2026, 10, 22)), (4, None), (3, datetime(2026, 10, 20)))
+    ]
+    db.add_all(batches)
+    db.commit()
+
+    def remaining():
+        db.expire_all()
+        return [db.get(Batch, batch.id).remaining_quantity for batch in batches]
+
+    # The batch expiring first empties, the next one gives the rest
+    crud_inventory.allocate_fefo(db, quantities={inventory.id: 5})
+    db.commit()
+    assert remaining() == [3, 4, 0]
+
+    # Batches without an expiry date go last; stock beyond the batches stays unbatched
+    crud_inventory.allocate_fefo(db, quantities={inventory.id: 10})
+    db.commit()
+    assert remaining() == [0, 0, 0]
@@ -0,0 +1,82 @@
+from app.crud.crud_enrollment import crud_enrollment
+from app.models.academy import Course, CourseEnrollment, CourseSection, LessonProgress
+from app.models.user import User
+
+def test_course_tree_reflects_every_update(login):
+    client = login("admin@example.com")
+    course = client.post("/api/v1/courses/", json={"company_id": 1, "title": "Pastry", "price": 5}).json()
+    url = f"/api/v1/courses/{course['id']}"
+    assert client.get(url).json()["title"] == "Pastry"
+
+    # Back to back, well within the same second
+    for title in ("Pastry II", "Pastry III"):
+        response = client.put(url, json={"title": title, "price": 5})
+        assert response.status_code == 200, response.text
+        assert response.json()["title"] == title
+        assert client.get(url).json()["title"] == title
+    listing = client.get("/api/v1/courses/").json()
+    assert [c["title"] for c in listing if c["id"] == course["id"]] == ["Pastry III"]
+
+def _tree(course):
+    return [(s["title"], [lesson["title"] for lesson in s["lessons"]]) for s in course["sections"]]
+
+def test_course_sections_are_updated_by_diff(db, login):
+    client = login("admin@example.com")
+    course = client.post("/api/v1/courses/", json={"company_id": 1, "title": "Baking", "price": 5, "sections": [
+        {"title": "Dough", "order": 1, "lessons": [{"title": "Flour", "order": 1}, {"title": "Water", "order": 2}]},
+        {"title": "Oven", "order": 2, "lessons": [{"title": "Heat", "order": 1}]},
+        {"title": "Extras", "order": 3, "lessons": [{"title": "Seeds", "order": 1}]},
+    ]}).json()
+    dough, oven, extras = course["sections"]
+    flour, water = dough["lessons"]
+    student = db.query(User).filter(User.email == "staff1-1@example.com").one()
+    enrollment = CourseEnrollment(course_id=course["id"], user_id=student.id)
+    db.add(enrollment)
+    db.commit()
+    crud_enrollment.record_progress(db, heartbeats=[
+        {"enrollment_id": enrollment.id, "lesson_id": lesson_id, "last_position": 1, "progress": 100, "is_completed": True}
+        for lesson_id in (flour["id"], water["id"])
+    ])
+
+    url = f"/api/v1/courses/{course['id']}"
+    response = client.put(url, json={"title": "Baking", "price": 5, "sections": [
+        # Water is dropped, Flour renamed and a lesson added
+        {"id": dough["id"], "title": "Dough", "order": 1, "lessons": [
+            {"id": flour["id"], "title": "Flours", "order": 1}, {"title": "Salt", "order": 2}
+        ]},
+        # Without lessons, a section keeps its own
+        {"id": extras["id"], "title": "Toppings", "order": 2},
+        {"title": "Shaping", "order": 3, "lessons": [{"title": "Boules", "order": 1}]},
+    ]})
+    assert response.status_code == 200, response.text
+    updated = response.json()
+    assert _tree(updated) == [("Dough", ["Flours", "Salt"]), ("Toppings", ["Seeds"]), ("Shaping", ["Boules"])]
+    # Matched rows keep their ids, the left out section is gone
+    assert [s["id"] for s in updated["sections"][:2]] == [dough["id"], extras["id"]]
+    assert updated["sections"][0]["lessons"][0]["id"] == flour["id"]
+    assert db.get(CourseSection, oven["id"]) is None
+
+    db.expire_all()
+    assert db.get(Course, course["id"]).lesson_count == 4
+    # The completion on the deleted lesson no longer counts
+    enrollment = db.get(CourseEnrollment, enrollment.id)
+    assert (enrollment.completed_lessons, enrollment.progress) == (1, 25)
+    assert db.query(LessonProgress).filter(LessonProgress.lesson_id == water["id"]).count() == 0
+
+def test_course_update_rejects_sections_of_another_course(login):
+    client = login("admin@example.com")
+    first, second = (client.post("/api/v1/courses/", json={"company_id": 1, "title": title, "price": 0, "sections": [
+        {"title": "Intro", "order": 1, "lessons": [{"title": "Welcome", "order": 1}]}
+    ]}).json() for title in ("First", "Second"))
+
+    url = f"/api/v1/courses/{first['id']}"
+    response = client.put(url, json={"title": "First", "price": 0, "sections": [
+        {"id": second["sections"][0]["id"], "title": "Intro", "order": 1}
+    ]})
+    assert response.status_code == 400
+    response = client.put(url, json={"title": "First", "price": 0, "sections": [
+        {"id": first["sections"][0]["id"], "title": "Intro", "order": 1,
+         "lessons": [{"id": second["sections"][0]["lessons"][0]["id"], "title": "Welcome", "order": 1}]}
+    ]})
+    assert response.status_code == 400
+    assert _tree(client.get(url).json()) == [("Intro", ["Welcome"])]
@@ -0,0 +1,65 @@
+import pytest
+
+from app.crud.crud_inventory import crud_inventory
+from app.models.inventory import Inventory, InventoryMovement, MovementType
+from app.models.item import Item, ItemType
+
+@pytest.fixture
+def new_item(db):
+    """A company 1 item that no store stocks yet"""
+    item = Item(company_id=1, name="Rye flour", type=ItemType.RAW_MATERIAL, unit_type="kg", cost_price=1, sell_price=2)
+    db.add(item)
+    db.commit()
+    return item.id
+
+def _rows(db, item_id):
+    db.expire_all()
+    return db.query(Inventory).filter(Inventory.item_id == item_id).order_by(Inventory.store_id).all()
+
+def test_adjust_many_upserts_one_row_per_store_and_item(db, new_item):
+    movements = crud_inventory.adjust_many(db, movement_type=MovementType.PURCHASE, reference_type="purchase_order", adjustments=[
+        {"store_id": 1, "item_id": new_item, "quantity": 4, "unit": "kg", "reference_id": 1},
+        {"store_id": 1, "item_id": new_item, "quantity": 6, "unit": "kg", "reference_id": 2},
+        {"store_id": 2, "item_id": new_item, "quantity": 3, "unit": "kg", "reference_id": 2},
+    ])
+    rows = _rows(db, new_item)
+    assert [(row.store_id, row.quantity) for row in rows] == [(1, 10), (2, 3)]
+    # One movement per row and reference
+    assert sorted((m.inventory_id, m.reference_id, m.quantity) for m in movements) == [
+        (rows[0].id, 1, 4), (rows[0].id, 2, 6), (rows[1].id, 2, 3)
+    ]
+
+    crud_inventory.adjust_many(db, movement_type=MovementType.SALE, adjustments=[
+        {"store_id": 1, "item_id": new_item, "quantity": -2.5, "unit": "kg"},
+    ])
+    assert [(row.store_id, row.quantity) for row in _rows(db, new_item)] == [(1, 7.5), (2, 3)]
+
+def test_adjust_many_rolls_back_when_stock_would_go_negative(db, new_item):
+    crud_inventory.adjust_many(db, movement_type=MovementType.PURCHASE, adjustments=[
+        {"store_id": 1, "item_id": new_item, "quantity": 5, "unit": "kg"},
+    ])
+    with pytest.raises(ValueError, match="Insufficient stock"):
+        crud_inventory.adjust_many(db, movement_type=MovementType.SALE, allow_negative=False, adjustments=[
+            {"store_id": 1, "item_id": new_item, "quantity": -3, "unit": "kg"},
+            {"store_id": 1, "item_id": new_item, "quantity": -3, "unit": "kg"},
+        ])
+    rows = _rows(db, new_item)
+    assert [row.quantity for row in rows] == [5]
+    assert db.query(InventoryMovement).filter(InventoryMovement.inventory_id == rows[0].id).count() == 1
+
+def test_reserve_many_sums_reservations_without_moving_stock(db, new_item):
+    assert crud_inventory.reserve_many(db, reservations=[
+        {"store_id": 1, "item_id": new_item, "quantity": 2, "unit": "kg"},
+        {"store_id": 1, "item_id": new_item, "quantity": 1, "unit": "kg"},
+        # Reserved and released in the same call: nothing to write
+        {"store_id": 2, "item_id": new_item, "quantity": 4, "unit": "kg"},
+        {"store_id": 2, "item_id": new_item, "quantity": -4, "unit": "kg"},
+    ]) == 1
+    db.commit()
+    rows = _rows(db, new_item)
+    assert [(row.store_id, row.quantity or 0, row.reserved_quantity) for row in rows] == [(1, 0, 3)]
+
+    crud_inventory.reserve_many(db, reservations=[{"store_id": 1, "item_id": new_item, "quantity": -1, "unit": "kg"}])
+    db.commit()
+    assert [row.reserved_quantity for row in _rows(db, new_item)] == [2]
+    assert db.query(InventoryMovement).filter(InventoryMovement.inventory_id == rows[0].id).count() == 0
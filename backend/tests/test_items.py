@@ -0,0 +1,67 @@
+from sqlalchemy import update
+
+from app.core.cache import catalog_versions
+from app.models.company import Company
+from app.models.item import Item
+
+def test_read_item_by_barcode(db, login):
+    item = db.query(Item).filter(Item.company_id == 1, Item.barcode.isnot(None)).first()
+    client = login("manager1@example.com")
+    response = client.get(f"/api/v1/items/barcode/{item.barcode}")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == item.id
+    assert body["barcode"] == item.barcode
+    assert body["company_id"] == 1
+    assert body["available_stock"] == body["current_stock"] - body["reserved_stock"]
+
+def test_item_listing_revalidates_with_etag(login):
+    client = login("manager1@example.com")
+    response = client.get("/api/v1/items/", params={"company_id": 1})
+    assert response.status_code == 200
+    assert response.json()
+    etag = response.headers["etag"]
+
+    response = client.get("/api/v1/items/", params={"company_id": 1}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+def test_category_items_include_subcategories(login):
+    client = login("manager1@example.com")
+    parent = client.post("/api/v1/items/categories/", json={"name": "Drinks", "company_id": 1})
+    assert parent.status_code == 200
+    child = client.post(
+        "/api/v1/items/categories/", json={"name": "Juices", "company_id": 1, "parent_id": parent.json()["id"]}
+    )
+    assert child.status_code == 200
+    item = client.post("/api/v1/items/", json={
+        "name": "Orange juice", "barcode": "SUBTREE-1", "type": "finished_good", "unit_type": "pcs",
+        "category_id": child.json()["id"], "cost_price": 1.0, "sell_price": 2.5, "company_id": 1,
+    })
+    assert item.status_code == 200
+
+    url = f"/api/v1/items/categories/{parent.json()['id']}/items"
+    assert client.get(url).json() == []
+    response = client.get(url, params={"include_subcategories": True})
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()] == [item.json()["id"]]
+    assert response.json()[0]["current_stock"] == 0
+
+def test_item_listing_sees_writes_from_other_workers(db, login):
+    client = login("manager1@example.com")
+    etag = client.get("/api/v1/items/", params={"company_id": 1}).headers["etag"]
+
+    # Another worker renames an item and bumps the shared catalog version
+    item = db.query(Item).filter(Item.company_id == 1).order_by(Item.name, Item.id).first()
+    item.name = "Renamed elsewhere"
+    db.commit()
+    db.execute(update(Company).where(Company.id == 1).values(catalog_version=Company.catalog_version + 1))
+    db.commit()
+
+    # As when this worker's copy of the version has expired
+    catalog_versions.clear()
+    response = client.get("/api/v1/items/", params={"company_id": 1}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "Renamed elsewhere" in {row["name"] for row in response.json()}
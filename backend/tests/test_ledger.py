@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+
+from app.crud.crud_inventory import crud_inventory, signed_quantity
+from app.models.inventory import Inventory, InventoryMovement, MovementType
+
+def _ledger_sum(db, inventory_id):
+    return sum(
+        signed_quantity(movement.movement_type, movement.quantity)
+        for movement in db.query(InventoryMovement).filter(InventoryMovement.inventory_id == inventory_id)
+    )
+
+def _add_movement(db, inventory_id, movement_id, quantity):
+    db.add(InventoryMovement(
+        id=movement_id, inventory_id=inventory_id, movement_type=MovementType.ADJUSTMENT,
+        quantity=quantity, unit="pcs", created_at=datetime.utcnow()
+    ))
+    db.commit()
+
+def test_snapshots_wait_for_movements_committed_late(db):
+    inventory_id = db.query(Inventory.id).filter(Inventory.store_id == 6).order_by(Inventory.id).limit(1).scalar()
+    crud_inventory.take_snapshots(db, settle_seconds=0)
+    top = db.scalar(func.max(InventoryMovement.id))
+
+    # Movement top + 1 is still in flight when top + 2 commits and a snapshot run starts
+    _add_movement(db, inventory_id, top + 2, 5.0)
+    crud_inventory.take_snapshots(db, settle_seconds=60)
+    _add_movement(db, inventory_id, top + 1, 3.0)
+
+    # Once both have settled the next run takes them in
+    db.execute(
+        update(InventoryMovement)
+        .where(InventoryMovement.id > top)
+        .values(created_at=datetime.utcnow() - timedelta(seconds=120))
+    )
+    db.commit()
+    assert crud_inventory.take_snapshots(db, settle_seconds=60) >= 1
+    balance = crud_inventory.ledger_balances(db, inventory_ids=[inventory_id])[inventory_id]
+    assert balance == _ledger_sum(db, inventory_id)
@@ -0,0 +1,71 @@
+import pytest
+
+from app.models.academy import CourseEnrollment, LessonProgress
+from app.models.user import User
+from app.services.lesson_progress import progress_buffer
+
+@pytest.fixture
+def enrollment(db, login):
+    """A two lesson course in company 1 with staff1-1 enrolled"""
+    course = login("admin@example.com").post("/api/v1/courses/", json={
+        "company_id": 1, "title": "Knife skills", "price": 0,
+        "sections": [{"title": "Basics", "order": 1, "lessons": [
+            {"title": "Grip", "order": 1}, {"title": "Dicing", "order": 2}
+        ]}]
+    }).json()
+    student = db.query(User).filter(User.email == "staff1-1@example.com").one()
+    enrollment = CourseEnrollment(course_id=course["id"], user_id=student.id)
+    db.add(enrollment)
+    db.commit()
+    lessons = [lesson["id"] for lesson in course["sections"][0]["lessons"]]
+    return enrollment.id, lessons
+
+def _report(client, enrollment_id, lesson_id, position, progress, completed=False):
+    response = client.post("/api/v1/courses/progress/heartbeats", json={"heartbeats": [{
+        "enrollment_id": enrollment_id, "lesson_id": lesson_id,
+        "last_position": position, "progress": progress, "is_completed": completed
+    }]})
+    assert response.status_code == 202, response.text
+
+def test_heartbeats_are_merged_and_completions_counted_once(db, login, enrollment):
+    enrollment_id, (grip, dicing) = enrollment
+    client = login("staff1-1@example.com")
+    buffer = progress_buffer()
+    buffer.flush(db)
+
+    _report(client, enrollment_id, grip, 30, 40)
+    # Seeked back: the position follows, progress keeps its maximum
+    _report(client, enrollment_id, grip, 10, 20)
+    assert len(buffer) == 1
+    assert buffer.flush(db) == 1
+    row = db.query(LessonProgress).filter_by(enrollment_id=enrollment_id, lesson_id=grip).one()
+    assert (row.last_position, row.progress, row.is_completed) == (10, 40, False)
+
+    # Completed twice, in one flush and again in the next
+    _report(client, enrollment_id, grip, 60, 100, completed=True)
+    _report(client, enrollment_id, grip, 61, 100, completed=True)
+    buffer.flush(db)
+    _report(client, enrollment_id, grip, 5, 10, completed=True)
+    buffer.flush(db)
+    db.expire_all()
+    row = db.query(LessonProgress).filter_by(enrollment_id=enrollment_id, lesson_id=grip).one()
+    assert (row.last_position, row.progress, row.is_completed) == (5, 100, True)
+    course_enrollment = db.get(CourseEnrollment, enrollment_id)
+    assert (course_enrollment.completed_lessons, course_enrollment.progress) == (1, 50)
+    assert course_enrollment.completed_at is None
+
+    _report(client, enrollment_id, dicing, 90, 100, completed=True)
+    buffer.flush(db)
+    db.expire_all()
+    course_enrollment = db.get(CourseEnrollment, enrollment_id)
+    assert (course_enrollment.completed_lessons, course_enrollment.progress) == (2, 100)
+    assert course_enrollment.completed_at is not None
+
+def test_heartbeats_for_someone_elses_enrollment_are_rejected(login, enrollment):
+    enrollment_id, (grip, _) = enrollment
+    client = login("staff2-1@example.com")
+    response = client.post("/api/v1/courses/progress/heartbeats", json={"heartbeats": [{
+        "enrollment_id": enrollment_id, "lesson_id": grip, "last_position": 1
+    }]})
+    assert response.status_code == 403
+    assert len(progress_buffer()) == 0
@@ -0,0 +1,12 @@
+from app.core import metrics
+
+def test_requests_are_counted_under_their_route_template(login):
+    client = login("manager1@example.com")
+    key = ("GET", "/api/v1/orders/{order_id}", "200")
+    before = metrics.http_requests_total.values().get(key, 0)
+
+    order_id = client.get("/api/v1/orders/").json()[0]["id"]
+    assert client.get(f"/api/v1/orders/{order_id}").status_code == 200
+
+    assert metrics.http_requests_total.values().get(key, 0) == before + 1
+    assert "/metrics" not in {route for _, route, _ in metrics.http_requests_total.values()}
@@ -0,0 +1,44 @@
+from app.models.order import Order, OrderStatus
+
+def _order_payload(**fields):
+    return {"items": [{"item_id": 1, "quantity": 1}], **fields}
+
+def test_new_order_is_pending_whatever_the_client_sends(login):
+    client = login("admin@example.com")
+    response = client.post("/api/v1/orders/", json=_order_payload(status="completed"))
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == OrderStatus.PENDING.value
+
+def test_status_changes_follow_the_state_machine(login):
+    client = login("admin@example.com")
+    order = client.post("/api/v1/orders/", json=_order_payload()).json()
+    response = client.put(f"/api/v1/orders/{order['id']}", json={"status": "ready"})
+    assert response.status_code == 400
+    response = client.put(f"/api/v1/orders/{order['id']}", json={"status": "confirmed"})
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == OrderStatus.CONFIRMED.value
+
+def test_update_cannot_move_an_order_to_another_company(login):
+    client = login("admin@example.com")
+    order = client.post("/api/v1/orders/", json=_order_payload()).json()
+    response = client.put(f"/api/v1/orders/{order['id']}", json={"company_id": 2, "notes": "moved"})
+    assert response.status_code == 200, response.text
+    assert response.json()["company_id"] == 1
+    assert response.json()["notes"] == "moved"
+
+def test_staff_without_store_cannot_transition_orders(db, login, storeless_staff):
+    order = login("admin@example.com").post("/api/v1/orders/", json=_order_payload()).json()
+    response = login(storeless_staff).post(
+        "/api/v1/orders/transitions", json={"order_ids": [order["id"]], "to_status": "cancelled"}
+    )
+    assert response.status_code == 403
+    assert db.get(Order, order["id"]).status == OrderStatus.PENDING
+
+def test_manager_transitions_only_own_store_orders(db, login):
+    other = db.query(Order).filter(Order.store_id == 2).first()
+    response = login("manager1@example.com").post(
+        "/api/v1/orders/transitions", json={"order_ids": [other.id], "to_status": "cancelled"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["transitioned"] == []
+    assert response.json()["rejected"][0]["reason"] == "Order not found"
@@ -0,0 +1,20 @@
+def test_admin_lists_only_own_company_orders_in_id_order(login):
+    client = login("admin@example.com")
+    response = client.get("/api/v1/orders/", params={"limit": 1000})
+    assert response.status_code == 200
+    orders = response.json()
+    assert orders
+    assert {order["company_id"] for order in orders} == {1}
+    assert [order["id"] for order in orders] == sorted(order["id"] for order in orders)
+
+def test_staff_without_store_sees_no_orders(login, storeless_staff):
+    client = login(storeless_staff)
+    response = client.get("/api/v1/orders/")
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_manager_sees_only_own_store_orders(login):
+    client = login("manager1@example.com")
+    response = client.get("/api/v1/orders/", params={"limit": 1000})
+    assert response.status_code == 200
+    assert {order["store_id"] for order in response.json()} <= {1}
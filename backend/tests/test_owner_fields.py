@@ -0,0 +1,28 @@
+from app.models.academy import Course
+from app.models.recipe import Recipe
+
+def test_course_update_keeps_its_company(db, login):
+    client = login("admin@example.com")
+    course = client.post("/api/v1/courses/", json={"company_id": 1, "title": "Knife skills", "price": 10})
+    assert course.status_code == 200, course.text
+    course_id = course.json()["id"]
+
+    response = client.put(
+        f"/api/v1/courses/{course_id}", json={"company_id": 2, "title": "Knife skills II", "price": 10}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["company_id"] == 1
+    assert response.json()["title"] == "Knife skills II"
+    assert db.get(Course, course_id).company_id == 1
+
+def test_recipe_update_keeps_its_company(db, login):
+    client = login("manager1@example.com")
+    recipe = client.post("/api/v1/recipes/", json={"company_id": 1, "name": "Sourdough"})
+    assert recipe.status_code == 200, recipe.text
+    recipe_id = recipe.json()["id"]
+
+    response = client.put(f"/api/v1/recipes/{recipe_id}", json={"company_id": 2, "name": "Rye sourdough"})
+    assert response.status_code == 200, response.text
+    assert response.json()["company_id"] == 1
+    assert response.json()["name"] == "Rye sourdough"
+    assert db.get(Recipe, recipe_id).company_id == 1
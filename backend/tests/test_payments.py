@@ -0,0 +1,31 @@
+def _new_order(client):
+    response = client.post("/api/v1/orders/", json={"items": [{"item_id": 1, "quantity": 2}], "payment_status": "paid"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_new_order_payment_status_is_pending_without_payments(login):
+    order = _new_order(login("admin@example.com"))
+    assert order["payment_status"] == "pending"
+    assert order["payments"] == []
+
+def test_payment_amount_must_be_positive(login):
+    client = login("admin@example.com")
+    order = _new_order(client)
+    response = client.post(f"/api/v1/orders/{order['id']}/payments", json={"amount": -5, "payment_method": "cash"})
+    assert response.status_code == 422
+
+def test_payments_default_to_pending(login):
+    client = login("admin@example.com")
+    order = _new_order(client)
+    response = client.post(f"/api/v1/orders/{order['id']}/payments",
+                           json={"amount": order["total"], "payment_method": "card"})
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "pending"
+    assert client.get(f"/api/v1/orders/{order['id']}").json()["payment_status"] == "pending"
+
+def test_staff_cannot_settle_card_payments(login):
+    client = login("staff1-1@example.com")
+    order = _new_order(client)
+    url = f"/api/v1/orders/{order['id']}/payments"
+    assert client.post(url, json={"amount": 1, "payment_method": "card", "status": "paid"}).status_code == 403
+    assert client.post(url, json={"amount": 1, "payment_method": "cash", "status": "paid"}).status_code == 200
@@ -0,0 +1,20 @@
+import pytest
+
+from app.services.pricing import price_lines
+
+PRICES = {1: (10.0, 0.0, "pcs", "/")}
+
+def test_manual_discounts_are_refused_without_a_limit():
+    with pytest.raises(ValueError):
+        price_lines(PRICES, [{"item_id": 1, "quantity": 1, "discount": 10.0}])
+
+def test_manual_discounts_are_capped():
+    order = price_lines(PRICES, [{"item_id": 1, "quantity": 2, "discount": 4.0}], manual_discount_limit=0.2)
+    assert order.total == 16.0
+    with pytest.raises(ValueError):
+        price_lines(PRICES, [{"item_id": 1, "quantity": 2, "discount": 4.01}], manual_discount_limit=0.2)
+
+def test_staff_cannot_discount_an_order_to_zero(login):
+    client = login("staff1-1@example.com")
+    response = client.post("/api/v1/orders/", json={"items": [{"item_id": 1, "quantity": 1, "discount": 1e9}]})
+    assert response.status_code == 400
@@ -0,0 +1,43 @@
+"""
+The benchmarks.query_plans check, run with the suite: every hot CRUD read
+must be served by an index. It seeds its own database, larger than the
+shared test one, so the planner has realistic tables to choose from.
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.cache import catalog_cache, catalog_versions
+from app.core.tenancy import tenant_cache
+from app.db.seed import SeedConfig, seed
+from app.db.session import create_db_engine
+from app.services import pricing
+from app.services.course_tree import course_tree_cache
+from benchmarks.query_plans import PLAN_SEED, analyze, explain_hot_queries
+
+def _clear_caches():
+    # The caches are keyed by ids, which the two databases share
+    for cache in (tenant_cache, catalog_cache, catalog_versions, course_tree_cache,
+                  pricing.price_cache, pricing.pricing_rules):
+        cache.clear()
+
+@pytest.fixture(scope="module")
+def plans_engine(tmp_path_factory):
+    engine = create_db_engine(f"sqlite:///{tmp_path_factory.mktemp('plans')}/plans.db")
+    seed(engine, SeedConfig(**PLAN_SEED))
+    analyze(engine)
+    yield engine
+    engine.dispose()
+
+def test_hot_queries_use_indexes(plans_engine):
+    _clear_caches()
+    db = Session(bind=plans_engine)
+    try:
+        failures = [
+            f"{name}: {' '.join(statement.split())}\n    " + "\n    ".join(bad)
+            for name, statements in explain_hot_queries(plans_engine, db)
+            for statement, plan, bad in statements if bad
+        ]
+    finally:
+        db.close()
+        _clear_caches()
+    assert not failures, "full table scans:\n" + "\n".join(failures)
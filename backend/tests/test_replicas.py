@@ -0,0 +1,79 @@
+import time
+
+import pytest
+from sqlalchemy import delete, insert
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.api import deps
+from app.db import replicas
+from app.db.base import Base
+from app.db.replicas import (
+    HEARTBEAT_ID, READ_PRIMARY_COOKIE, ReadOnlySessionError, ReadYourWritesMiddleware, ReplicaSet
+)
+from app.db.session import create_db_engine, engine
+from app.db.shards import DEFAULT_SHARD
+from app.models.item import Item
+from app.models.replication import ReplicationHeartbeat
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A replica of the test database, lag measured on every read"""
+    replica_engine = create_db_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=replica_engine)
+    replica_set = ReplicaSet(DEFAULT_SHARD, engine, {"replica-1": replica_engine}, max_lag=5, heartbeat_interval=0)
+    monkeypatch.setitem(replicas.replica_sets, DEFAULT_SHARD, replica_set)
+    yield replica_engine
+    replica_engine.dispose()
+
+def _beat(replica_engine, age):
+    with replica_engine.begin() as conn:
+        conn.execute(delete(ReplicationHeartbeat))
+        conn.execute(insert(ReplicationHeartbeat).values(id=HEARTBEAT_ID, beat_at=time.time() - age))
+
+def _read_from(cookies=""):
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"cookie", cookies.encode())]})
+    sessions = deps.get_read_db(request)
+    try:
+        return next(sessions).info.get("replica", "primary")
+    finally:
+        sessions.close()
+
+def test_reads_go_to_replicas_that_keep_up(replica):
+    # No heartbeat has reached the replica yet
+    assert _read_from() == "primary"
+    _beat(replica, age=1)
+    assert _read_from() == "replica-1"
+    _beat(replica, age=60)
+    assert _read_from() == "primary"
+
+def test_clients_read_their_own_writes_from_the_primary(replica):
+    _beat(replica, age=0)
+    assert _read_from(f"{READ_PRIMARY_COOKIE}={time.time() + 5:.3f}") == "primary"
+    assert _read_from(f"{READ_PRIMARY_COOKIE}={time.time() - 5:.3f}") == "replica-1"
+    assert _read_from(f"{READ_PRIMARY_COOKIE}=garbage") == "replica-1"
+
+def test_successful_writes_set_the_read_primary_cookie():
+    async def endpoint(request):
+        return PlainTextResponse("", status_code=int(request.query_params.get("status", 200)))
+
+    app = Starlette(routes=[Route("/", endpoint, methods=["GET", "POST"])])
+    client = TestClient(ReadYourWritesMiddleware(app, window=5))
+    assert READ_PRIMARY_COOKIE not in client.get("/").cookies
+    assert READ_PRIMARY_COOKIE not in client.post("/", params={"status": 400}).cookies
+    until = float(client.post("/").cookies[READ_PRIMARY_COOKIE])
+    assert time.time() < until <= time.time() + 5
+
+def test_read_sessions_refuse_writes():
+    db = replicas.read_session(DEFAULT_SHARD, primary=True)
+    try:
+        with pytest.raises(ReadOnlySessionError):
+            db.execute(delete(Item).where(Item.id == 0))
+        db.add(Item(company_id=1, name="Nothing", type="tool", unit_type="pcs", cost_price=0, sell_price=0))
+        with pytest.raises(ReadOnlySessionError):
+            db.flush()
+    finally:
+        db.close()
@@ -0,0 +1,87 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select
+from starlette.requests import Request
+
+from app.api import deps
+from app.core.security import create_access_token
+from app.db import shards
+from app.db.base import Base
+from app.db.session import create_db_engine, engine
+from app.db.shards import DEFAULT_SHARD, ShardRouter, move_company, session_shard
+from app.models.company import CompanyShard, ShardStatus, Store
+from app.models.item import Item
+from app.models.order import Order
+
+@pytest.fixture
+def eu_shard(tmp_path, monkeypatch):
+    """A second, empty shard next to the test database"""
+    eu = create_db_engine(f"sqlite:///{tmp_path}/eu.db")
+    Base.metadata.create_all(bind=eu)
+    router = ShardRouter({DEFAULT_SHARD: engine, "eu": eu}, directory_ttl=60)
+    monkeypatch.setattr(shards, "shard_router", router)
+    monkeypatch.setattr(deps, "shard_router", router)
+    yield router
+    with engine.begin() as conn:
+        conn.execute(delete(CompanyShard))
+    eu.dispose()
+
+def _request(company_id=None):
+    headers = []
+    if company_id is not None:
+        token = create_access_token(subject=1, data={"company_id": company_id})
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def _shard_of(request):
+    sessions = deps.get_db(request)
+    try:
+        return session_shard(next(sessions))
+    finally:
+        sessions.close()
+
+def _set_directory(company_id, shard, status=ShardStatus.ACTIVE):
+    with engine.begin() as conn:
+        conn.execute(delete(CompanyShard).where(CompanyShard.company_id == company_id))
+        conn.execute(insert(CompanyShard).values(company_id=company_id, shard=shard, status=status))
+
+def test_requests_get_a_session_on_their_company_shard(eu_shard):
+    assert _shard_of(_request(2)) == DEFAULT_SHARD
+
+    # The directory is cached until it expires or is invalidated
+    _set_directory(2, "eu")
+    assert _shard_of(_request(2)) == DEFAULT_SHARD
+    eu_shard.invalidate()
+    assert _shard_of(_request(2)) == "eu"
+    assert _shard_of(_request(1)) == DEFAULT_SHARD
+    assert _shard_of(_request()) == DEFAULT_SHARD
+
+    _set_directory(2, "eu", ShardStatus.MOVING)
+    eu_shard.invalidate()
+    with pytest.raises(HTTPException) as error:
+        _shard_of(_request(2))
+    assert error.value.status_code == 503
+
+def _counts(shard_engine, company_id):
+    with shard_engine.connect() as conn:
+        return [
+            conn.scalar(select(func.count()).select_from(model).where(model.company_id == company_id))
+            for model in (Store, Item, Order)
+        ]
+
+def test_move_company_between_shards(eu_shard):
+    before = _counts(engine, 3)
+    assert all(before)
+
+    move_company(3, "eu")
+    assert eu_shard.shard_for(3) == "eu"
+    assert _counts(eu_shard.engines["eu"], 3) == before
+    assert _counts(engine, 3) == [0, 0, 0]
+    assert _shard_of(_request(3)) == "eu"
+
+    move_company(3, DEFAULT_SHARD)
+    assert eu_shard.shard_for(3) == DEFAULT_SHARD
+    assert _counts(engine, 3) == before
+    assert _counts(eu_shard.engines["eu"], 3) == [0, 0, 0]
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(CompanyShard)) == 0
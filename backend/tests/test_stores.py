@@ -0,0 +1,17 @@
+from app.core.tenancy import tenant_cache
+from app.crud.crud_store import crud_store
+from app.models.company import Store
+from app.models.user import User
+
+def test_moving_a_store_drops_cached_tenant_contexts(db):
+    manager = db.query(User).filter(User.email == "manager5@example.com").one()
+    context = tenant_cache.get(db, user_id=manager.id)
+    assert tenant_cache.get(db, user_id=manager.id) is context
+
+    store = db.get(Store, 6)
+    parent_store_id = store.parent_store_id
+    crud_store.update(db, db_obj=store, obj_in={"parent_store_id": None if parent_store_id else 5})
+    assert tenant_cache.get(db, user_id=manager.id) is not context
+
+    crud_store.update(db, db_obj=db.get(Store, 6), obj_in={"parent_store_id": parent_store_id})
+    assert set(crud_store.get_subtree_ids(db, store_id=5)) == ({5, 6} if parent_store_id == 5 else {5})
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.inventory import Inventory, InventoryMovement, InventoryValuation, MovementType
+from app.services import valuation
+
+def _revalue(db, store_id, chunk_size):
+    inventory_ids = db.query(Inventory.id).filter(Inventory.store_id == store_id)
+    db.query(InventoryValuation).filter(InventoryValuation.inventory_id.in_(inventory_ids)).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    applied = valuation.refresh_valuations(db, store_id=store_id, chunk_size=chunk_size, settle_seconds=0)
+    return applied, valuation.store_valuation_rows(db, store_id=store_id)
+
+def test_refresh_in_small_chunks_matches_one_pass(db):
+    applied, chunked = _revalue(db, 3, chunk_size=7)
+    assert applied > 7
+    assert _revalue(db, 3, chunk_size=100000) == (applied, chunked)
+    # Nothing new since: the next run applies nothing
+    assert valuation.refresh_valuations(db, store_id=3, chunk_size=7, settle_seconds=0) == 0
+
+def test_refresh_values_fifo_layers():
+    state = valuation.ValuationState(inventory_id=1)
+    state.apply(1, 10, 2.0)
+    state.apply(2, 10, 4.0)
+    state.apply(3, -15, 0.0)
+    assert state.quantity == pytest.approx(5)
+    assert state.fifo_value == pytest.approx(20.0)
+    assert state.average_cost == pytest.approx(3.0)
+
+def test_refresh_leaves_unsettled_movements_for_later(db):
+    valuation.refresh_valuations(db, store_id=3, settle_seconds=0)
+    inventory_id = db.query(Inventory.id).filter(Inventory.store_id == 3).limit(1).scalar()
+    db.add(InventoryMovement(
+        inventory_id=inventory_id, movement_type=MovementType.ADJUSTMENT, quantity=2.0, unit="pcs",
+        created_at=datetime.utcnow()
+    ))
+    db.commit()
+    assert valuation.refresh_valuations(db, store_id=3, settle_seconds=60) == 0
+    assert valuation.refresh_valuations(db, store_id=3, settle_seconds=0) == 1